@@ -32,6 +32,7 @@ from idaes.core.util.exceptions import (BalanceTypeNotSupportedError,
                                         ConfigurationError,
                                         PropertyNotSupportedError,
                                         PropertyPackageError)
+from idaes.core.util.build_profiler import build_step
 
 __author__ = "Andrew Lee"
 
@@ -69,6 +70,7 @@ class ControlVolume0DBlockData(ControlVolumeBlockData):
         # Call build method from base class
         super(ControlVolume0DBlockData, self).build()
 
+    @build_step
     def add_geometry(self):
         """
         Method to create volume Var in ControlVolume.
@@ -84,6 +86,7 @@ class ControlVolume0DBlockData(ControlVolumeBlockData):
         self.volume = Var(self.flowsheet().config.time, initialize=1.0,
                           doc='Holdup Volume [{}^3]'.format(l_units))
 
+    @build_step
     def add_state_blocks(self,
                          information_flow=FlowDirection.forward,
                          has_phase_equilibrium=None):
@@ -149,6 +152,7 @@ class ControlVolume0DBlockData(ControlVolumeBlockData):
                     "developer of the physical property package."
                     .format(self.name))
 
+    @build_step
     def add_reaction_blocks(self, has_equilibrium=None):
         """
         This method constructs the reaction block for the control volume.
@@ -41,6 +41,7 @@ from idaes.core.util.exceptions import (BalanceTypeNotSupportedError,
 from idaes.core.util.misc import add_object_reference
 from idaes.core.util.config import (is_transformation_method,
                                     is_transformation_scheme)
+from idaes.core.util.build_profiler import build_step
 
 __author__ = "Andrew Lee, Jaffer Ghouse"
 
@@ -147,6 +148,7 @@ argument)."""))
                     " documentation for argument options."
                     .format(self.name))
 
+    @build_step
     def add_geometry(self,
                      length_domain=None,
                      length_domain_set=[0.0, 1.0],
@@ -216,6 +218,7 @@ argument)."""))
         self.length = Var(initialize=1.0,
                           doc='Length of Control Volume [{}]'.format(l_units))
 
+    @build_step
     def add_state_blocks(self,
                          information_flow=FlowDirection.forward,
                          has_phase_equilibrium=None):
@@ -268,6 +271,7 @@ argument)."""))
             initialize={0: d0, 1: d1},                                          # TODO: What if the domain has differnt bounds?
             idx_map=idx_map)
 
+    @build_step
     def add_reaction_blocks(self, has_equilibrium=None):
         """
         This method constructs the reaction block for the control volume.
@@ -1595,6 +1599,7 @@ argument)."""))
                 "add_total_momentum_balances."
                 .format(self.name))
 
+    @build_step
     def apply_transformation(self):
         """
         Method to apply DAE transformation to the Control Volume length domain.
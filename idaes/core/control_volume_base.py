@@ -34,6 +34,7 @@ from idaes.core.util.exceptions import (BurntToast,
                                         ConfigurationError,
                                         DynamicError,
                                         PropertyNotSupportedError)
+from idaes.core.util.build_profiler import build_step
 
 __author__ = "Andrew Lee"
 
@@ -371,6 +372,7 @@ have a config block which derives from CONFIG_Base,
                 "developer of the ControlVolume class you are using."
                 .format(self.name))
 
+    @build_step
     def add_material_balances(self,
                               balance_type=MaterialBalanceType.componentPhase,
                               **kwargs):
@@ -418,6 +420,7 @@ have a config block which derives from CONFIG_Base,
 
         return mb
 
+    @build_step
     def add_energy_balances(self,
                             balance_type=EnergyBalanceType.enthalpyPhase,
                             **kwargs):
@@ -459,6 +462,7 @@ have a config block which derives from CONFIG_Base,
 
         return eb
 
+    @build_step
     def add_momentum_balances(self,
                               balance_type=MomentumBalanceType.pressureTotal,
                               **kwargs):
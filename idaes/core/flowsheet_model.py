@@ -18,9 +18,13 @@ IDAES modeling framework.
 from __future__ import division, print_function
 
 import logging
+import multiprocessing
+
+import numpy as np
 
 import pyomo.environ as pe
 from pyomo.dae import ContinuousSet
+from pyomo.network import Arc
 from pyomo.common.config import ConfigValue, In
 
 from idaes.core import (ProcessBlockData, declare_process_block_class,
@@ -29,6 +33,8 @@ from idaes.core.util.config import (is_physical_parameter_block,
                                     is_time_domain,
                                     list_of_floats)
 from idaes.core.util.exceptions import ConfigurationError, DynamicError
+from idaes.core.util.misc import copy_port_values
+from idaes.core.util.model_serializer import to_json, from_json
 
 # Some more information about this module
 __author__ = "John Eslick, Qi Chen, Andrew Lee"
@@ -39,6 +45,188 @@ __all__ = ['FlowsheetBlock', 'FlowsheetBlockData']
 # Set up logger
 _log = logging.getLogger(__name__)
 
+# Bounds on the Wegstein acceleration factor used to converge tear streams
+_wegstein_accel_min = -5.0
+_wegstein_accel_max = 0.0
+
+
+# Units and initialize keyword arguments for the current parallel level. This
+# is set before the worker processes are forked, so workers get a copy of the
+# model with the current inlet values.
+_pool_tasks = []
+
+
+def _pool_initialize_unit(i):
+    """
+    Initialize a unit in a worker process and return its state as a
+    model_serializer dict.
+    """
+    unit, kwargs, cache = _pool_tasks[i]
+    _initialize_unit(unit, kwargs, cache)
+    return to_json(unit, return_dict=True)
+
+
+def _initialize_unit(unit, kwargs, cache):
+    """
+    Initialize a unit, through an InitializationCache if one is given.
+    """
+    if cache is None:
+        unit.initialize(**kwargs)
+    else:
+        cache.initialize(unit, **kwargs)
+
+
+def _port_var_pairs(destination, source):
+    """
+    List the variables in a destination port with the matching source port
+    members, in the order copy_port_values copies them.
+
+    Args:
+        destination: destination port
+        source: source port
+
+    Returns:
+        list of (destination var data, source component data) tuples
+    """
+    pairs = []
+    for k, v in destination.vars.items():
+        if isinstance(v, pe.Var):
+            for i in v:
+                pairs.append((v[i], source.vars[k][i]))
+    return pairs
+
+
+def _strongly_connected(n_nodes, succ):
+    """
+    Find the strongly connected components of a directed graph (Tarjan's
+    algorithm).
+
+    Args:
+        n_nodes: number of nodes, nodes are 0 to n_nodes - 1
+        succ: list of successor node lists
+
+    Returns:
+        list of components, each a sorted list of nodes
+    """
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    comps = []
+    counter = [0]
+
+    def visit(v):
+        index[v] = low[v] = counter[0]
+        counter[0] += 1
+        stack.append(v)
+        on_stack.add(v)
+        for w in succ[v]:
+            if w not in index:
+                visit(w)
+                low[v] = min(low[v], low[w])
+            elif w in on_stack:
+                low[v] = min(low[v], index[w])
+        if low[v] == index[v]:
+            comp = []
+            while True:
+                w = stack.pop()
+                on_stack.discard(w)
+                comp.append(w)
+                if w == v:
+                    break
+            comps.append(sorted(comp))
+
+    for v in range(n_nodes):
+        if v not in index:
+            visit(v)
+    return comps
+
+
+def _select_tears(n_nodes, edges):
+    """
+    Select a set of edges to tear so that the graph has no cycles. In each
+    strongly connected component a depth-first search is started from the
+    node with the most edges coming in from outside the component (where
+    material usually enters a recycle loop), and the edges leading back to a
+    node on the search path are torn.
+
+    Args:
+        n_nodes: number of nodes
+        edges: list of (source node, destination node) tuples
+
+    Returns:
+        sorted list of indexes of edges to tear
+    """
+    succ = [[] for i in range(n_nodes)]
+    for s, d in edges:
+        succ[s].append(d)
+    tears = set()
+    for comp in _strongly_connected(n_nodes, succ):
+        if len(comp) < 2:
+            continue
+        members = set(comp)
+        n_in = dict((v, 0) for v in comp)
+        out_edges = dict((v, []) for v in comp)
+        for j, (s, d) in enumerate(edges):
+            if d in members and s not in members:
+                n_in[d] += 1
+            elif d in members and s in members:
+                out_edges[s].append((j, d))
+        start = max(comp, key=lambda v: (n_in[v], -v))
+        visited = set()
+        on_path = set()
+
+        def dfs(v):
+            visited.add(v)
+            on_path.add(v)
+            for j, w in out_edges[v]:
+                if w in on_path:
+                    tears.add(j)
+                elif w not in visited:
+                    dfs(w)
+            on_path.discard(v)
+
+        dfs(start)
+        for v in comp:
+            if v not in visited:
+                dfs(v)
+    return sorted(tears)
+
+
+def _dependency_levels(n_nodes, edges, tears):
+    """
+    Group the nodes of a directed graph into levels, where each node only
+    depends on nodes in earlier levels once the torn edges are removed.
+
+    Args:
+        n_nodes: number of nodes
+        edges: list of (source node, destination node) tuples
+        tears: indexes of edges to ignore
+
+    Returns:
+        list of levels, each a sorted list of nodes
+    """
+    tears = set(tears)
+    pred = [set() for i in range(n_nodes)]
+    for j, (s, d) in enumerate(edges):
+        if j not in tears and s != d:
+            pred[d].add(s)
+    level = {}
+    remaining = set(range(n_nodes))
+    levels = []
+    while remaining:
+        ready = sorted(v for v in remaining if all(
+            p in level for p in pred[v]))
+        if not ready:
+            raise ValueError(
+                "The flowsheet graph still has cycles after removing the tear "
+                "streams.")
+        for v in ready:
+            level[v] = len(levels)
+        remaining.difference_update(ready)
+        levels.append(ready)
+    return levels
+
 
 @declare_process_block_class("FlowsheetBlock", doc="""
     FlowsheetBlock is a specialized Pyomo block for IDAES flowsheet models, and
@@ -149,6 +337,243 @@ within this flowsheet if not otherwise specified,
                                  'the associated unit model class'
                                  .format(o.name))
 
+    def _unit_graph(self):
+        """
+        Build a directed graph of the units in this flowsheet from the Arcs.
+        The nodes are the unit models (and sub-flowsheets) directly contained
+        in this flowsheet, and each Arc between two different units is an
+        edge.  Arcs inside a unit model are ignored.
+
+        Returns:
+            (units, edges, arcs) where units is a list of unit blocks, edges is
+            a list of (source index, destination index) tuples, and arcs is the
+            list of Arcs corresponding to the edges.
+        """
+        units = []
+        idx = {}
+
+        def add(b):
+            if id(b) not in idx:
+                idx[id(b)] = len(units)
+                units.append(b)
+
+        for b in self.component_data_objects(pe.Block, descend_into=False):
+            if isinstance(b, (UnitModelBlockData, FlowsheetBlockData)):
+                add(b)
+
+        def unit_of(port):
+            b = port.parent_block()
+            while b is not None and b.parent_block() is not self:
+                b = b.parent_block()
+            return b
+
+        edges = []
+        arcs = []
+        for arc in self.component_data_objects(Arc, descend_into=True):
+            if not arc.directed:
+                _log.warning("{} is not directed and is ignored when ordering "
+                             "the flowsheet initialization.".format(arc.name))
+                continue
+            src = unit_of(arc.source)
+            dst = unit_of(arc.destination)
+            if src is None or dst is None or src is dst:
+                continue
+            add(src)
+            add(dst)
+            edges.append((idx[id(src)], idx[id(dst)]))
+            arcs.append(arc)
+        return units, edges, arcs
+
+    def initialization_order(self, tear_arcs=None):
+        """
+        Work out the order in which to initialize the units in this flowsheet.
+        The unit graph is built from the Arcs, tear streams are selected to
+        break any recycle loops (unless provided), and the units are grouped
+        into levels where each unit only needs results from units in earlier
+        levels.
+
+        Args:
+            tear_arcs: list of Arcs to tear, if None tears are selected
+                automatically
+
+        Returns:
+            (levels, tears) where levels is a list of lists of unit blocks and
+            tears is a list of torn Arcs
+        """
+        units, levels, arcs, edges, tears = \
+            self._initialization_order(tear_arcs)
+        return ([[units[i] for i in lvl] for lvl in levels],
+                [arcs[j] for j in tears])
+
+    def _initialization_order(self, tear_arcs=None):
+        """
+        Same as initialization_order, but returns the unit graph too.
+
+        Returns:
+            (units, levels, arcs, edges, tears) where units and arcs are from
+            _unit_graph, levels is a list of lists of unit indexes and tears is
+            a list of arc indexes
+        """
+        units, edges, arcs = self._unit_graph()
+        if tear_arcs is None:
+            tears = _select_tears(len(units), edges)
+        else:
+            tear_ids = set(id(a) for a in tear_arcs)
+            tears = [j for j, a in enumerate(arcs) if id(a) in tear_ids]
+        levels = _dependency_levels(len(units), edges, tears)
+        return units, levels, arcs, edges, tears
+
+    def initialize(self, tear_arcs=None, method="wegstein", max_iter=20,
+                   tol=1e-5, unit_args=None, outlvl=0, solver='ipopt',
+                   optarg=None, workers=None, cache=None):
+        """
+        Sequential-modular initialization of the flowsheet.  Units are
+        initialized one at a time in the order given by initialization_order,
+        and before each unit is initialized values are copied to its inlet
+        ports from the connected outlet ports with copy_port_values.  If the
+        flowsheet has recycle loops, the tear stream values are converged by
+        repeating this pass using direct substitution or Wegstein's method.
+
+        The values already in the tear stream destination ports are used as
+        the initial guess for the tear streams.
+
+        Keyword Arguments:
+            tear_arcs : list of Arcs to tear, if None tear streams are
+                        selected automatically (default = None)
+            method : method used to converge the tear streams, "wegstein" or
+                     "direct" (default = "wegstein")
+            max_iter : maximum number of passes through the flowsheet
+                       (default = 20)
+            tol : convergence tolerance for the tear streams, the difference
+                  between guessed and calculated values is divided by the
+                  magnitude of the guess (or 1 if larger) (default = 1e-5)
+            unit_args : a dict with unit model keys and dicts of additional
+                        keyword arguments to pass to that unit's initialize
+                        method (default = None)
+            outlvl : sets output level of initialisation routine
+
+                     * 0 = no output (default)
+                     * 1 = report order, tears and tear errors
+                     * 2 = include output from unit initialization routines
+
+            optarg : solver options dictionary object, passed to each unit.
+                     If None the units use their own defaults (default=None)
+            solver : str indicating which solver to use during
+                     initialization (default = 'ipopt')
+            workers : number of processes used to initialize units in the
+                      same dependency level in parallel. Each level's units
+                      are initialized in forked worker processes and their
+                      states are loaded back with the model_serializer. If
+                      None or 1, or if fork is not available on the platform,
+                      units are initialized one at a time (default = None)
+            cache : an InitializationCache, if given units are initialized
+                    through the cache, so units with the same inputs as a
+                    previous initialization are loaded from the cache
+                    instead of being solved (default = None)
+
+        Returns:
+            None
+        """
+        if method not in ("wegstein", "direct"):
+            raise ConfigurationError(
+                "{} unrecognized tear convergence method {}, should be "
+                "'wegstein' or 'direct'.".format(self.name, method))
+        units, levels, arcs, edges, tear_idx = \
+            self._initialization_order(tear_arcs)
+        level_units = [[units[i] for i in lvl] for lvl in levels]
+        order = [u for lvl in level_units for u in lvl]
+        tears = [arcs[j] for j in tear_idx]
+        in_arcs = dict((id(u), []) for u in units)
+        for j, (src, dst) in enumerate(edges):
+            if j not in tear_idx:
+                in_arcs[id(units[dst])].append(arcs[j])
+        if outlvl > 0:
+            _log.info("{} initialization order: {}".format(
+                self.name, ", ".join(u.name for u in order)))
+            _log.info("{} tear streams: {}".format(
+                self.name, ", ".join(a.name for a in tears)))
+
+        pairs = []
+        for arc in tears:
+            pairs.extend(_port_var_pairs(arc.destination, arc.source))
+        x = np.array([v.value for v, s in pairs], dtype=float)
+        x_prev = g_prev = None
+        for it in range(max_iter):
+            for lvl in level_units:
+                for u in lvl:
+                    for arc in in_arcs[id(u)]:
+                        copy_port_values(arc.destination, arc.source)
+                self._initialize_level(
+                    lvl, unit_args, outlvl, solver, optarg, workers, cache)
+            if not pairs:
+                return
+            g = np.array([pe.value(s) for v, s in pairs], dtype=float)
+            err = np.max(np.abs(g - x)/np.maximum(np.abs(x), 1.0))
+            if outlvl > 0:
+                _log.info("{} iteration {} tear error {:.3e}".format(
+                    self.name, it + 1, err))
+            if err <= tol:
+                if outlvl > 0:
+                    _log.info("{} tear streams converged.".format(self.name))
+                return
+            if method == "wegstein" and x_prev is not None:
+                dx = x - x_prev
+                s = np.zeros(len(x))
+                nz = dx != 0
+                s[nz] = (g[nz] - g_prev[nz])/dx[nz]
+                q = np.zeros(len(x))
+                ns = s != 1
+                q[ns] = s[ns]/(s[ns] - 1)
+                q = np.clip(q, _wegstein_accel_min, _wegstein_accel_max)
+                x_new = q*x + (1 - q)*g
+            else:
+                x_new = g
+            x_prev, g_prev, x = x, g, x_new
+            for (v, s), xi in zip(pairs, x.tolist()):
+                v.value = xi
+        _log.warning("{} tear streams did not converge in {} iterations."
+                     .format(self.name, max_iter))
+
+    def _unit_initialize_args(self, unit, unit_args, outlvl, solver, optarg):
+        """
+        Get the keyword arguments for a unit's initialize method.
+        """
+        kwargs = {"outlvl": outlvl - 1, "solver": solver}
+        if optarg is not None:
+            kwargs["optarg"] = optarg
+        if unit_args is not None and unit in unit_args:
+            kwargs.update(unit_args[unit])
+        return kwargs
+
+    def _initialize_level(self, units, unit_args, outlvl, solver, optarg,
+                          workers, cache=None):
+        """
+        Initialize a list of units that don't depend on each other, in
+        parallel worker processes if requested.
+        """
+        global _pool_tasks
+        units = [u for u in units if hasattr(u, "initialize")]
+        tasks = [(u, self._unit_initialize_args(
+            u, unit_args, outlvl, solver, optarg), cache) for u in units]
+        if (workers is None or workers < 2 or len(tasks) < 2 or
+                "fork" not in multiprocessing.get_all_start_methods()):
+            for u, kwargs, c in tasks:
+                _initialize_unit(u, kwargs, c)
+            return
+        _pool_tasks = tasks
+        try:
+            ctx = multiprocessing.get_context("fork")
+            pool = ctx.Pool(processes=min(workers, len(tasks)))
+            try:
+                states = pool.map(_pool_initialize_unit, range(len(tasks)))
+            finally:
+                pool.close()
+                pool.join()
+        finally:
+            _pool_tasks = []
+        for (u, kwargs, c), sd in zip(tasks, states):
+            from_json(u, sd=sd)
+
     def _setup_dynamics(self):
         # Look for parent flowsheet
         fs = self.flowsheet()
@@ -24,6 +24,8 @@ import logging
 from pyomo.common.config import ConfigBlock
 from pyomo.environ import Block
 
+from idaes.core.util import build_profiler
+
 __author__ = "John Eslick"
 __all__ = ['ProcessBlock', 'declare_process_block_class']
 
@@ -35,7 +37,12 @@ def _rule_default(b, *args):
     using the normal rule argument to ProcessBlock init.
     """
     try:
-        b.build()
+        profiler = build_profiler.active_profiler()
+        if profiler is None:
+            b.build()
+        else:
+            with profiler.block(b):
+                b.build()
     except Exception as e:
         logging.getLogger(__name__).exception(
             "Failure in build: {}".format(b))
@@ -15,7 +15,10 @@ This module contains classes for property blocks and property parameter blocks.
 """
 from __future__ import division
 
+import itertools
+
 # Import Pyomo libraries
+from pyomo.environ import Block
 from pyomo.common.config import ConfigBlock, ConfigValue, In
 
 # Import IDAES cores
@@ -28,13 +31,122 @@ from idaes.core.util.exceptions import (BurntToast,
                                         PropertyNotSupportedError,
                                         PropertyPackageError)
 from idaes.core.util.misc import add_object_reference
+from idaes.core.util import build_profiler
 
 # Some more information about this module
 __author__ = "Andrew Lee, John Eslick"
 
 __all__ = ['StateBlockData',
            'StateBlock',
-           'PhysicalParameterBlock']
+           'PhysicalParameterBlock',
+           'indexed_properties']
+
+# Dispatch table value for properties with no method in the metadata
+_NOT_IN_METADATA = object()
+
+
+def property_dispatch(params):
+    """
+    Get the property dispatch table of a parameter block. This is a dict
+    mapping property names to the value of 'method' in the property metadata
+    (the name of the StateBlockData method that creates the property, None
+    or False). It is built from get_metadata().properties the first time it
+    is needed and stored on the parameter block.
+
+    Args:
+        params: a physical parameter block
+
+    Returns:
+        dict, or None if the metadata has no properties
+    """
+    d = params.__dict__.get("_property_dispatch", None)
+    if d is None:
+        props = params.get_metadata().properties
+        if props is None:
+            return None
+        d = dict((k, v.get('method', _NOT_IN_METADATA))
+                 for k, v in props.items())
+        params._property_dispatch = d
+    return d
+
+
+def indexed_properties(params):
+    """
+    Check whether state blocks using a parameter block should be built in
+    indexed property mode. Property packages which support this mode declare
+    an indexed_properties option in the CONFIG of their parameter block.
+
+    Args:
+        params: a physical parameter block
+
+    Returns:
+        bool
+    """
+    config = params.config
+    return "indexed_properties" in config and bool(config.indexed_properties)
+
+
+def _index_tuple(idx):
+    """
+    Convert the index of a block element to a tuple.
+    """
+    if idx is None:
+        return ()
+    if idx.__class__ is tuple:
+        return idx
+    return (idx,)
+
+
+class _IndexedPropertyView(object):
+    """
+    View of the part of an indexed property component that belongs to one
+    element of a state block. Indexing the view with k returns the component
+    data at the element's index followed by k, so the view can be used in
+    place of a component declared on the element.
+    """
+    __slots__ = ("_component", "_index", "_keys")
+
+    def __init__(self, component, index, keys):
+        self._component = component
+        self._index = index
+        self._keys = keys
+
+    def __getitem__(self, k):
+        if k.__class__ is tuple:
+            return self._component[self._index + k]
+        return self._component[self._index + (k,)]
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, k):
+        return k in self._keys
+
+    def is_indexed(self):
+        return True
+
+    def parent_component(self):
+        return self._component
+
+    def keys(self):
+        return list(self._keys)
+
+    def values(self):
+        return [self[k] for k in self._keys]
+
+    def items(self):
+        return [(k, self[k]) for k in self._keys]
+
+    def fix(self, *args):
+        for v in self.values():
+            v.fix(*args)
+
+    def unfix(self):
+        for v in self.values():
+            v.unfix()
 
 
 class PhysicalParameterBlock(ProcessBlockData,
@@ -89,6 +201,193 @@ class StateBlock(ProcessBlock):
                                   'the property package developer'
                                   .format(self.name))
 
+    def build_property(self, *attrs):
+        """
+        Create properties for all elements of the state block at once, rather
+        than as each element's property is first used. The methods which
+        create the properties are looked up once for each parameter block,
+        and elements that already have a property are skipped.
+
+        Args:
+            attrs: names of properties to create
+
+        Returns:
+            None
+        """
+        for attr in attrs:
+            methods = {}
+            for k, b in self.iteritems():
+                if attr in b.__dict__:
+                    continue
+                params = b.config.parameters
+                f = methods.get(id(params), None)
+                if f is None:
+                    bound = b._property_method(attr)
+                    if not callable(bound):
+                        raise PropertyPackageError(
+                            '{} tried calling attribute {} in order to '
+                            'create component {}. However the method is '
+                            'not callable.'.format(b.name, bound, attr))
+                    # Use the underlying function of a bound method, so the
+                    # lookup is done once per parameter block. Other
+                    # callables are looked up for each element.
+                    f = methods[id(params)] = getattr(bound, "__func__",
+                                                      False)
+                b._StateBlockData__getattrcalls = [attr]
+                try:
+                    if f is False:
+                        b._property_method(attr)()
+                    else:
+                        f(b)
+                finally:
+                    del b._StateBlockData__getattrcalls
+
+    def build_indexed_properties(self, params):
+        """
+        Create the properties of all elements of the state block at once as
+        indexed components (see add_indexed_property). This is used instead
+        of building the properties in each element when the parameter block
+        has the indexed_properties option set, and property packages which
+        support indexed property mode should overload this method.
+
+        Args:
+            params: the parameter block of the state block elements
+
+        Returns:
+            None
+        """
+        raise NotImplementedError('{} property package does not support '
+                                  'indexed properties.'.format(self.name))
+
+    def indexed_property_block(self):
+        """
+        Get the Block holding the indexed property components of this state
+        block, creating it if needed. The Block is added to the parent block
+        of the state block as <state block name>_indexed, so it is included
+        in the model (and in any discretization of the parent block).
+
+        Returns:
+            Block
+        """
+        ip = self.__dict__.get("_indexed_property_block", None)
+        if ip is None:
+            ip = Block(concrete=True)
+            self.parent_block().add_component(
+                self.local_name + "_indexed", ip)
+            object.__setattr__(self, "_indexed_property_block", ip)
+            object.__setattr__(self, "_indexed_property_views", [])
+        return ip
+
+    def add_indexed_property(self, name, ctype, *sets, **kwargs):
+        """
+        Create a property for all elements of the state block as one
+        component, indexed by the index of the state block followed by sets,
+        on the indexed property block. Each element gets a reference to its
+        part of the component under name, so elements can use
+        blk[t, x].name[p] as if the component was declared on the element.
+        If a rule is given, it is called with the state block element and the
+        remaining indices, as a rule for a component on the element would be.
+
+        Args:
+            name: name of the property
+            ctype: type of the component (e.g. Var, Expression, Constraint)
+            sets: sets indexing the property within each element
+            kwargs: arguments for the component
+
+        Returns:
+            the indexed component
+        """
+        n = self.dim()
+        rule = kwargs.pop("rule", None)
+        if rule is not None:
+            def _rule(b, *idx):
+                return rule(self[idx[0] if n == 1 else idx[:n] or None],
+                            *idx[n:])
+            kwargs["rule"] = _rule
+
+        if self._implicit_subsets is not None:
+            index_sets = list(self._implicit_subsets)
+        elif self.is_indexed():
+            index_sets = [self.index_set()]
+        else:
+            index_sets = []
+        comp = ctype(*(index_sets + list(sets)), **kwargs)
+        self.indexed_property_block().add_component(name, comp)
+
+        # Keys of the property within an element, shared by all the views
+        if not sets:
+            keys = None
+        elif len(sets) == 1:
+            keys = list(sets[0])
+        else:
+            keys = list(itertools.product(*sets))
+        self._indexed_property_views.append((name, comp, keys))
+        self._attach_indexed_property(name, comp, keys)
+        return comp
+
+    def _attach_indexed_property(self, name, comp, keys):
+        """
+        Add references to an indexed property to the elements of the state
+        block which do not have them yet. Properties not indexed within an
+        element are referenced directly, and only once the component has
+        data for the element.
+
+        Returns:
+            True if all elements have a reference to the property
+        """
+        complete = True
+        for idx, b in self._data.items():
+            if name in b.__dict__:
+                continue
+            if keys is not None:
+                ref = _IndexedPropertyView(comp, _index_tuple(idx), keys)
+            else:
+                try:
+                    ref = comp[idx]
+                except KeyError:
+                    complete = False
+                    continue
+            object.__setattr__(b, name, ref)
+        return complete
+
+    def _indexed_property(self, blk, attr):
+        """
+        Get property attr of element blk in indexed property mode, building
+        the indexed properties the first time a property is needed. Elements
+        added to the state block later (e.g. by a discretization
+        transformation) get their references here when first used.
+
+        Returns:
+            the property, or None if attr is not an indexed property or the
+            state block is still being constructed
+        """
+        count = self.__dict__.get("_indexed_property_count", None)
+        if count is None:
+            if len(self._data) < len(self.index_set()):
+                # The state block is still being constructed, so properties
+                # used while building its elements are built on each element
+                return None
+            # Properties are attached to the elements as they are added, so
+            # the count is set first to avoid rebuilding them on recursive
+            # calls
+            ip = self.indexed_property_block()
+            object.__setattr__(self, "_indexed_property_count",
+                               len(self._data))
+            profiler = build_profiler.active_profiler()
+            if profiler is None:
+                self.build_indexed_properties(blk.config.parameters)
+            else:
+                with profiler.frame("indexed properties", ip):
+                    self.build_indexed_properties(blk.config.parameters)
+        elif count != len(self._data):
+            complete = True
+            for name, comp, keys in self._indexed_property_views:
+                complete &= self._attach_indexed_property(name, comp, keys)
+            if complete:
+                object.__setattr__(self, "_indexed_property_count",
+                                   len(self._data))
+        return blk.__dict__.get(attr, None)
+
 
 class StateBlockData(ProcessBlockData):
     """
@@ -274,6 +573,10 @@ should be constructed in this state block,
         This works by creating a property calculation by calling the "_"+attr
         function.
 
+        The method used to create each property is looked up in a dispatch
+        table built once per parameter block from the property metadata (see
+        property_dispatch).
+
         A list of __getattr__ calls is maintained in self.__getattrcalls to
         check for recursive loops which maybe useful for debugging. This list
         is cleared after __getattr__ completes successfully.
@@ -282,27 +585,6 @@ should be constructed in this state block,
             attr: an attribute to create and return. Should be a property
                   component.
         """
-
-        def clear_call_list(self, attr):
-            """Local method for cleaning up call list when a call is handled.
-
-                Args:
-                    attr: attribute currently being handled
-            """
-            if self.__getattrcalls[-1] == attr:
-                if len(self.__getattrcalls) <= 1:
-                    del self.__getattrcalls
-                else:
-                    del self.__getattrcalls[-1]
-            else:
-                raise PropertyPackageError(
-                        "{} Trying to remove call {} from __getattr__"
-                        " call list, however this is not the most "
-                        "recent call in the list ({}). This indicates"
-                        " a bug in the __getattr__ calls. Please "
-                        "contact the IDAES developers with this bug."
-                        .format(self.name, attr, self.__getattrcalls[-1]))
-
         # Check that attr is not something we shouldn't touch
         if attr == "domain" or attr.startswith("_"):
             # Don't interfere with anything by getting attributes that are
@@ -322,126 +604,73 @@ should be constructed in this state block,
                                  "to the config block, but _get_config_args "
                                  "failed. This should never happen.")
 
-        # Check for recursive calls
-        try:
-            # Check to see if attr already appears in call list
-            if attr in self.__getattrcalls:
-                # If it does, indicates a recursive loop.
-                if attr == self.__getattrcalls[-1]:
-                    # attr method is calling itself
-                    self.__getattrcalls.append(attr)
-                    raise PropertyPackageError(
-                                    '{} _{} made a recursive call to '
-                                    'itself, indicating a potential '
-                                    'recursive loop. This is generally '
-                                    'caused by the {} method failing to '
-                                    'create the {} component.'
-                                    .format(self.name, attr, attr, attr))
-                else:
-                    self.__getattrcalls.append(attr)
-                    raise PropertyPackageError(
-                                    '{} a potential recursive loop has been '
-                                    'detected whilst trying to construct {}. '
-                                    'A method was called, but resulted in a '
-                                    'subsequent call to itself, indicating a '
-                                    'recursive loop. This may be caused by a '
-                                    'method trying to access a component out '
-                                    'of order for some reason (e.g. it is '
-                                    'declared later in the same method). See '
-                                    'the __getattrcalls object for a list of '
-                                    'components called in the __getattr__ '
-                                    'sequence.'
-                                    .format(self.name, attr))
-            # If not, add call to list
-            self.__getattrcalls.append(attr)
-        except AttributeError:
-            # A list of calls if one does not exist, so create one
-            self.__getattrcalls = [attr]
-
-        # Get property information from properties metadata
-        try:
-            m = self.config.parameters.get_metadata().properties
-
-            if m is None:
-                raise PropertyPackageError(
-                        '{} property package get_metadata()'
-                        ' method returned None when trying to create '
-                        '{}. Please contact the developer of the '
-                        'property package'.format(self.name, attr))
-        except KeyError:
-            # If attr not in metadata, assume package does not
-            # support property
-            clear_call_list(self, attr)
-            raise PropertyNotSupportedError(
-                    '{} {} is not supported by property package (property is '
-                    'not listed in package metadata properties).'
-                    .format(self.name, attr, attr))
-
-        # Get method name from resulting properties
-        try:
-            if m[attr]['method'] is None:
-                # If method is none, property should be constructed
-                # by property package, so raise PropertyPackageError
-                clear_call_list(self, attr)
+        # In indexed property mode, properties are components shared by all
+        # elements of the state block
+        if indexed_properties(self.config.parameters):
+            comp = self.parent_component()._indexed_property(self, attr)
+            if comp is not None:
+                return comp
+
+        # Check for recursive calls. The call list is read from __dict__, as
+        # a missing attribute would go through __getattr__ again.
+        calls = self.__dict__.get("_StateBlockData__getattrcalls", None)
+        if calls is None:
+            calls = self.__getattrcalls = [attr]
+        elif attr in calls:
+            # If attr already appears in call list, indicates a recursive
+            # loop.
+            if attr == calls[-1]:
+                # attr method is calling itself
+                calls.append(attr)
                 raise PropertyPackageError(
-                        '{} {} should be constructed automatically '
-                        'by property package, but is not present. '
-                        'This can be caused by methods being called '
-                        'out of order.'.format(self.name, attr))
-            elif m[attr]['method'] is False:
-                # If method is False, package does not support property
-                # Raise NotImplementedError
-                clear_call_list(self, attr)
-                raise PropertyNotSupportedError(
-                        '{} {} is not supported by property package '
-                        '(property method is listed as False in '
-                        'package property metadata).'
-                        .format(self.name, attr))
-            elif isinstance(m[attr]['method'], str):
-                # Try to get method name in from PropertyBlock object
-                try:
-                    f = getattr(self, m[attr]['method'])
-                except AttributeError:
-                    # If fails, method does not exist
-                    clear_call_list(self, attr)
-                    raise PropertyPackageError(
-                            '{} {} package property metadata method '
-                            'returned a name that does not correspond'
-                            ' to any method in the property package. '
-                            'Please contact the developer of the '
-                            'property package.'.format(self.name, attr))
+                                '{} _{} made a recursive call to '
+                                'itself, indicating a potential '
+                                'recursive loop. This is generally '
+                                'caused by the {} method failing to '
+                                'create the {} component.'
+                                .format(self.name, attr, attr, attr))
             else:
-                # Otherwise method name is invalid
-                clear_call_list(self, attr)
+                calls.append(attr)
                 raise PropertyPackageError(
-                             '{} {} package property metadata method '
-                             'returned invalid value for method name. '
-                             'Please contact the developer of the '
-                             'property package.'
-                             .format(self.name, attr))
-        except KeyError:
-            # No method key - raise Exception
-            # Need to use an AttributeError so Pyomo.DAE will handle this
-            clear_call_list(self, attr)
-            raise PropertyNotSupportedError(
-                    '{} package property metadata method '
-                    'does not contain a method for {}. '
-                    'Please select a package which supports '
-                    'the necessary properties for your process.'
-                    .format(self.name, attr))
+                                '{} a potential recursive loop has been '
+                                'detected whilst trying to construct {}. '
+                                'A method was called, but resulted in a '
+                                'subsequent call to itself, indicating a '
+                                'recursive loop. This may be caused by a '
+                                'method trying to access a component out '
+                                'of order for some reason (e.g. it is '
+                                'declared later in the same method). See '
+                                'the __getattrcalls object for a list of '
+                                'components called in the __getattr__ '
+                                'sequence.'
+                                .format(self.name, attr))
+        else:
+            # If not, add call to list
+            calls.append(attr)
+
+        try:
+            f = self._property_method(attr)
+        except AttributeError:
+            self._clear_getattr_call(attr)
+            raise
 
         # Call attribute if it is callable
         # If this fails, it should return a meaningful error.
         if callable(f):
             try:
-                f()
+                profiler = build_profiler.active_profiler()
+                if profiler is None:
+                    f()
+                else:
+                    with profiler.frame("property " + attr, self):
+                        f()
             except Exception:
                 # Clear call list and reraise error
-                clear_call_list(self, attr)
+                self._clear_getattr_call(attr)
                 raise
         else:
             # If f is not callable, inform the user and clear call list
-            clear_call_list(self, attr)
+            self._clear_getattr_call(attr)
             raise PropertyPackageError(
                     '{} tried calling attribute {} in order to create '
                     'component {}. However the method is not callable.'
@@ -449,5 +678,85 @@ should be constructed in this state block,
 
         # Clear call list, and return
         comp = getattr(self, attr)
-        clear_call_list(self, attr)
+        self._clear_getattr_call(attr)
         return comp
+
+    def _clear_getattr_call(self, attr):
+        """
+        Clean up the __getattr__ call list when a call is handled.
+
+        Args:
+            attr: attribute currently being handled
+        """
+        calls = self.__getattrcalls
+        if calls[-1] == attr:
+            if len(calls) <= 1:
+                del self.__getattrcalls
+            else:
+                del calls[-1]
+        else:
+            raise PropertyPackageError(
+                    "{} Trying to remove call {} from __getattr__"
+                    " call list, however this is not the most "
+                    "recent call in the list ({}). This indicates"
+                    " a bug in the __getattr__ calls. Please "
+                    "contact the IDAES developers with this bug."
+                    .format(self.name, attr, calls[-1]))
+
+    def _property_method(self, attr):
+        """
+        Get the bound method which creates property attr, raising the
+        appropriate PropertyPackageError or PropertyNotSupportedError if
+        there is none.
+        """
+        dispatch = property_dispatch(self.config.parameters)
+        if dispatch is None:
+            raise PropertyPackageError(
+                    '{} property package get_metadata()'
+                    ' method returned None when trying to create '
+                    '{}. Please contact the developer of the '
+                    'property package'.format(self.name, attr))
+        method = dispatch.get(attr, _NOT_IN_METADATA)
+        if isinstance(method, str):
+            try:
+                return getattr(self, method)
+            except AttributeError:
+                # If fails, method does not exist
+                raise PropertyPackageError(
+                        '{} {} package property metadata method '
+                        'returned a name that does not correspond'
+                        ' to any method in the property package. '
+                        'Please contact the developer of the '
+                        'property package.'.format(self.name, attr))
+        elif method is None:
+            # If method is none, property should be constructed
+            # by property package, so raise PropertyPackageError
+            raise PropertyPackageError(
+                    '{} {} should be constructed automatically '
+                    'by property package, but is not present. '
+                    'This can be caused by methods being called '
+                    'out of order.'.format(self.name, attr))
+        elif method is False:
+            # If method is False, package does not support property
+            raise PropertyNotSupportedError(
+                    '{} {} is not supported by property package '
+                    '(property method is listed as False in '
+                    'package property metadata).'
+                    .format(self.name, attr))
+        elif method is _NOT_IN_METADATA:
+            # No method key - raise Exception
+            # Need to use an AttributeError so Pyomo.DAE will handle this
+            raise PropertyNotSupportedError(
+                    '{} package property metadata method '
+                    'does not contain a method for {}. '
+                    'Please select a package which supports '
+                    'the necessary properties for your process.'
+                    .format(self.name, attr))
+        else:
+            # Otherwise method name is invalid
+            raise PropertyPackageError(
+                         '{} {} package property metadata method '
+                         'returned invalid value for method name. '
+                         'Please contact the developer of the '
+                         'property package.'
+                         .format(self.name, attr))
@@ -30,6 +30,7 @@ from idaes.core.util.config import (is_physical_parameter_block,
                                     is_reaction_parameter_block,
                                     is_state_block)
 from idaes.core.util.misc import add_object_reference
+from idaes.core.util import build_profiler
 
 # Some more information about this module
 __author__ = "Andrew Lee, John Eslick"
@@ -404,7 +405,12 @@ should be constructed in this reaction block,
         # If this fails, it should return a meaningful error.
         if callable(f):
             try:
-                f()
+                profiler = build_profiler.active_profiler()
+                if profiler is None:
+                    f()
+                else:
+                    with profiler.frame("property " + attr, self):
+                        f()
             except Exception:
                 # Clear call list and reraise error
                 clear_call_list(self, attr)
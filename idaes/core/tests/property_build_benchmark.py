@@ -0,0 +1,62 @@
+##############################################################################
+# Institute for the Design of Advanced Energy Systems Process Systems
+# Engineering Framework (IDAES PSE Framework) Copyright (c) 2018-2019, by the
+# software owners: The Regents of the University of California, through
+# Lawrence Berkeley National Laboratory,  National Technology & Engineering
+# Solutions of Sandia, LLC, Carnegie Mellon University, West Virginia
+# University Research Corporation, et al. All rights reserved.
+#
+# Please see the files COPYRIGHT.txt and LICENSE.txt for full copyright and
+# license information, respectively. Both files are also available online
+# at the URL "https://github.com/IDAES/idaes-pse".
+##############################################################################
+"""
+Time building on-demand properties for all elements of an indexed BTX ideal
+VLE state block, through StateBlockData.__getattr__ and, where available,
+StateBlock.build_property. This is a script, not a test; run it with
+
+    python property_build_benchmark.py [number of elements]
+"""
+from __future__ import print_function
+
+import sys
+import time
+
+from pyomo.environ import ConcreteModel, Set
+
+from idaes.core import FlowsheetBlock
+from idaes.property_models.ideal.BTX_ideal_VLE import BTXParameterBlock
+
+
+def build(n):
+    """Build an indexed BTX state block with n elements."""
+    m = ConcreteModel()
+    m.fs = FlowsheetBlock(default={"dynamic": False})
+    m.fs.properties = BTXParameterBlock()
+    m.fs.s = Set(initialize=range(n))
+    m.fs.sb = m.fs.properties.state_block_class(
+        m.fs.s, default={"parameters": m.fs.properties})
+    return m
+
+
+def main(n=2000, props=("enth_mol_phase", "entr_mol_phase")):
+    t0 = time.time()
+    m = build(n)
+    print("{} elements, build state block: {:.2f} s".format(
+        n, time.time() - t0))
+    for prop in props:
+        t0 = time.time()
+        for k in m.fs.s:
+            getattr(m.fs.sb[k], prop)
+        print("  {} through __getattr__: {:.2f} s".format(
+            prop, time.time() - t0))
+    if hasattr(m.fs.sb, "build_property"):
+        m = build(n)
+        t0 = time.time()
+        m.fs.sb.build_property(*props)
+        print("  {} with build_property: {:.2f} s".format(
+            " and ".join(props), time.time() - t0))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -15,14 +15,21 @@ Tests for flowsheet_model.
 
 Author: Andrew Lee
 """
+import multiprocessing
+import os
+
 import pytest
 from pyomo.environ import AbstractModel, Block, ConcreteModel, Set, Var
 from pyomo.dae import ContinuousSet
+from pyomo.network import Arc, Port
 from idaes.core import FlowsheetBlockData, declare_process_block_class, \
-                        PhysicalParameterBlock, useDefault
+                        PhysicalParameterBlock, useDefault, FlowsheetBlock, \
+                        UnitModelBlockData
+from idaes.core.flowsheet_model import _select_tears, _dependency_levels
 from idaes.ui.report import degrees_of_freedom
 from idaes.core.util.misc import add_object_reference
 from idaes.core.util.exceptions import ConfigurationError, DynamicError
+from idaes.core.util.initialization import InitializationCache
 
 
 @declare_process_block_class("Flowsheet")
@@ -280,3 +287,184 @@ def test_setup_dynamics_sub_dynamic_external_invalid():
     m.fs.sub = Flowsheet(default={"dynamic": True, "time": m.s})
     with pytest.raises(DynamicError):
         m.fs.sub._setup_dynamics()
+
+
+@declare_process_block_class("_SourceUnit")
+class _SourceUnitData(UnitModelBlockData):
+    def build(self):
+        super(_SourceUnitData, self).build()
+        self.x = Var(initialize=1.0)
+        self.outlet = Port(initialize={"x": self.x})
+
+    def initialize(self, outlvl=0, solver='ipopt', optarg=None):
+        pass
+
+
+@declare_process_block_class("_MixUnit")
+class _MixUnitData(UnitModelBlockData):
+    def build(self):
+        super(_MixUnitData, self).build()
+        self.x1 = Var(initialize=0.0)
+        self.x2 = Var(initialize=0.0)
+        self.x = Var(initialize=0.0)
+        self.inlet_1 = Port(initialize={"x": self.x1})
+        self.inlet_2 = Port(initialize={"x": self.x2})
+        self.outlet = Port(initialize={"x": self.x})
+        self.calls = 0
+
+    def initialize(self, outlvl=0, solver='ipopt', optarg=None):
+        self.calls += 1
+        self.x.value = self.x1.value + self.x2.value
+
+
+@declare_process_block_class("_SplitUnit")
+class _SplitUnitData(UnitModelBlockData):
+    def build(self):
+        super(_SplitUnitData, self).build()
+        self.x = Var(initialize=0.0)
+        self.x1 = Var(initialize=0.0)
+        self.x2 = Var(initialize=0.0)
+        self.inlet = Port(initialize={"x": self.x})
+        self.outlet_1 = Port(initialize={"x": self.x1})
+        self.outlet_2 = Port(initialize={"x": self.x2})
+
+    def initialize(self, outlvl=0, solver='ipopt', optarg=None, frac=0.5):
+        self.x1.value = frac*self.x.value
+        self.x2.value = (1 - frac)*self.x.value
+
+
+def _recycle_flowsheet():
+    # source -> mix -> split -> product, with split recycled back to mix
+    m = ConcreteModel()
+    m.fs = FlowsheetBlock(default={"dynamic": False})
+    m.fs.product = _MixUnit()
+    m.fs.split = _SplitUnit()
+    m.fs.mix = _MixUnit()
+    m.fs.source = _SourceUnit()
+    m.fs.s01 = Arc(source=m.fs.source.outlet, destination=m.fs.mix.inlet_1)
+    m.fs.s02 = Arc(source=m.fs.mix.outlet, destination=m.fs.split.inlet)
+    m.fs.s03 = Arc(source=m.fs.split.outlet_1, destination=m.fs.mix.inlet_2)
+    m.fs.s04 = Arc(source=m.fs.split.outlet_2,
+                   destination=m.fs.product.inlet_1)
+    return m
+
+
+def test_initialization_order():
+    m = _recycle_flowsheet()
+    levels, tears = m.fs.initialization_order()
+    # the loop is entered at the mixer, so the recycle stream is torn
+    assert tears == [m.fs.s03]
+    assert [[u.local_name for u in lvl] for lvl in levels] == \
+        [["source"], ["mix"], ["split"], ["product"]]
+
+    levels, tears = m.fs.initialization_order(tear_arcs=[m.fs.s02])
+    assert tears == [m.fs.s02]
+    assert [[u.local_name for u in lvl] for lvl in levels] == \
+        [["split", "source"], ["product", "mix"]]
+
+
+@pytest.mark.parametrize("method", ["direct", "wegstein"])
+def test_initialize_recycle(method):
+    m = _recycle_flowsheet()
+    m.fs.source.x.value = 2.0
+    m.fs.initialize(method=method, max_iter=50, tol=1e-8)
+    # recycle r = 0.5*(2 + r)
+    assert m.fs.mix.x2.value == pytest.approx(2.0, rel=1e-6)
+    assert m.fs.mix.x.value == pytest.approx(4.0, rel=1e-6)
+    assert m.fs.product.x.value == pytest.approx(2.0, rel=1e-6)
+    if method == "wegstein":
+        # linear problem, so Wegstein converges in a few passes
+        assert m.fs.mix.calls <= 4
+    else:
+        assert m.fs.mix.calls > 10
+
+
+def test_initialize_cache(tmpdir):
+    cache = InitializationCache(str(tmpdir))
+    m = _recycle_flowsheet()
+    m.fs.source.x.value = 2.0
+    m.fs.initialize(tol=1e-8, cache=cache)
+    assert m.fs.mix.calls > 0
+    # the source has no inputs, so only its first initialization is a miss
+    assert cache.misses >= m.fs.mix.calls + 1
+
+    # a second flowsheet with the same inputs doesn't call initialize
+    m = _recycle_flowsheet()
+    m.fs.source.x.value = 2.0
+    m.fs.initialize(tol=1e-8, cache=cache)
+    assert m.fs.mix.calls == 0
+    assert m.fs.product.calls == 0
+    assert m.fs.product.x.value == pytest.approx(2.0, rel=1e-6)
+
+
+def test_initialize_unit_args():
+    m = _recycle_flowsheet()
+    m.fs.source.x.value = 2.0
+    m.fs.initialize(unit_args={m.fs.split: {"frac": 0.75}}, tol=1e-8)
+    # recycle r = 0.75*(2 + r)
+    assert m.fs.mix.x2.value == pytest.approx(6.0, rel=1e-6)
+
+
+def test_initialize_bad_method():
+    m = _recycle_flowsheet()
+    with pytest.raises(ConfigurationError):
+        m.fs.initialize(method="newton")
+
+
+def test_select_tears():
+    # two loops sharing node 1: 0 -> 1 -> 2 -> 1 and 1 -> 3 -> 0
+    edges = [(0, 1), (1, 2), (2, 1), (1, 3), (3, 0), (3, 4)]
+    tears = _select_tears(5, edges)
+    levels = _dependency_levels(5, edges, tears)
+    assert sum(len(lvl) for lvl in levels) == 5
+    with pytest.raises(ValueError):
+        _dependency_levels(5, edges, [])
+
+
+@declare_process_block_class("_PidUnit")
+class _PidUnitData(_MixUnitData):
+    def build(self):
+        super(_PidUnitData, self).build()
+        self.pid = Var(initialize=0)
+
+    def initialize(self, outlvl=0, solver='ipopt', optarg=None):
+        super(_PidUnitData, self).initialize(outlvl, solver, optarg)
+        self.pid.value = os.getpid()
+
+
+def _branch_flowsheet():
+    # source -> split -> two independent branches
+    m = ConcreteModel()
+    m.fs = FlowsheetBlock(default={"dynamic": False})
+    m.fs.source = _SourceUnit()
+    m.fs.split = _SplitUnit()
+    m.fs.a = _PidUnit()
+    m.fs.b = _PidUnit()
+    m.fs.s01 = Arc(source=m.fs.source.outlet, destination=m.fs.split.inlet)
+    m.fs.s02 = Arc(source=m.fs.split.outlet_1, destination=m.fs.a.inlet_1)
+    m.fs.s03 = Arc(source=m.fs.split.outlet_2, destination=m.fs.b.inlet_1)
+    return m
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(),
+                    reason="fork not available")
+def test_initialize_parallel_levels():
+    m = _branch_flowsheet()
+    levels, tears = m.fs.initialization_order()
+    assert [[u.local_name for u in lvl] for lvl in levels] == \
+        [["source"], ["split"], ["a", "b"]]
+    m.fs.source.x.value = 4.0
+    m.fs.initialize(workers=2,
+                    unit_args={m.fs.split: {"frac": 0.25}})
+    assert m.fs.a.x.value == pytest.approx(1.0)
+    assert m.fs.b.x.value == pytest.approx(3.0)
+    # branch units were initialized in worker processes and their state
+    # loaded back
+    assert m.fs.a.pid.value not in (0, os.getpid())
+    assert m.fs.b.pid.value not in (0, os.getpid())
+
+    m = _branch_flowsheet()
+    m.fs.source.x.value = 4.0
+    m.fs.initialize(workers=1)
+    assert m.fs.a.x.value == pytest.approx(2.0)
+    assert m.fs.a.pid.value == os.getpid()
@@ -17,9 +17,10 @@ Author: Andrew Lee
 """
 import pytest
 from pyomo.environ import ConcreteModel, Constraint, Var
-from pyomo.common.config import ConfigBlock
+from pyomo.common.config import ConfigBlock, ConfigValue
 from idaes.core import (declare_process_block_class, PhysicalParameterBlock,
                         StateBlock, StateBlockData)
+from idaes.core.property_base import indexed_properties, property_dispatch
 from idaes.core.util.exceptions import (PropertyPackageError,
                                         PropertyNotSupportedError)
 
@@ -237,3 +238,94 @@ def test_getattr_raise_exception(m):
 #def test_getattr_does_not_create_component(m):
 #    with pytest.raises(PropertyPackageError):
 #        m.p.cons = Constraint(expr=m.p.does_not_create_component == 1)
+
+
+def test_property_dispatch(m):
+    d = property_dispatch(m.pb)
+    assert d["a"] == "a_method"
+    assert d["not_supported"] is False
+    assert "does_not_exist" not in d
+    # the table is built once per parameter block
+    assert property_dispatch(m.pb) is d
+    m.p.a
+    assert "_StateBlockData__getattrcalls" not in m.p.__dict__
+
+
+def test_build_property():
+    m = ConcreteModel()
+    m.pb = Parameters()
+    m.p = State([1, 2, 3], default={"parameters": m.pb})
+    m.p[2].a.value = 2
+    m.p.build_property("a")
+    for i in [1, 2, 3]:
+        assert isinstance(m.p[i].a, Var)
+    # existing properties are not rebuilt
+    assert m.p[2].a.value == 2
+
+    with pytest.raises(PropertyNotSupportedError):
+        m.p.build_property("not_supported")
+    with pytest.raises(PropertyPackageError):
+        m.p.build_property("recursion1")
+    # same exception types as creating properties one element at a time
+    with pytest.raises(PropertyPackageError):
+        m.p.build_property("not_callable")
+    with pytest.raises(PropertyNotSupportedError):
+        m.p.build_property("does_not_exist")
+    assert "_StateBlockData__getattrcalls" not in m.p[1].__dict__
+
+
+# -----------------------------------------------------------------------------
+# Test indexed property mode
+@declare_process_block_class("IndexedParameters")
+class _IndexedParameters(PhysicalParameterBlock):
+    CONFIG = PhysicalParameterBlock.CONFIG()
+    CONFIG.declare("indexed_properties", ConfigValue(default=True))
+
+    def build(self):
+        super(_IndexedParameters, self).build()
+
+    @classmethod
+    def define_metadata(cls, obj):
+        obj.add_properties({'a': {'method': None},
+                            'b': {'method': None}})
+
+
+class _IndexedStateBlock(StateBlock):
+    def build_indexed_properties(self, params):
+        self.add_indexed_property("a", Var, [1, 2], initialize=1)
+        self.add_indexed_property(
+            "b", Constraint, rule=lambda blk: blk.a[1] == blk.a[2])
+
+
+@declare_process_block_class("IndexedState", block_class=_IndexedStateBlock)
+class _IndexedState(StateBlockData):
+    def build(self):
+        super(_IndexedState, self).build()
+
+
+def test_indexed_properties():
+    m = ConcreteModel()
+    m.pb = IndexedParameters()
+    m.p = IndexedState([1, 2, 3], default={"parameters": m.pb})
+
+    assert indexed_properties(m.pb)
+    assert m.p[2].a[1] is m.p_indexed.a[2, 1]
+    assert list(m.p[2].a) == [1, 2]
+    assert m.p[3].b is m.p_indexed.b[3]
+    # one component for each property, not for each element
+    assert len(list(m.component_objects(Var, descend_into=True))) == 1
+    assert len(list(m.component_objects(Constraint, descend_into=True))) == 1
+
+    with pytest.raises(PropertyNotSupportedError):
+        m.p[1].does_not_exist
+
+
+def test_indexed_properties_not_supported():
+    m = ConcreteModel()
+    m.pb = IndexedParameters()
+    m.pb2 = Parameters()
+    m.p = State(default={"parameters": m.pb})
+
+    assert not indexed_properties(m.pb2)
+    with pytest.raises(NotImplementedError):
+        m.p.a
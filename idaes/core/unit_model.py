@@ -31,6 +31,7 @@ from .control_volume_base import ControlVolumeBlockData, FlowDirection
 from idaes.core.util.exceptions import (BurntToast,
                                         ConfigurationError,
                                         PropertyPackageError)
+from idaes.core.util.build_profiler import build_step
 
 __author__ = "John Eslick, Qi Chen, Andrew Lee"
 
@@ -113,6 +114,7 @@ Must be True if dynamic = True,
         except AttributeError:
             pass
 
+    @build_step
     def add_port(blk, name=None, block=None, doc=None):
         """
         This is a method to build Port objects in a unit model and
@@ -156,6 +158,7 @@ Must be True if dynamic = True,
 
         return p
 
+    @build_step
     def add_inlet_port(blk, name=None, block=None, doc=None):
         """
         This is a method to build inlet Port objects in a unit model and
@@ -303,6 +306,7 @@ Must be True if dynamic = True,
 
         return p
 
+    @build_step
     def add_outlet_port(blk, name=None, block=None, doc=None):
         """
         This is a method to build outlet Port objects in a unit model and
@@ -1,2 +1,3 @@
-from .model_serializer import to_json, from_json, StoreSpec
+from .model_serializer import to_json, from_json, StoreSpec, StateSnapshot, \
+    to_npz, from_npz
 from .misc import svg_tag, copy_port_values, TagReference
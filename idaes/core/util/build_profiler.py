@@ -0,0 +1,271 @@
+##############################################################################
+# Institute for the Design of Advanced Energy Systems Process Systems
+# Engineering Framework (IDAES PSE Framework) Copyright (c) 2018-2019, by the
+# software owners: The Regents of the University of California, through
+# Lawrence Berkeley National Laboratory,  National Technology & Engineering
+# Solutions of Sandia, LLC, Carnegie Mellon University, West Virginia
+# University Research Corporation, et al. All rights reserved.
+#
+# Please see the files COPYRIGHT.txt and LICENSE.txt for full copyright and
+# license information, respectively. Both files are also available online
+# at the URL "https://github.com/IDAES/idaes-pse".
+##############################################################################
+"""
+Profiler for the construction of IDAES models.  While a BuildProfiler is
+active, the build() of every ProcessBlockData, the build steps of control
+volumes and unit models (methods decorated with build_step) and the
+construction of properties on demand in state blocks are timed.
+
+Example:
+
+    with BuildProfiler() as prof:
+        m.fs.unit = Heater(default={"property_package": m.fs.properties})
+    print(prof.report())
+    prof.write_folded("build.folded")  # for flamegraph.pl or speedscope
+"""
+from __future__ import division
+
+import functools
+import time
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+
+__all__ = ['BuildProfiler', 'build_step', 'active_profiler']
+
+# The currently active BuildProfiler, None if profiling is off
+_active = None
+
+
+def active_profiler():
+    """
+    Return the active BuildProfiler or None if build profiling is off.
+    """
+    return _active
+
+
+def build_step(f):
+    """
+    Decorator for methods that are steps of a build, so they show up in the
+    build profile.  If no profiler is active the method is called directly.
+    """
+    @functools.wraps(f)
+    def wrapper(self, *args, **kwargs):
+        if _active is None:
+            return f(self, *args, **kwargs)
+        with _active.frame(_active._step_label(f.__name__, self), self):
+            return f(self, *args, **kwargs)
+    return wrapper
+
+
+def _block_label(b):
+    """
+    Profile label of a block, elements of an indexed block share a label.
+    """
+    c = b.parent_component()
+    cls = getattr(getattr(c, "_ComponentDataClass", None), "_orig_name",
+                  type(c).__name__)
+    return "{} ({})".format(c.local_name, cls)
+
+
+def _count_components(b, start):
+    """
+    Count component data objects declared on b since it had start
+    components.
+    """
+    n = 0
+    for c, i in b._decl_order[start:]:
+        if c is not None:
+            n += len(c) if c.is_indexed() else 1
+    return n
+
+
+class _BuildFrame(object):
+    """
+    Profile of a build step.  The time, components and memory include the
+    children.
+    """
+    __slots__ = ("label", "calls", "time", "components", "memory",
+                 "children")
+
+    def __init__(self, label):
+        self.label = label
+        self.calls = 0
+        self.time = 0.0
+        self.components = 0
+        self.memory = 0
+        self.children = OrderedDict()
+
+    def child(self, label):
+        f = self.children.get(label, None)
+        if f is None:
+            f = self.children[label] = _BuildFrame(label)
+        return f
+
+    @property
+    def self_time(self):
+        return self.time - sum(c.time for c in self.children.values())
+
+
+class BuildProfiler(object):
+    """
+    Record the wall time, the number of component data objects created and
+    the memory allocated for each block build and build step.  Frames are
+    merged by label, so the elements of an indexed block are reported
+    together with the number of calls.  The component count of a frame is
+    the number of component data objects declared directly on the frame's
+    block during the frame, so components of sub-blocks are counted in the
+    sub-block frames.
+
+    Use as a context manager, or call enable() and disable().  Only one
+    profiler can be active at a time, profiles accumulate if the same
+    profiler is enabled again.
+
+    Args:
+        trace_memory: if True, measure memory allocated with tracemalloc.
+            This slows down the model construction, so the timings are less
+            accurate (default = True)
+    """
+    def __init__(self, trace_memory=True):
+        """
+        (see above)
+        """
+        self.trace_memory = trace_memory
+        self.root = _BuildFrame("build")
+        self._stack = [self.root]
+        self._blocks = [None]
+        self._started_tracing = False
+        self._t0 = None
+
+    def enable(self):
+        """
+        Start profiling.
+        """
+        global _active
+        if _active is not None and _active is not self:
+            raise RuntimeError("Another BuildProfiler is already active")
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._t0 = time.perf_counter()
+        _active = self
+
+    def disable(self):
+        """
+        Stop profiling.
+        """
+        global _active
+        if _active is self:
+            _active = None
+            self.root.time += time.perf_counter() - self._t0
+            self.root.calls += 1
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disable()
+
+    @contextmanager
+    def frame(self, label, block):
+        """
+        Context manager to profile a build step on a block.
+
+        Args:
+            label: name of the step, frames with the same label and parent
+                are merged
+            block: block the step adds components to
+        """
+        f = self._stack[-1].child(label)
+        n0 = len(block._decl_order)
+        mem0 = tracemalloc.get_traced_memory()[0] \
+            if self.trace_memory else 0
+        self._stack.append(f)
+        self._blocks.append(block)
+        t0 = time.perf_counter()
+        try:
+            yield f
+        finally:
+            f.time += time.perf_counter() - t0
+            self._stack.pop()
+            self._blocks.pop()
+            f.calls += 1
+            f.components += _count_components(block, n0)
+            if self.trace_memory and tracemalloc.is_tracing():
+                f.memory += tracemalloc.get_traced_memory()[0] - mem0
+
+    def _step_label(self, name, block):
+        """
+        Label of a build step.  Steps on a block other than the one being
+        built, e.g. a unit model adding state blocks to its control volume,
+        are prefixed with the block name.
+        """
+        if block is self._blocks[-1]:
+            return name
+        return "{}.{}".format(block.parent_component().local_name, name)
+
+    def block(self, b):
+        """
+        Context manager to profile the build of a block.
+        """
+        return self.frame(_block_label(b), b)
+
+    def _walk(self, f=None, depth=0, path=()):
+        if f is None:
+            for c in self.root.children.values():
+                for x in self._walk(c, 0, ()):
+                    yield x
+            return
+        path = path + (f.label,)
+        yield f, depth, path
+        for c in f.children.values():
+            for x in self._walk(c, depth + 1, path):
+                yield x
+
+    def report(self, min_time=0.0):
+        """
+        Create a text report of the build profile.  Each line shows the
+        total time, the time not spent in child frames, the number of calls,
+        the number of component data objects and the memory allocated.
+
+        Args:
+            min_time: do not report frames that took less time (s)
+
+        Returns:
+            str
+        """
+        lines = ["{:>10} {:>10} {:>7} {:>10} {:>10}  {}".format(
+            "time (s)", "self (s)", "calls", "components", "mem (MB)",
+            "step")]
+        for f, depth, path in self._walk():
+            if f.time < min_time:
+                continue
+            lines.append("{:10.4f} {:10.4f} {:7d} {:10d} {:10.3f}  {}{}"
+                         .format(f.time, f.self_time, f.calls, f.components,
+                                 f.memory/2**20, "  "*depth, f.label))
+        return "\n".join(lines)
+
+    def folded(self):
+        """
+        Return the profile in the folded stack format used by flamegraph.pl
+        and speedscope.  Each line is a semicolon separated stack followed
+        by the self time in microseconds.
+        """
+        lines = []
+        for f, depth, path in self._walk():
+            us = int(round(f.self_time*1e6))
+            if us > 0:
+                lines.append("{} {}".format(
+                    ";".join(p.replace(";", ",") for p in path), us))
+        return "\n".join(lines) + "\n"
+
+    def write_folded(self, fname):
+        """
+        Write the profile in the folded stack format to a file.
+        """
+        with open(fname, "w") as f:
+            f.write(self.folded())
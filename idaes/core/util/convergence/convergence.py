@@ -45,17 +45,73 @@ should be done once by the  model developer for a few different sample sizes)::
          -e idaes.models.convergence.pressure_changer.
              pressure_changer_conv_eval.PressureChangerConvergenceEvaluation
 
+By default, samples are drawn from a normal distribution and clipped to the
+bounds. Use --method to draw samples from the normal distribution truncated to
+the bounds (truncated_normal), or a space-filling Latin hypercube (lhs) or
+Sobol (sobol) design. These are written in a compact columnar format, which
+is better suited to large sample files::
+
+   $ python ../../../core/util/convergence/convergence.py create-sample-file
+         -s PressureChanger-100000.json -N 100000 --seed=42 --method=lhs
+         -e idaes.models.convergence.pressure_changer.
+             pressure_changer_conv_eval.PressureChangerConvergenceEvaluation
+
 More commonly, to run the convergence evaluation::
 
    $ python ../../../core/util/convergence/convergence.py run-eval
          -s PressureChanger-10.json
 
+If building and initializing the model is expensive compared to the solve,
+the model can be created once per process and its initialized state restored
+before each sample::
+
+   $ python ../../../core/util/convergence/convergence.py run-eval
+         -s PressureChanger-10.json --reuse-model
+
 Note that the convergence evaluation can also be run in parallel if you have
 installed MPI and mpi4py using a command line like the following::
 
    $ mpirun -np 4 python ../../../core/util/convergence/convergence.py run-eval
          -s PressureChanger-10.json
 
+With --checkpoint, the result of each sample is saved in a checkpoint
+directory as soon as it finishes (by default, the sample file path with
+.checkpoint as the extension, or the directory given after --checkpoint)::
+
+   $ python ../../../core/util/convergence/convergence.py run-eval
+         -s PressureChanger-10.json --checkpoint
+
+If a run is stopped, it can be continued with --resume, which only runs the
+samples without saved results in the checkpoint directory, and reports the
+statistics for all of the samples. --resume implies --checkpoint::
+
+   $ python ../../../core/util/convergence/convergence.py run-eval
+         -s PressureChanger-10.json --resume
+
+Samples far from the nominal point can be hard to solve from the initialized
+model. With --warm-start, the samples are run along a nearest-neighbour path
+through the input space, and each sample starts from the solution of the
+closest sample that has already been solved::
+
+   $ python ../../../core/util/convergence/convergence.py run-eval
+         -s PressureChanger-10.json --warm-start
+
+Without MPI, the samples are run serially by default. They can be run in a
+pool of local worker processes by setting the number of workers with
+--workers::
+
+   $ python ../../../core/util/convergence/convergence.py run-eval
+         -s PressureChanger-10.json --workers 4
+
+By default each process is given an equal block of samples. Since solve times
+can vary a lot over the sampled space, --dynamic can be used to hand out the
+samples one at a time as processes become free (with MPI, rank 0 then only
+schedules the samples). The utilization of each process is reported with the
+statistics::
+
+   $ mpirun -np 5 python ../../../core/util/convergence/convergence.py run-eval
+         -s PressureChanger-10.json --dynamic
+
 """
 import argparse
 import logging
@@ -117,6 +173,44 @@ def _parse_arguments():
                                       metavar='DIR', default=None,
                                       help='Use DMF configuration at DIR '
                                            '(default=do not use DMF)')
+    run_report_subparser.add_argument('--reuse-model', dest='reuse_model',
+                                      action='store_true', default=False,
+                                      help='Build and initialize the model'
+                                           ' once per process and restore its'
+                                           ' saved state before each sample'
+                                           ' instead of rebuilding it')
+    run_report_subparser.add_argument('--workers', dest='workers',
+                                      type=int, default=None, metavar='N',
+                                      help='Number of local worker processes'
+                                           ' to use when not running under'
+                                           ' MPI (default=run the samples'
+                                           ' serially)')
+    run_report_subparser.add_argument('--dynamic', dest='dynamic',
+                                      action='store_true', default=False,
+                                      help='Hand out samples to processes'
+                                           ' one at a time as they become'
+                                           ' free, instead of in equal'
+                                           ' blocks')
+    run_report_subparser.add_argument('--checkpoint', dest='checkpoint_dir',
+                                      metavar='DIR', nargs='?', const='',
+                                      default=None,
+                                      help='Save the result of each sample'
+                                           ' in DIR when it finishes'
+                                           ' (default DIR=the sample file'
+                                           ' path with the extension'
+                                           ' replaced by .checkpoint)')
+    run_report_subparser.add_argument('--resume', dest='resume',
+                                      action='store_true', default=False,
+                                      help='Only run the samples that do not'
+                                           ' have results in the checkpoint'
+                                           ' directory (implies'
+                                           ' --checkpoint)')
+    run_report_subparser.add_argument('--warm-start', dest='warm_start',
+                                      action='store_true', default=False,
+                                      help='Run the samples along a nearest'
+                                           ' neighbour path and start each'
+                                           ' solve from the solution of the'
+                                           ' closest solved sample')
     run_report_subparser.add_argument('-v', '--verbose', dest='vb',
                                       action='count', default=0,
                                       help='Increase output verbosity')
@@ -172,6 +266,19 @@ def _parse_arguments():
                 metavar='seed',
                 dest='seed')
 
+    create_sample_file_subparser.add_argument(
+                '-m', '--method',
+                default='clipped_normal',
+                type=str,
+                choices=['clipped_normal', 'truncated_normal', 'lhs', 'sobol'],
+                required=False,
+                help="Used with subcommands: 'create-sample-file'. The"
+                     " sampling method: normal samples clipped to the bounds"
+                     " (default), normal samples truncated to the bounds,"
+                     " Latin hypercube or Sobol sampling. All but the default"
+                     " are written in a compact columnar format.",
+                dest='method')
+
     return parser.parse_args()
 
 
@@ -206,7 +313,8 @@ def main():
                              convergence_evaluation_class_str=
                                  args.convergence_evaluation_class_str,
                              n_points=args.number_samples,
-                             seed=args.seed)
+                             seed=args.seed,
+                             method=args.method)
     else:
         if args.dmfcfg is None:
             dmf = None
@@ -216,9 +324,21 @@ def main():
             except DMFError as err:
                 _log.error('Unable to init DMF: {}'.format(err))
                 return -1
+        checkpoint_dir = args.checkpoint_dir
+        if checkpoint_dir is None and args.resume:
+            checkpoint_dir = ''
+        if checkpoint_dir == '':
+            checkpoint_dir = \
+                os.path.splitext(args.sample_file)[0] + '.checkpoint'
         (inputs, samples, results) = \
             cb.run_convergence_evaluation_from_sample_file(
-                    sample_file=args.sample_file)
+                    sample_file=args.sample_file,
+                    checkpoint_dir=checkpoint_dir,
+                    resume=args.resume,
+                    warm_start=args.warm_start,
+                    reuse_model=args.reuse_model,
+                    workers=args.workers,
+                    dynamic=args.dynamic)
         if results is not None:
             cb.save_convergence_statistics(inputs, results, dmf=dmf)
     return 0
@@ -40,9 +40,11 @@ class from ConvergenceEvaluation, and implement three methods:
     ConvergenceEvaluationSpecification object. There are methods on
     ConvergenceEvaluationSpecification to add inputs. These inputs contain a
     string that identifies a Pyomo Param or Var object, the lower and upper
-    bounds, and the mean and standard deviation to be used for sampling. When
-    samples are generated, they are drawn from a normal distribution, and then
-    truncated by the lower or upper bounds.
+    bounds, and the mean and standard deviation to be used for sampling. By
+    default, samples are drawn from a normal distribution, and then
+    clipped to the lower or upper bounds. Samples can also be drawn from the
+    normal distribution truncated to the bounds, or from a Latin hypercube or
+    Sobol design (see ConvergenceEvaluationSpecification.sample).
 - get_initialized_model: This method should create and return a Pyomo model
     object that is already initialized and ready to be solved. This model will
     be modified according to the sampled inputs, and then it will be solved.
@@ -61,22 +63,35 @@ See the documentation in convergence.py for more information.
 from collections import OrderedDict
 import getpass
 import importlib as il
+import glob
+import collections
 import json
 import logging
 import numpy as np
+import os
+import re
 import sys
+import time
+import uuid
 # third-party
 import six
-# pyomo
 import pyutilib.services
+from scipy.spatial import cKDTree
+from scipy.special import ndtr, ndtri
+# pyomo
 from pyutilib.misc import capture_output
-from pyomo.core import Param, Var
+from pyomo.core import Component, Param, Suffix, Var
+from pyomo.core.base.component import ComponentData
+from pyomo.core.base.var import _VarData
 from pyomo.opt import TerminationCondition
 from pyomo.common.log import LoggingIntercept
 # idaes
 import idaes.core.util.convergence.mpi_utils as mpiu
+from idaes.core.util.model_serializer import to_json, from_json, StoreSpec
 from idaes.dmf import resource
 
+_log = logging.getLogger(__name__)
+
 
 class ConvergenceEvaluationSpecification(object):
     def __init__(self):
@@ -127,6 +142,113 @@ class ConvergenceEvaluationSpecification(object):
     def inputs(self):
         return self._inputs
 
+    def sample(self, n_points, method='clipped_normal', seed=None,
+               distribution='truncated_normal'):
+        """
+        Draw all of the sample points for the inputs at once
+
+        Parameters
+        ----------
+        n_points : int
+           The number of sample points
+        method : str
+           The sampling method, one of:
+
+           - 'clipped_normal': points are drawn from a normal distribution
+             and values outside the bounds are set to the bound (this is the
+             original sampling method, and puts extra weight on the bounds)
+           - 'truncated_normal': points are drawn from the normal
+             distribution truncated to the bounds
+           - 'lhs': Latin hypercube sample, with the marginal distribution
+             given by distribution
+           - 'sobol': scrambled Sobol sequence (requires scipy >= 1.7), with
+             the marginal distribution given by distribution
+        seed : int or None
+           The seed to be used when generating samples. For 'clipped_normal'
+           this seeds the global numpy random state, as in earlier versions.
+        distribution : str
+           Marginal distribution of each input for the 'lhs' and 'sobol'
+           methods, either 'truncated_normal' (default) or 'uniform' (over the
+           bounds)
+
+        Returns
+        -------
+           numpy array with one row per sample point and one column per
+           input (in the order of the inputs)
+        """
+        lower = np.array([v['lower'] for v in six.itervalues(self._inputs)],
+                         dtype=float)
+        upper = np.array([v['upper'] for v in six.itervalues(self._inputs)],
+                         dtype=float)
+        mean = np.array([v['mean'] for v in six.itervalues(self._inputs)],
+                        dtype=float)
+        std = np.array([v['std'] for v in six.itervalues(self._inputs)],
+                       dtype=float)
+        shape = (n_points, len(self._inputs))
+
+        if method == 'clipped_normal':
+            if seed is not None:
+                np.random.seed(seed)
+            # draws in the same order as sampling one input at a time
+            return np.clip(np.random.normal(loc=mean, scale=std, size=shape),
+                           lower, upper)
+
+        rng = np.random.RandomState(seed)
+        if method == 'truncated_normal':
+            u = rng.random_sample(shape)
+            distribution = 'truncated_normal'
+        elif method == 'lhs':
+            # one point in each of n_points equal probability strata for
+            # every input, the strata are paired randomly between inputs
+            strata = np.argsort(rng.random_sample(shape), axis=0)
+            u = (strata + rng.random_sample(shape)) / n_points
+        elif method == 'sobol':
+            try:
+                from scipy.stats import qmc
+            except ImportError:
+                raise ImportError('Sobol sampling requires scipy.stats.qmc'
+                                  ' (scipy >= 1.7)')
+            u = qmc.Sobol(d=shape[1], scramble=True, seed=seed).random(
+                n_points)
+        else:
+            raise ValueError('Unknown sampling method: {}'.format(method))
+
+        if distribution == 'uniform':
+            return lower + u*(upper - lower)
+        elif distribution != 'truncated_normal':
+            raise ValueError(
+                'Unknown sampling distribution: {}'.format(distribution))
+        # invert the cdf of the normal distribution truncated to the bounds
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cdf_lower = ndtr((lower - mean) / std)
+            cdf_upper = ndtr((upper - mean) / std)
+            x = mean + std*ndtri(cdf_lower + u*(cdf_upper - cdf_lower))
+        # inputs with no spread are at the mean
+        x = np.where(std > 0, x, mean)
+        return np.clip(x, lower, upper)
+
+
+def samples_from_columns(sample_file_dict):
+    """
+    Create the sample points dictionary (as stored in the 'samples' entry of
+    a sample file) from the columns of a columnar sample file
+
+    Parameters
+    ----------
+    sample_file_dict : dict
+        Dictionary read from a columnar sample file
+
+    Returns
+    -------
+       OrderedDict of sample points, keyed by the sample name
+    """
+    columns = sample_file_dict['columns']
+    names = list(columns.keys())
+    samples = OrderedDict()
+    for i, row in enumerate(zip(*[columns[k] for k in names])):
+        samples['Sample-{}'.format(i+1)] = OrderedDict(zip(names, row))
+    return samples
+
 
 class ConvergenceEvaluation(object):
     def __init__(self):
@@ -157,6 +279,11 @@ class ConvergenceEvaluation(object):
         values of parameters or variables according to the sampling
         specifications.
 
+        If the evaluation is run with reuse_model=True, this method is only
+        called once per process, and the state of the returned model is saved
+        and restored before each sample, so the model must not depend on the
+        sample point.
+
         Returns
         -------
            Pyomo model : return a Pyomo model object that is initialized and
@@ -194,7 +321,127 @@ def _class_import(class_path):
     return ret_class
 
 
-def _run_ipopt_with_stats(model, solver, max_iter=500, max_cpu_time=120):
+class SolverStatistics(object):
+    """
+    Statistics collected from a single solve of a convergence evaluation
+    sample. The iterations and time are 0, and the other fields are None, if
+    they could not be determined from the solve.
+
+    Attributes
+    ----------
+    termination_condition : str
+       The termination condition reported by the solver
+    iters : int
+       The number of iterations
+    time : float
+       The total solver time (in seconds)
+    time_function_evals : float
+       The time spent in NLP function evaluations (in seconds)
+    time_solver : float
+       The time spent in the solver outside of function evaluations, mostly
+       in linear algebra (in seconds)
+    restoration_iters : int
+       The number of iterations in the restoration phase
+    restoration_phases : int
+       The number of times the restoration phase was entered
+    primal_infeasibility : float
+       The final (unscaled) constraint violation
+    dual_infeasibility : float
+       The final (unscaled) dual infeasibility
+    """
+    # fields in the order they are stored in the result records
+    fields = ('termination_condition', 'iters', 'time', 'time_function_evals',
+              'time_solver', 'restoration_iters', 'restoration_phases',
+              'primal_infeasibility', 'dual_infeasibility')
+
+    # patterns for the summary lines of the ipopt log, the first group is
+    # the value (the unscaled value for the infeasibilities). Handles both
+    # the "CPU secs" (before 3.14) and "seconds" forms of the timing lines.
+    _ipopt_patterns = (
+        ('iters', int,
+         re.compile(r'^Number of Iterations\.*:\s*(\d+)')),
+        ('primal_infeasibility', float,
+         re.compile(r'^Constraint violation\.*:\s*\S+\s+(\S+)')),
+        ('dual_infeasibility', float,
+         re.compile(r'^Dual infeasibility\.*:\s*\S+\s+(\S+)')),
+        ('time_solver', float,
+         re.compile(r'^Total (?:CPU secs|seconds) in IPOPT '
+                    r'\(w/o function evaluations\)\s*=\s*(\S+)')),
+        ('time_function_evals', float,
+         re.compile(r'^Total (?:CPU secs|seconds) in NLP function '
+                    r'evaluations\s*=\s*(\S+)')),
+        ('time', float,
+         re.compile(r'^Total (?:CPU secs|seconds) in IPOPT\s*=\s*(\S+)')))
+
+    # an iteration line of the ipopt log, restoration phase iterations have
+    # an "r" after the iteration number
+    _ipopt_iteration = re.compile(r'^\s*\d+(r?)\s+[-+]?\d')
+
+    def __init__(self):
+        for f in self.fields:
+            setattr(self, f, None)
+
+    @classmethod
+    def from_ipopt(cls, status_obj, log):
+        """
+        Collect the statistics of an ipopt solve from the Pyomo results
+        object and the solver log
+
+        Parameters
+        ----------
+        status_obj : SolverResults
+           The results object returned by the solve
+        log : str or None
+           The output of ipopt. If None, only the termination condition is
+           set and the other statistics are None.
+
+        Returns
+        -------
+           SolverStatistics
+        """
+        stats = cls()
+        stats.termination_condition = \
+            str(status_obj.solver.termination_condition)
+        if log is None:
+            return stats
+
+        stats.restoration_iters = 0
+        stats.restoration_phases = 0
+        in_restoration = False
+        for line in log.splitlines():
+            m = cls._ipopt_iteration.match(line)
+            if m is not None:
+                if m.group(1):
+                    stats.restoration_iters += 1
+                    if not in_restoration:
+                        stats.restoration_phases += 1
+                in_restoration = bool(m.group(1))
+                continue
+            for field, ftype, pattern in cls._ipopt_patterns:
+                m = pattern.match(line)
+                if m is not None:
+                    setattr(stats, field, ftype(m.group(1)))
+                    break
+
+        if stats.time is None and (stats.time_solver is not None or
+                                   stats.time_function_evals is not None):
+            # older versions of ipopt do not report the total time
+            stats.time = 0.0
+            if stats.time_solver is not None:
+                stats.time += stats.time_solver
+            if stats.time_function_evals is not None:
+                stats.time += stats.time_function_evals
+        return stats
+
+    def to_dict(self):
+        """
+        Return the statistics as an OrderedDict with one entry per field
+        """
+        return OrderedDict((f, getattr(self, f)) for f in self.fields)
+
+
+def _run_ipopt_with_stats(model, solver, max_iter=500, max_cpu_time=120,
+                          warm_start=False):
     """
     Run the solver (must be ipopt) and return the convergence statistics
 
@@ -213,45 +460,37 @@ def _run_ipopt_with_stats(model, solver, max_iter=500, max_cpu_time=120):
     max_cpu_time : int
        The maximum cpu time to allow for ipopt (in seconds)
 
+    warm_start : bool
+       If True, tell ipopt to use the initial values of the multipliers
+       (warm_start_init_point)
+
     Returns
     -------
        Returns a tuple with (solve status object, bool (solve successful or
-       not), number of iters, solve time)
+       not), SolverStatistics)
     """
     # ToDo: Check that the "solver" is, in fact, IPOPT
+    opts = {'max_iter': max_iter,
+            'max_cpu_time': max_cpu_time}
+    if warm_start:
+        opts['warm_start_init_point'] = 'yes'
 
     pyutilib.services.TempfileManager.push()
-    tempfile = pyutilib.services.TempfileManager.create_tempfile(
-                        suffix='ipopt_out',
+    logfile = pyutilib.services.TempfileManager.create_tempfile(
+                        suffix='ipopt_log',
                         text=True)
-    opts = {'output_file': tempfile,
-            'max_iter': max_iter,
-            'max_cpu_time': max_cpu_time}
-
-    status_obj = solver.solve(model, options=opts, tee=True)
+    try:
+        status_obj = solver.solve(model, options=opts, logfile=logfile)
+        with open(logfile, 'r') as f:
+            log = f.read()
+    finally:
+        pyutilib.services.TempfileManager.pop(remove=True)
     solved = True
     if status_obj.solver.termination_condition != TerminationCondition.optimal:
         solved = False
 
-    iters = 0
-    time = 0
-    # parse the output file to get the iteration count, solver times, etc.
-    with open(tempfile, 'r') as f:
-        for line in f:
-            if line.startswith('Number of Iterations....:'):
-                tokens = line.split()
-                iters = int(tokens[3])
-            elif line.startswith(
-                    'Total CPU secs in IPOPT (w/o function evaluations)   ='):
-                tokens = line.split()
-                time += float(tokens[9])
-            elif line.startswith(
-                    'Total CPU secs in NLP function evaluations           ='):
-                tokens = line.split()
-                time += float(tokens[8])
-
-    pyutilib.services.TempfileManager.pop(remove=True)
-    return status_obj, solved, iters, time
+    stats = SolverStatistics.from_ipopt(status_obj, log if log else None)
+    return status_obj, solved, stats
 
 
 def _progress_bar(fraction, msg, length=20):
@@ -330,7 +569,8 @@ def write_sample_file(eval_spec,
                       filename,
                       convergence_evaluation_class_str,
                       n_points,
-                      seed=None):
+                      seed=None,
+                      method='clipped_normal'):
     """
     Samples the space of the inputs defined in the eval_spec, and creates a
     json file with all the points to be used in executing a convergence
@@ -352,39 +592,49 @@ def write_sample_file(eval_spec,
     seed : int or None
        The seed to be used when generating samples. If set to None, then the
        seed is not set
+    method : str
+       The sampling method (see ConvergenceEvaluationSpecification.sample).
+       For the default 'clipped_normal' method, the file stores each sample
+       point as a dictionary, as in earlier versions. For the other methods,
+       the file stores one list of values per input ('columns').
     Returns
     -------
        N/A
     """
-    if seed is not None:
-        np.random.seed(seed)
-
-    # build the samples
-    samples = OrderedDict()
-    for i in range(n_points):
-        sample = samples['Sample-{}'.format(i+1)] = OrderedDict()
-        for k, v in six.iteritems(eval_spec.inputs):
-            s = np.random.normal(loc=v['mean'], scale=v['std'])
-            if s > v['upper']:
-                s = v['upper']
-            elif s < v['lower']:
-                s = v['lower']
-            sample[k] = s
+    values = eval_spec.sample(n_points, method=method, seed=seed)
 
     # create the dictionary storing all the necessary information
     jsondict = OrderedDict()
     jsondict['inputs'] = OrderedDict(eval_spec.inputs)
     jsondict['n_points'] = n_points
     jsondict['seed'] = seed
-    jsondict['samples'] = samples
+
+    if method == 'clipped_normal':
+        samples = OrderedDict()
+        for i in range(n_points):
+            samples['Sample-{}'.format(i+1)] = OrderedDict(
+                zip(eval_spec.inputs.keys(), values[i].tolist()))
+        jsondict['samples'] = samples
+        dump_kw = {'indent': 3}
+    else:
+        jsondict['method'] = method
+        jsondict['columns'] = OrderedDict(
+            zip(eval_spec.inputs.keys(), values.T.tolist()))
+        dump_kw = {'separators': (',', ':')}
     jsondict['convergence_evaluation_class_str'] = \
         convergence_evaluation_class_str
 
     with open(filename, 'w') as fd:
-        json.dump(jsondict, fd, indent=3)
+        json.dump(jsondict, fd, **dump_kw)
 
 
-def run_convergence_evaluation_from_sample_file(sample_file):
+def run_convergence_evaluation_from_sample_file(sample_file,
+                                                reuse_model=False,
+                                                workers=None,
+                                                dynamic=False,
+                                                checkpoint_dir=None,
+                                                resume=False,
+                                                warm_start=False):
     # load the sample file
     try:
         with open(sample_file, 'r') as fd:
@@ -409,49 +659,171 @@ def run_convergence_evaluation_from_sample_file(sample_file):
                 '{} in sample file: {}'.format(
                         convergence_evaluation_class_str, sample_file))
 
-    return run_convergence_evaluation(jsondict, conv_eval)
+    return run_convergence_evaluation(jsondict, conv_eval,
+                                      reuse_model=reuse_model,
+                                      workers=workers,
+                                      dynamic=dynamic,
+                                      checkpoint_dir=checkpoint_dir,
+                                      resume=resume,
+                                      warm_start=warm_start)
+
 
+def _checkpoint_file(checkpoint_dir, run_id, worker):
+    # each run writes new files, so a line left incomplete by a run that was
+    # killed is never continued by a later run
+    return os.path.join(checkpoint_dir,
+                        'results.{}.{}.jsonl'.format(run_id, worker))
 
-def run_convergence_evaluation(sample_file_dict, conv_eval):
+
+def _append_checkpoint(checkpoint_dir, result):
     """
-    Run convergence evaluation and generate the statistics based on information
-    in the sample_file.
+    Append the result of one sample to the checkpoint file of its worker
+    """
+    fname = _checkpoint_file(checkpoint_dir, result['run_id'],
+                             result['worker'])
+    with open(fname, 'a') as fd:
+        fd.write(json.dumps(result) + '\n')
+
+
+def read_checkpoint(checkpoint_dir):
+    """
+    Read the results saved in the checkpoint files of a convergence evaluation
+    (one file per run and worker).
 
     Parameters
     ----------
-    sample_file_dict : dict
-        Dictionary created by ConvergenceEvaluationSpecification that contains
-        the input and sample point information
-
-    conv_eval : ConvergenceEvaluation
-        The ConvergenceEvaluation object that should be used
+    checkpoint_dir : str
+       The checkpoint directory given to run_convergence_evaluation
 
     Returns
     -------
-       N/A
+       OrderedDict of results, keyed by the sample name. Lines that cannot be
+       read (e.g. the last line written by a process that was killed) are
+       skipped.
     """
-    inputs = sample_file_dict['inputs']
-    samples = sample_file_dict['samples']
+    results = OrderedDict()
+    for fname in sorted(glob.glob(_checkpoint_file(checkpoint_dir, '*', '*'))):
+        with open(fname, 'r') as fd:
+            for line in fd:
+                try:
+                    r = json.loads(line, object_pairs_hook=OrderedDict)
+                except ValueError:
+                    continue
+                # keep the latest result if a sample was run more than once
+                if r['name'] not in results or \
+                        results[r['name']]['start_time'] < r['start_time']:
+                    results[r['name']] = r
+    return results
+
+
+def _warm_start_spec():
+    """
+    StoreSpec for the solutions used to warm start samples: the variable
+    values, and the suffixes (e.g. duals) if the model has them
+    """
+    return StoreSpec(classes=((Suffix, ()), (Var, ()), (Component, ())),
+                     data_classes=((_VarData, ("value",)),
+                                   (ComponentData, ())),
+                     suffix=True)
 
-    # current parallel task manager code does not work with dictionaries, so
-    # convert samples to a list
-    # ToDo: fix and test parallel task manager with dictionaries and change
-    # this
-    samples_list = list()
-    for k, v in six.iteritems(samples):
-        v['_name'] = k
-        samples_list.append(v)
-    n_samples = len(samples_list)
 
-    task_mgr = mpiu.ParallelTaskManager(n_samples)
-    local_samples_list = task_mgr.global_to_local_data(samples_list)
+def _normalized_points(inputs, samples_list):
+    """
+    Return an array of the sample points, with each input scaled by the
+    range between its bounds
+    """
+    lower = np.array([v['lower'] for v in six.itervalues(inputs)],
+                     dtype=float)
+    upper = np.array([v['upper'] for v in six.itervalues(inputs)],
+                     dtype=float)
+    scale = np.where(upper > lower, upper - lower, 1.0)
+    points = np.array([[ss[k] for k in inputs] for ss in samples_list],
+                      dtype=float).reshape(len(samples_list), len(inputs))
+    return (points - lower) / scale
+
+
+def _nearest_neighbour_order(points, start_point):
+    """
+    Return the indices of the points in the order of a greedy
+    nearest-neighbour path through them, starting from the point closest to
+    start_point
+    """
+    n = points.shape[0]
+    if n == 0:
+        return []
+    tree = cKDTree(points)
+    visited = np.zeros(n, dtype=bool)
+    order = list()
+    current = int(tree.query(start_point)[1])
+    while True:
+        visited[current] = True
+        order.append(current)
+        if len(order) == n:
+            return order
+        # look for the nearest unvisited point among the closest points, and
+        # fall back to checking all of the unvisited points
+        k = min(16, n)
+        idx = np.atleast_1d(tree.query(points[current], k=k)[1])
+        unvisited = idx[~visited[idx]]
+        if len(unvisited) > 0:
+            current = int(unvisited[0])
+        else:
+            remaining = np.flatnonzero(~visited)
+            d = np.sum((points[remaining] - points[current])**2, axis=1)
+            current = int(remaining[np.argmin(d)])
+
+
+def _nearest_solution(solutions, point):
+    """
+    Return the (point, name, state) entry of solutions that is closest to
+    point, or None if there are no solutions
+    """
+    if len(solutions) == 0:
+        return None
+    d = np.sum((np.array([sol[0] for sol in solutions]) - point)**2, axis=1)
+    return solutions[int(np.argmin(d))]
+
+
+# model, saved model state and solutions for warm starts kept by each worker
+# process between calls to _run_samples, keyed by the run_id of the
+# convergence evaluation that created them
+_worker_cache = dict()
+
+
+def _run_samples(samples_list, worker, inputs, conv_eval, options):
+    """
+    Solve the model at each of the sample points in samples_list and return
+    a list with the results for each sample. This is run by each worker
+    (process) of the convergence evaluation.
+
+    options is a dict with the options of the run: reuse_model, warm_start,
+    warm_start_history and checkpoint_dir (see run_convergence_evaluation),
+    run_id and show_progress. If checkpoint_dir is given, each result is also
+    appended to the checkpoint file of the worker as soon as the sample is
+    finished.
+    """
+    reuse_model = options['reuse_model']
+    warm_start = options['warm_start']
+    run_id = options['run_id']
+    checkpoint_dir = options['checkpoint_dir']
 
     results = list()
-    for (si, ss) in enumerate(local_samples_list):
+    if _worker_cache.get('run_id') != run_id:
+        # model from a different evaluation (or none yet)
+        _worker_cache.clear()
+        _worker_cache['run_id'] = run_id
+        _worker_cache['solutions'] = \
+            collections.deque(maxlen=options['warm_start_history'])
+    model = _worker_cache.get('model')
+    model_state = _worker_cache.get('model_state')
+    solutions = _worker_cache['solutions']
+    points = _normalized_points(inputs, samples_list)
+    for (si, ss) in enumerate(samples_list):
         sample_name = ss['_name']
-        # print progress on the rank-0 process
-        if task_mgr.is_root():
-            _progress_bar(float(si) / float(len(local_samples_list)),
+        start_time = time.time()
+        # print progress on the first worker
+        if worker == 0 and options['show_progress']:
+            _progress_bar(float(si) / float(len(samples_list)),
                           'Root Process: {}'.format(sample_name))
 
         # capture the output
@@ -459,11 +831,41 @@ def run_convergence_evaluation(sample_file_dict, conv_eval):
         output_buffer = six.StringIO()
         with LoggingIntercept(output_buffer, 'idaes', logging.ERROR):
             with capture_output():  # as str_out:
-                model = conv_eval.get_initialized_model()
+                setup_start = time.time()
+                if reuse_model and model is not None:
+                    # reset the model to the initialized state
+                    from_json(model, sd=model_state)
+                    restored = True
+                else:
+                    model = conv_eval.get_initialized_model()
+                    if reuse_model:
+                        model_state = to_json(model, return_dict=True)
+                        _worker_cache['model'] = model
+                        _worker_cache['model_state'] = model_state
+                    restored = False
+                setup_time = time.time() - setup_start
+                # start from the solution of the closest solved sample, the
+                # sampled inputs are set after this
+                warm_start_from = None
+                warm_start_duals = False
+                nearest = _nearest_solution(solutions, points[si]) \
+                    if warm_start else None
+                if nearest is not None:
+                    from_json(model, sd=nearest[2], wts=_warm_start_spec())
+                    warm_start_from = nearest[1]
+                    dual = model.component('dual')
+                    warm_start_duals = isinstance(dual, Suffix) and \
+                        dual.export_enabled()
                 _set_model_parameters_from_sample(model, inputs, ss)
                 solver = conv_eval.get_solver()
-                (status_obj, solved, iters, time) = \
-                    _run_ipopt_with_stats(model, solver)
+                (status_obj, solved, solver_stats) = \
+                    _run_ipopt_with_stats(model, solver,
+                                          warm_start=warm_start_duals)
+                if warm_start and solved:
+                    solutions.append(
+                        (points[si], sample_name,
+                         to_json(model, return_dict=True,
+                                 wts=_warm_start_spec())))
 
         # run without output capture
         # model = conv_eval.get_initialized_model()
@@ -479,11 +881,184 @@ def run_convergence_evaluation(sample_file_dict, conv_eval):
         results_dict['name'] = sample_name
         results_dict['sample_point'] = ss
         results_dict['solved'] = solved
-        results_dict['iters'] = iters
-        results_dict['time'] = time
+        results_dict.update(solver_stats.to_dict())
+        results_dict['setup_time'] = setup_time
+        results_dict['restored'] = restored
+        results_dict['warm_start_from'] = warm_start_from
+        results_dict['worker'] = worker
+        results_dict['start_time'] = start_time
+        results_dict['wall_time'] = time.time() - start_time
+        results_dict['run_id'] = run_id
         results.append(results_dict)
+        if checkpoint_dir is not None:
+            _append_checkpoint(checkpoint_dir, results_dict)
+
+    return results
+
+
+def run_convergence_evaluation(sample_file_dict, conv_eval, reuse_model=False,
+                               workers=None, dynamic=False,
+                               checkpoint_dir=None, resume=False,
+                               warm_start=False, warm_start_history=50):
+    """
+    Run convergence evaluation and generate the statistics based on information
+    in the sample_file.
 
-    global_results = task_mgr.gather_global_data(results)
+    Parameters
+    ----------
+    sample_file_dict : dict
+        Dictionary created by ConvergenceEvaluationSpecification that contains
+        the input and sample point information
+
+    conv_eval : ConvergenceEvaluation
+        The ConvergenceEvaluation object that should be used
+
+    reuse_model : bool
+        If True, the model is built and initialized only once per process
+        using conv_eval.get_initialized_model(). Its state is saved with
+        to_json and restored with from_json before each sample instead of
+        rebuilding the model. If False (default), a new initialized model is
+        created for every sample.
+
+    workers : int or None
+        The number of local worker processes used to run the samples when
+        not running under MPI. If None (default), the samples are run
+        serially in the current process. If running under MPI with more than one process, the samples
+        are distributed over the MPI processes and this is ignored.
+
+    dynamic : bool
+        If False (default), the samples are split into equal contiguous
+        blocks, one per process. If True, the samples are handed out one at a
+        time to processes as they become free, which balances the load when
+        solve times vary a lot between samples. Under MPI, rank 0 only
+        schedules the samples in this mode and does not solve any itself.
+
+    checkpoint_dir : str or None
+        Directory where the result of each sample is saved as soon as it
+        finishes, in one JSON-lines file per run and worker. With MPI, this must be
+        on a file system shared by all processes. If None (default), results
+        are only returned at the end of the run.
+
+    resume : bool
+        If True, samples that already have results in checkpoint_dir are not
+        run again (checkpoint_dir must then be given). If False (default), existing checkpoint files in
+        checkpoint_dir are removed before the run. When checkpoint_dir is
+        given, the returned results are read from the checkpoint files, so
+        they include the samples from previous runs.
+
+    warm_start : bool
+        If True, the samples are run in the order of a nearest-neighbour path
+        through the input space (starting near the mean of the inputs), and
+        each sample starts from the solution of the closest sample already
+        solved by the same process. The variable values and suffixes (e.g.
+        duals, which are also passed to ipopt if the model has an
+        IMPORT_EXPORT 'dual' suffix) are copied with to_json/from_json before
+        the sampled inputs are set. If False (default), every sample starts
+        from the initialized model.
+
+    warm_start_history : int
+        The number of most recent solutions that each process keeps as
+        starting points when warm_start is True (default 50)
+
+    Returns
+    -------
+       N/A
+    """
+    if resume and checkpoint_dir is None:
+        raise ValueError('resume=True requires a checkpoint_dir to resume'
+                         ' from')
+    inputs = sample_file_dict['inputs']
+    if 'samples' in sample_file_dict:
+        samples = sample_file_dict['samples']
+    else:
+        samples = samples_from_columns(sample_file_dict)
+
+    # current parallel task manager code does not work with dictionaries, so
+    # convert samples to a list
+    # ToDo: fix and test parallel task manager with dictionaries and change
+    # this
+    samples_list = list()
+    for k, v in six.iteritems(samples):
+        v['_name'] = k
+        samples_list.append(v)
+    all_samples_list = samples_list
+
+    if checkpoint_dir is not None:
+        if resume:
+            # skip the samples finished in previous runs
+            done = read_checkpoint(checkpoint_dir)
+            samples_list = [ss for ss in samples_list
+                            if ss['_name'] not in done]
+        if mpiu.MPIInterface().rank in (None, 0):
+            if not os.path.isdir(checkpoint_dir):
+                os.makedirs(checkpoint_dir)
+            if not resume:
+                for fname in glob.glob(
+                        _checkpoint_file(checkpoint_dir, '*', '*')):
+                    os.remove(fname)
+        # all processes must finish reading (or clearing) the checkpoint
+        # files before any results are written
+        mpiu.barrier()
+    n_samples = len(samples_list)
+
+    if warm_start:
+        # order the samples so that consecutive samples (which are usually
+        # run by the same process) are close to each other
+        mean = np.array([v['mean'] for v in six.itervalues(inputs)],
+                        dtype=float)
+        lower = np.array([v['lower'] for v in six.itervalues(inputs)],
+                         dtype=float)
+        upper = np.array([v['upper'] for v in six.itervalues(inputs)],
+                         dtype=float)
+        order = _nearest_neighbour_order(
+            _normalized_points(inputs, samples_list),
+            (mean - lower) / np.where(upper > lower, upper - lower, 1.0))
+        samples_list = [samples_list[i] for i in order]
+
+    task_mgr = mpiu.get_task_manager(n_samples, n_workers=workers)
+    options = dict(reuse_model=reuse_model,
+                   warm_start=warm_start,
+                   warm_start_history=warm_start_history,
+                   checkpoint_dir=checkpoint_dir,
+                   # used by the workers to tell if a cached model belongs to
+                   # this run
+                   run_id=uuid.uuid4().hex,
+                   show_progress=not dynamic)
+
+    if dynamic:
+        def _progress(n_done, n_total, result):
+            _progress_bar(float(n_done) / float(n_total),
+                          'Root Process: {}'.format(result['name']))
+
+        global_results = task_mgr.run_tasks_dynamic(
+            _run_samples, samples_list, inputs, conv_eval, options,
+            progress=_progress)
+    else:
+        local_samples_list = task_mgr.global_to_local_data(samples_list)
+        results = task_mgr.run_tasks(_run_samples, local_samples_list,
+                                     inputs, conv_eval, options)
+        global_results = task_mgr.gather_global_data(results)
+
+    # release the model if the samples were run in this process
+    _worker_cache.clear()
+
+    if warm_start and global_results is not None:
+        # put the results back in the order of the samples
+        index = dict((ss['_name'], i) for i, ss in enumerate(all_samples_list))
+        global_results.sort(key=lambda r: index[r['name']])
+
+    if checkpoint_dir is not None and global_results is not None:
+        # merge the results of this and any previous runs
+        done = read_checkpoint(checkpoint_dir)
+        global_results = [done[ss['_name']] for ss in all_samples_list
+                          if ss['_name'] in done]
+
+    if global_results is not None:
+        n_no_log = len([r for r in global_results if r['iters'] is None])
+        if n_no_log > 0:
+            _log.warning('The solver wrote no log for {} of {} samples, their'
+                         ' iterations and solve times are not reported'
+                         .format(n_no_log, len(global_results)))
     return inputs, samples, global_results
 
 
@@ -504,8 +1079,11 @@ class Stats(object):
         # loop through and gather some data
         for r in results:
             if r['solved'] is True:
-                self.iters_successful.append(r['iters'])
-                self.time_successful.append(r['time'])
+                # iters and time are None if the solver wrote no log
+                if r['iters'] is not None:
+                    self.iters_successful.append(r['iters'])
+                if r['time'] is not None:
+                    self.time_successful.append(r['time'])
             else:
                 self.failed_cases.append(r)
         # data for summary table
@@ -528,6 +1106,61 @@ class Stats(object):
             self.time_std = float(np.std(self.time_successful))
             self.time_max = float(np.max(self.time_successful))
 
+        # model setup times: a full build and initialization when the model
+        # is created from scratch, or a restore of the saved state when the
+        # model is reused (see reuse_model in run_convergence_evaluation)
+        build_times = [r['setup_time'] for r in results if not r['restored']]
+        restore_times = [r['setup_time'] for r in results if r['restored']]
+        self.n_builds = len(build_times)
+        self.n_restores = len(restore_times)
+        self.build_time_mean = 0
+        self.restore_time_mean = 0
+        self.setup_time_saved = 0
+        if len(build_times) > 0:
+            self.build_time_mean = float(np.mean(build_times))
+        if len(restore_times) > 0:
+            self.restore_time_mean = float(np.mean(restore_times))
+            # time saved on each sample that did not rebuild the model
+            self.setup_time_saved = \
+                self.build_time_mean - self.restore_time_mean
+
+        # breakdown of the solver time and use of the restoration phase
+        self.time_function_evals = float(sum(
+            r['time_function_evals'] for r in results
+            if r['time_function_evals'] is not None))
+        self.time_solver = float(sum(
+            r['time_solver'] for r in results
+            if r['time_solver'] is not None))
+        self.restoration_cases = len(
+            [r for r in results if r['restoration_phases']])
+        self.warm_started_cases = len(
+            [r for r in results if r['warm_start_from'] is not None])
+
+        # utilization of each worker (process): the fraction of the elapsed
+        # time of the whole evaluation that it spent running samples. If the
+        # results were merged from several (resumed) runs, only the last run
+        # is used.
+        self.elapsed_time = 0
+        self.worker_n_samples = OrderedDict()
+        self.worker_busy_time = OrderedDict()
+        self.worker_utilization = OrderedDict()
+        if len(results) > 0:
+            last_run_id = max(results, key=lambda r: r['start_time'])['run_id']
+            last_run = [r for r in results if r['run_id'] == last_run_id]
+            run_start = min(r['start_time'] for r in last_run)
+            run_end = max(r['start_time'] + r['wall_time'] for r in last_run)
+            self.elapsed_time = run_end - run_start
+            for r in sorted(last_run, key=lambda r: r['worker']):
+                w = r['worker']
+                self.worker_n_samples[w] = \
+                    self.worker_n_samples.get(w, 0) + 1
+                self.worker_busy_time[w] = \
+                    self.worker_busy_time.get(w, 0) + r['wall_time']
+            for w, busy in six.iteritems(self.worker_busy_time):
+                self.worker_utilization[w] = 1.0
+                if self.elapsed_time > 0:
+                    self.worker_utilization[w] = busy / self.elapsed_time
+
 
 def print_convergence_statistics(inputs, results, s):
     """
@@ -575,6 +1208,32 @@ def print_convergence_statistics(inputs, results, s):
              s.time_mean, s.time_mean + s.time_std,
              s.time_max))
 
+    print('... Solver Time (s) (function evaluations, solver w/o function'
+          ' evaluations): %5f, %5f'
+          % (s.time_function_evals, s.time_solver))
+    print('... Cases Using Restoration Phase: %.0f/%.0f' % (
+            s.restoration_cases, len(results)))
+    print('... Cases Warm Started from a Solved Sample: %.0f/%.0f' % (
+            s.warm_started_cases, len(results)))
+
+    print('... Model Setup Time (s) (build, restore, saved per sample):'
+          '%5f, %5f, %5f'
+          % (s.build_time_mean, s.restore_time_mean, s.setup_time_saved))
+    print('... Model Setups (builds, restores): %.0f, %.0f'
+          % (s.n_builds, s.n_restores))
+
+    print()
+    print('==== Worker Utilization ====')
+    print('Elapsed Time (s): %f' % s.elapsed_time)
+    print('%10s %10s %15s %15s' % ('Worker', 'Samples', 'Busy Time (s)',
+                                   'Utilization'))
+    print('-' * 53)
+    for w, u in six.iteritems(s.worker_utilization):
+        print('%10s %10d %15.2f %14.1f%%' % (w, s.worker_n_samples[w],
+                                              s.worker_busy_time[w],
+                                              u*100.0))
+    print('-' * 53)
+
     # print the detailed table
     print()
     print('==== Table of Results ====')
@@ -587,11 +1246,13 @@ def print_convergence_statistics(inputs, results, s):
         if r['solved'] is not True:
             flag = 'F'
         else:
-            if r['time'] > s.time_mean + 2.0 * s.time_std and \
+            if r['time'] is not None and \
+                    r['time'] > s.time_mean + 2.0 * s.time_std and \
                     r['time'] > s.time_mean + 5.0:
                 # add a more absolute check when s.time_std is small
                 flag += 'T'
-            if r['iters'] > s.iters_mean + 2.0 * s.iters_std and \
+            if r['iters'] is not None and \
+                    r['iters'] > s.iters_mean + 2.0 * s.iters_std and \
                     r['iters'] > s.iters_mean + 5:
                 # add a more absolute check when s.iters_std is small
                 flag += 'I'
@@ -600,13 +1261,17 @@ def print_convergence_statistics(inputs, results, s):
             r['flag'] = flag
             s.notable_cases.append(r)
 
-        print('%4s %20s %10s %10.0f %10.2f' % (
-                flag, r['name'], r['solved'], r['iters'], r['time']))
+        print('%4s %20s %10s %10s %10s' % (
+                flag, r['name'], r['solved'],
+                '-' if r['iters'] is None else '%.0f' % r['iters'],
+                '-' if r['time'] is None else '%.2f' % r['time']))
         if r['solved'] is not True:
             s.failed_cases.append(r)
         else:
-            s.iters_successful.append(r['iters'])
-            s.time_successful.append(r['time'])
+            if r['iters'] is not None:
+                s.iters_successful.append(r['iters'])
+            if r['time'] is not None:
+                s.time_successful.append(r['time'])
 
     print('-' * 58)
 
@@ -679,8 +1344,28 @@ def save_results_to_dmf(dmf, inputs, results, stats):
             'mean': stats.time_mean,
             '+1std': stats.time_mean + stats.time_std,
             'max': stats.time_max
+        },
+        'time_function_evals': stats.time_function_evals,
+        'time_solver': stats.time_solver,
+        'restoration_cases': stats.restoration_cases,
+        'warm_started_cases': stats.warm_started_cases,
+        'setup': {
+            'builds': stats.n_builds,
+            'restores': stats.n_restores,
+            'build_time': stats.build_time_mean,
+            'restore_time': stats.restore_time_mean,
+            'saved_per_sample': stats.setup_time_saved
         }
     }
+    d['workers'] = {
+        'elapsed_time': stats.elapsed_time,
+        'utilization': [
+            {'worker': w,
+             'samples': stats.worker_n_samples[w],
+             'busy_time': stats.worker_busy_time[w],
+             'utilization': u}
+            for w, u in six.iteritems(stats.worker_utilization)]
+    }
     tbl = []
     for r in results:
         notable = False
@@ -694,15 +1379,18 @@ def save_results_to_dmf(dmf, inputs, results, stats):
         for vtype in 'time', 'iters':
             mean, std = [getattr(stats, a) for a in ('{}_mean'.format(vtype),
                                                      '{}_std'.format(vtype))]
-            if r[vtype] > mean + 2. * std and r[vtype] > mean + 5:
+            if r[vtype] is not None and \
+                    r[vtype] > mean + 2. * std and r[vtype] > mean + 5:
                 item['outlier_{}'.format(vtype)] = True
                 notable = True
         if not solved:
             stats.failed_cases.append(r)
             notable = True
         else:
-            stats.iters_successful.append(r['iters'])
-            stats.time_successful.append(r['time'])
+            if r['iters'] is not None:
+                stats.iters_successful.append(r['iters'])
+            if r['time'] is not None:
+                stats.time_successful.append(r['time'])
         tbl.append(item)
         if notable:
             stats.notable_cases.append(r)
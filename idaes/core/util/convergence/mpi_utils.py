@@ -11,13 +11,20 @@
 # at the URL "https://github.com/IDAES/idaes-pse".
 ##############################################################################
 from collections import OrderedDict
+import concurrent.futures
 import importlib
+import multiprocessing
+import six
 """
 This module is a collection of classes that provide a
 friendlier interface to MPI (through mpi4py). They help
 allocate local tasks/data from global tasks/data and gather
 global data (from all processors).
 
+When MPI is not available, the ProcessPoolTaskManager provides
+the same interface, but runs the tasks in a pool of local
+processes (through concurrent.futures).
+
 Although general, this module was only implemented to 
 work with the convergence evaluation framework. More work
 is needed to make this appropriate for general use.
@@ -68,6 +75,16 @@ class MPIInterface:
     def size(self):
         return self._size
 
+def barrier():
+    """
+    Wait for all MPI processes to reach this point (does nothing if MPI is
+    not available)
+    """
+    mpi_interface = MPIInterface()
+    if mpi_interface.have_mpi:
+        mpi_interface.comm.Barrier()
+
+
 class ParallelTaskManager:
     def __init__(self, n_total_tasks, mpi_interface=None):
         if mpi_interface is None:
@@ -107,6 +124,80 @@ class ParallelTaskManager:
             return True
         return False
 
+    def run_tasks(self, func, local_data, *args):
+        """
+        Run func on the local data of this process. func is called as
+        func(local_data, worker, *args), where worker is the rank of this
+        process (0 if MPI is not available), and should return a list with
+        one entry per item in local_data.
+        """
+        worker = 0
+        if self._mpi_interface.have_mpi:
+            worker = self._mpi_interface.rank
+        return func(local_data, worker, *args)
+
+    def run_tasks_dynamic(self, func, global_data, *args, **kwargs):
+        """
+        Run func on each item of global_data, handing the items out to the
+        processes on demand instead of in fixed blocks. func is called as
+        func([item], worker, *args) and should return a list with one entry.
+
+        Under MPI, rank 0 is the master and only hands out tasks and collects
+        the results, the other ranks are workers. Without MPI (or with a
+        single process) the tasks are run in order on this process.
+
+        The keyword argument progress can be a function that is called on the
+        root process as progress(n_done, n_total, result) after each task
+        completes.
+
+        Returns the list of results (in the order of global_data) on the root
+        process, and None on the other processes.
+        """
+        progress = kwargs.pop('progress', None)
+        assert (len(global_data) == self._n_total_tasks)
+        if not self._mpi_interface.have_mpi or self._mpi_interface.size == 1:
+            results = list()
+            for d in global_data:
+                results.extend(func([d], 0, *args))
+                if progress is not None:
+                    progress(len(results), len(global_data), results[-1])
+            return results
+
+        comm = self._mpi_interface.comm
+        if self.is_root():
+            results = [None]*len(global_data)
+            next_task = 0
+            n_done = 0
+            n_active_workers = self._mpi_interface.size - 1
+            status = MPI.Status()
+            while n_active_workers > 0:
+                # each message from a worker is either None (ready for the
+                # first task) or the (index, result) of its last task
+                msg = comm.recv(source=MPI.ANY_SOURCE, status=status)
+                worker = status.Get_source()
+                if msg is not None:
+                    results[msg[0]] = msg[1]
+                    n_done += 1
+                    if progress is not None:
+                        progress(n_done, len(global_data), msg[1])
+                if next_task < len(global_data):
+                    comm.send(next_task, dest=worker)
+                    next_task += 1
+                else:
+                    # no tasks left, tell the worker to stop
+                    comm.send(None, dest=worker)
+                    n_active_workers -= 1
+            return results
+
+        worker = self._mpi_interface.rank
+        comm.send(None, dest=0)
+        while True:
+            i = comm.recv(source=0)
+            if i is None:
+                break
+            comm.send((i, func([global_data[i]], worker, *args)[0]), dest=0)
+        return None
+
     # ToDo: fix the parallel task manager to handle dictionaries as well as lists
     def global_to_local_data(self, global_data):
         if type(global_data) is list:
@@ -158,3 +249,135 @@ class ParallelTaskManager:
         for i in range(self._mpi_interface.size):
             global_data.extend(global_data_list_of_lists[i])
         return global_data
+
+
+# index of a ProcessPoolTaskManager worker within its pool, this is set in
+# each worker process when the pool starts
+_pool_worker_index = None
+
+
+def _init_pool_worker(counter):
+    global _pool_worker_index
+    with counter.get_lock():
+        _pool_worker_index = counter.value
+        counter.value += 1
+
+
+def _run_pool_task(func, data, *args):
+    return func(data, _pool_worker_index, *args)
+
+
+class ProcessPoolTaskManager:
+    """
+    Task manager with the same interface as ParallelTaskManager that
+    runs the tasks in a pool of local worker processes instead of MPI
+    ranks. This process owns all of the global data, and run_tasks splits
+    it into contiguous blocks, one per worker.
+
+    Arguments passed to run_tasks (including the function) must be
+    picklable.
+    """
+    def __init__(self, n_total_tasks, n_workers=None):
+        if n_workers is None:
+            n_workers = multiprocessing.cpu_count()
+        self._n_total_tasks = n_total_tasks
+        self._n_workers = max(1, min(n_workers, n_total_tasks))
+        self._local_map = range(n_total_tasks)
+
+    @property
+    def n_workers(self):
+        return self._n_workers
+
+    def is_root(self):
+        return True
+
+    def global_to_local_data(self, global_data):
+        # all the data is local to this process, it is split among the
+        # workers in run_tasks
+        assert (len(global_data) == self._n_total_tasks)
+        if type(global_data) is list:
+            return list(global_data)
+        elif type(global_data) is OrderedDict:
+            return OrderedDict(global_data)
+        raise ValueError('Unknown type passed to global_to_local_data. Expected list or OrderedDict.')
+
+    def run_tasks(self, func, local_data, *args):
+        """
+        Run func on the local data in the worker processes. Each worker
+        calls func(block, worker, *args) on a contiguous block of
+        local_data, where worker is the index of the worker, and the
+        returned lists are concatenated in the original order.
+        """
+        blocks = list()
+        start = 0
+        for i in range(self._n_workers):
+            n = len(local_data) // self._n_workers
+            if i < len(local_data) % self._n_workers:
+                n += 1
+            blocks.append(local_data[start:start+n])
+            start += n
+
+        results = list()
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=self._n_workers) as executor:
+            futures = [executor.submit(func, block, i, *args)
+                       for i, block in enumerate(blocks)]
+            for f in futures:
+                results.extend(f.result())
+        return results
+
+    def run_tasks_dynamic(self, func, global_data, *args, **kwargs):
+        """
+        Run func on each item of global_data in the worker processes. The
+        items are handed out one at a time as workers become free, so slow
+        tasks do not hold up the other workers. func is called as
+        func([item], worker, *args), where worker is the index of the worker
+        process in the pool, and should return a list with one entry.
+
+        The keyword argument progress can be a function that is called as
+        progress(n_done, n_total, result) after each task completes.
+
+        Returns the list of results in the order of global_data.
+        """
+        progress = kwargs.pop('progress', None)
+        assert (len(global_data) == self._n_total_tasks)
+        results = [None]*len(global_data)
+        counter = multiprocessing.Value('i', 0)
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=self._n_workers,
+                initializer=_init_pool_worker,
+                initargs=(counter,)) as executor:
+            futures = dict()
+            for i, d in enumerate(global_data):
+                f = executor.submit(_run_pool_task, func, [d], *args)
+                futures[f] = i
+            n_done = 0
+            for f in concurrent.futures.as_completed(futures):
+                i = futures[f]
+                results[i] = f.result()[0]
+                n_done += 1
+                if progress is not None:
+                    progress(n_done, len(global_data), results[i])
+        return results
+
+    def gather_global_data(self, local_data):
+        assert (len(local_data) == len(self._local_map))
+        return list(local_data)
+
+
+def get_task_manager(n_total_tasks, n_workers=None):
+    """
+    Return a task manager for n_total_tasks tasks. If the script is
+    running under MPI with more than one process, a ParallelTaskManager
+    is returned and n_workers is ignored. Otherwise, if n_workers is
+    given, a ProcessPoolTaskManager with n_workers worker processes is
+    returned. If n_workers is None (default) or only one worker would be
+    used, a serial ParallelTaskManager is returned.
+    """
+    mpi_interface = MPIInterface()
+    if mpi_interface.have_mpi and mpi_interface.size > 1:
+        return ParallelTaskManager(n_total_tasks, mpi_interface=mpi_interface)
+
+    if n_workers is not None and min(n_workers, n_total_tasks) > 1:
+        return ProcessPoolTaskManager(n_total_tasks, n_workers=n_workers)
+    return ParallelTaskManager(n_total_tasks, mpi_interface=mpi_interface)
@@ -16,6 +16,7 @@ Test classes for the convergence evaluation testing module
 Author: Carl Laird
 """
 import pyomo.environ as pe
+from pyomo.opt import SolverResults, TerminationCondition
 import idaes.core.util.convergence.convergence_base as cb
 
 class ConvEvalFixedVarMutableParam(cb.ConvergenceEvaluation):
@@ -95,3 +96,33 @@ class ConvEvalUnfixedVarMutableParam(ConvEvalFixedVarMutableParam):
         return m
 
 
+class FakeIpopt(object):
+    """
+    Stands in for ipopt in tests that do not need a real solver. It sets the
+    solution of the Rosenbrock problem in the test models and produces
+    ipopt-like output in the log file, with the iteration count equal to
+    param_b.
+    """
+    def solve(self, model, options=None, logfile=None):
+        model.x.value = pe.value(model.var_a)
+        model.y.value = pe.value(model.var_a)**2
+        log = (
+            'Number of Iterations....: {}\n'
+            'Total CPU secs in IPOPT (w/o function evaluations)   =      0.002\n'
+            'Total CPU secs in NLP function evaluations           =      0.001\n'
+            'EXIT: Optimal Solution Found.\n'.format(
+                int(pe.value(model.param_b))))
+        if logfile is not None:
+            with open(logfile, 'w') as f:
+                f.write(log)
+        results = SolverResults()
+        results.solver.termination_condition = TerminationCondition.optimal
+        return results
+
+
+class ConvEvalFakeSolver(ConvEvalFixedVarMutableParam):
+    def __init__(self):
+        super(ConvEvalFakeSolver, self).__init__()
+
+    def get_solver(self):
+        return FakeIpopt()
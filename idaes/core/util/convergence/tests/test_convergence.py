@@ -16,10 +16,14 @@ Tests for the convergence testing module
 Author: Carl Laird
 """
 import pytest
+import json
 import os
 import os.path
+import numpy as np
+import six
 from pyutilib.misc import compare_json_files
 import pyomo.environ as pe
+from pyomo.opt import SolverResults, TerminationCondition
 import idaes.core.util.convergence.convergence_base as cb
 
 # See if ipopt is available and set up solver
@@ -33,6 +37,9 @@ ceval_fixedvar_immutableparam_str = (
 ceval_unfixedvar_mutableparam_str = (
         'idaes.core.util.convergence.tests.'
         'conv_eval_classes.ConvEvalUnfixedVarMutableParam')
+ceval_fakesolver_str = (
+        'idaes.core.util.convergence.tests.'
+        'conv_eval_classes.ConvEvalFakeSolver')
 
 currdir = os.path.dirname(os.path.abspath(__file__))
 
@@ -157,6 +164,399 @@ def test_convergence_evaluation_fixedvar_mutableparam():
     #     os.remove(results_fname)
 
 
+@pytest.mark.skipif(ipopt_available == False,
+                    reason="Ipopt solver not available")
+def test_convergence_evaluation_reuse_model():
+    ceval_class = cb._class_import(ceval_fixedvar_mutableparam_str)
+    ceval = ceval_class()
+
+    spec = ceval.get_specification()
+    fname = os.path.join(currdir, 'ceval_fixedvar_mutableparam.3.43.reuse.json')
+    cb.write_sample_file(spec, fname, ceval_fixedvar_mutableparam_str,
+                         n_points=3, seed=43)
+
+    inputs, samples, global_results = \
+        cb.run_convergence_evaluation_from_sample_file(fname,
+                                                       reuse_model=True)
+
+    # the model is only built for the first sample, and restored after that,
+    # results should match those from building a new model for every sample
+    assert not global_results[0]['restored']
+    assert global_results[1]['restored']
+    assert global_results[2]['restored']
+
+    assert global_results[0]['solved']
+    assert global_results[0]['iters'] == 14
+    assert global_results[1]['solved']
+    assert global_results[1]['iters'] == 15
+    assert global_results[2]['solved']
+    assert global_results[2]['iters'] == 12
+
+    if os.path.exists(fname):
+        os.remove(fname)
+
+
+@pytest.mark.skipif(ipopt_available == False,
+                    reason="Ipopt solver not available")
+def test_convergence_evaluation_dynamic():
+    ceval_class = cb._class_import(ceval_fixedvar_mutableparam_str)
+    ceval = ceval_class()
+
+    spec = ceval.get_specification()
+    fname = os.path.join(currdir,
+                         'ceval_fixedvar_mutableparam.3.43.dynamic.json')
+    cb.write_sample_file(spec, fname, ceval_fixedvar_mutableparam_str,
+                         n_points=3, seed=43)
+
+    inputs, samples, global_results = \
+        cb.run_convergence_evaluation_from_sample_file(fname, workers=2,
+                                                       dynamic=True)
+
+    # results are returned in sample order regardless of which worker
+    # solved them
+    assert [r['name'] for r in global_results] == \
+        ['Sample-1', 'Sample-2', 'Sample-3']
+    assert [r['iters'] for r in global_results] == [14, 15, 12]
+    s = cb.Stats(global_results)
+    assert sum(s.worker_n_samples.values()) == 3
+
+    if os.path.exists(fname):
+        os.remove(fname)
+
+
+def _spec():
+    s = cb.ConvergenceEvaluationSpecification()
+    s.add_sampled_input(name='a', pyomo_path='a',
+                        lower=0.5, upper=1.5, mean=1.0, std=0.25)
+    s.add_sampled_input(name='b', pyomo_path='b',
+                        lower=90, upper=150, mean=100, std=10)
+    s.add_sampled_input(name='c', pyomo_path='c',
+                        lower=-1, upper=1, mean=0.5, std=0)
+    return s
+
+
+def test_sample_clipped_normal():
+    # same values as drawing one input at a time
+    values = _spec().sample(20, method='clipped_normal', seed=42)
+    np.random.seed(42)
+    for i in range(20):
+        for j, v in enumerate(six.itervalues(_spec().inputs)):
+            s = min(max(np.random.normal(loc=v['mean'], scale=v['std']),
+                        v['lower']), v['upper'])
+            assert values[i, j] == pytest.approx(s, abs=1e-12)
+
+
+@pytest.mark.parametrize('method', ['truncated_normal', 'lhs', 'sobol'])
+def test_sample_truncated_normal(method):
+    if method == 'sobol':
+        pytest.importorskip('scipy.stats.qmc')
+    n = 4096
+    values = _spec().sample(n, method=method, seed=42)
+    assert values.shape == (n, 3)
+    # within the bounds, but no mass piled up on the bounds
+    assert np.all(values[:, 0] >= 0.5) and np.all(values[:, 0] <= 1.5)
+    assert np.all(values[:, 1] >= 90) and np.all(values[:, 1] <= 150)
+    assert np.sum(values[:, 1] == 90) == 0
+    # zero standard deviation gives the mean
+    assert np.all(values[:, 2] == 0.5)
+    # the truncation on b removes values more than one std below the mean,
+    # so P(z > 0)/P(z > -1) = 0.594 of the samples are above the mean
+    assert np.mean(values[:, 1] > 100) == pytest.approx(0.5943, abs=0.02)
+    # same seed, same samples
+    assert np.array_equal(values, _spec().sample(n, method=method, seed=42))
+
+
+def test_sample_lhs_stratified():
+    n = 50
+    values = _spec().sample(n, method='lhs', seed=1, distribution='uniform')
+    # exactly one point in each of the n equal width strata of each input
+    for j, (lb, ub) in enumerate([(0.5, 1.5), (90, 150)]):
+        strata = np.floor((values[:, j] - lb) / (ub - lb) * n)
+        assert sorted(strata.tolist()) == list(range(n))
+
+
+def test_sample_invalid():
+    with pytest.raises(ValueError):
+        _spec().sample(10, method='grid')
+    with pytest.raises(ValueError):
+        _spec().sample(10, method='lhs', distribution='beta')
+
+
+def test_columnar_sample_file(tmpdir):
+    ceval = cb._class_import(ceval_fakesolver_str)()
+    spec = ceval.get_specification()
+    fname = str(tmpdir.join('ceval_fakesolver.lhs.json'))
+    cb.write_sample_file(spec, fname, ceval_fakesolver_str,
+                         n_points=4, seed=42, method='lhs')
+    with open(fname, 'r') as fd:
+        jsondict = json.load(fd)
+    assert 'samples' not in jsondict
+    assert jsondict['method'] == 'lhs'
+    values = spec.sample(4, method='lhs', seed=42)
+    assert jsondict['columns']['var_a'] == values[:, 0].tolist()
+    assert jsondict['columns']['param_b'] == values[:, 1].tolist()
+
+    inputs, samples, results = \
+        cb.run_convergence_evaluation_from_sample_file(fname, workers=1)
+    assert list(samples.keys()) == ['Sample-{}'.format(i) for i in range(1, 5)]
+    assert samples['Sample-3']['param_b'] == values[2, 1]
+    assert [r['name'] for r in results] == list(samples.keys())
+    assert [r['iters'] for r in results] == \
+        [int(v) for v in values[:, 1]]
+
+
+def test_nearest_neighbour_order():
+    points = np.array([[0.0, 0.0], [0.9, 0.0], [0.1, 0.0], [0.55, 0.1],
+                       [1.0, 1.0], [0.5, 0.0]])
+    order = cb._nearest_neighbour_order(points, np.array([0.45, 0.0]))
+    assert order == [5, 3, 1, 2, 0, 4]
+
+    # visits every point once
+    rng = np.random.RandomState(3)
+    points = rng.random_sample((500, 3))
+    order = cb._nearest_neighbour_order(points, np.zeros(3))
+    assert sorted(order) == list(range(500))
+    assert cb._nearest_neighbour_order(np.zeros((0, 3)), np.zeros(3)) == []
+
+
+def test_nearest_solution():
+    assert cb._nearest_solution([], np.zeros(2)) is None
+    solutions = [(np.array([0.0, 0.0]), 'a', {}),
+                 (np.array([1.0, 1.0]), 'b', {}),
+                 (np.array([0.4, 0.0]), 'c', {})]
+    assert cb._nearest_solution(solutions, np.array([0.3, 0.1]))[1] == 'c'
+    assert cb._nearest_solution(solutions, np.array([0.9, 0.5]))[1] == 'b'
+
+
+def test_convergence_evaluation_warm_start(tmpdir):
+    ceval = cb._class_import(ceval_fakesolver_str)()
+    spec = ceval.get_specification()
+    fname = str(tmpdir.join('ceval_fakesolver.8.42.json'))
+    cb.write_sample_file(spec, fname, ceval_fakesolver_str,
+                         n_points=8, seed=42)
+
+    inputs, samples, results = \
+        cb.run_convergence_evaluation_from_sample_file(
+            fname, workers=1, reuse_model=True, warm_start=True)
+    # results are in the order of the samples
+    assert [r['name'] for r in results] == list(samples.keys())
+    assert [r['iters'] for r in results] == \
+        [int(v['param_b']) for v in samples.values()]
+
+    # samples were run along a path starting near the mean of the inputs,
+    # each started from the closest sample solved before it
+    samples_list = list(samples.values())
+    points = cb._normalized_points(inputs, samples_list)
+    run_order = sorted(range(8), key=lambda i: results[i]['start_time'])
+    assert results[run_order[0]]['warm_start_from'] is None
+    for n, i in enumerate(run_order[1:]):
+        solved = run_order[:n+1]
+        d = [np.sum((points[j] - points[i])**2) for j in solved]
+        closest = results[solved[int(np.argmin(d))]]['name']
+        assert results[i]['warm_start_from'] == closest
+    assert cb.Stats(results).warm_started_cases == 7
+
+
+def _result(name, solved, iters, time, setup_time, restored, worker,
+            start_time, wall_time, **kwargs):
+    # build a result record like the ones from run_convergence_evaluation
+    r = cb.SolverStatistics().to_dict()
+    r.update(name=name, solved=solved, iters=iters, time=time,
+             setup_time=setup_time, restored=restored, worker=worker,
+             start_time=start_time, wall_time=wall_time, run_id='run',
+             warm_start_from=None)
+    r.update(kwargs)
+    return r
+
+
+def test_stats_setup_time():
+    results = [
+        _result('Sample-1', True, 10, 1.0, 5.0, False, 0, 100.0, 6.0),
+        _result('Sample-2', True, 12, 1.0, 0.5, True, 0, 106.0, 1.5),
+        _result('Sample-3', False, 500, 3.0, 1.5, True, 1, 100.0, 4.5)]
+    s = cb.Stats(results)
+    assert s.n_builds == 1
+    assert s.n_restores == 2
+    assert s.build_time_mean == pytest.approx(5.0)
+    assert s.restore_time_mean == pytest.approx(1.0)
+    assert s.setup_time_saved == pytest.approx(4.0)
+
+
+def test_stats_without_solver_log():
+    results = [
+        _result('Sample-1', True, 10, 1.0, 5.0, False, 0, 100.0, 6.0),
+        _result('Sample-2', True, None, None, 0.5, True, 0, 106.0, 1.5),
+        _result('Sample-3', True, 20, 3.0, 1.5, True, 1, 100.0, 4.5)]
+    s = cb.Stats(results)
+    assert s.iters_successful == [10, 20]
+    assert s.iters_mean == 15
+    assert s.time_mean == pytest.approx(2.0)
+    # samples without iterations and times are printed but not flagged
+    cb.print_convergence_statistics(dict(), results, s)
+    assert s.notable_cases == []
+
+
+def test_stats_worker_utilization():
+    results = [
+        _result('Sample-1', True, 10, 1.0, 5.0, False, 1, 100.0, 6.0),
+        _result('Sample-2', True, 12, 1.0, 0.5, True, 1, 106.0, 2.0),
+        _result('Sample-3', False, 500, 3.0, 1.5, False, 0, 101.0, 4.0)]
+    s = cb.Stats(results)
+    assert s.elapsed_time == pytest.approx(8.0)
+    assert list(s.worker_utilization.keys()) == [0, 1]
+    assert s.worker_n_samples[0] == 1
+    assert s.worker_n_samples[1] == 2
+    assert s.worker_busy_time[1] == pytest.approx(8.0)
+    assert s.worker_utilization[0] == pytest.approx(0.5)
+    assert s.worker_utilization[1] == pytest.approx(1.0)
+
+
+def test_stats_worker_utilization_resumed():
+    # only the workers of the last run are reported
+    results = [
+        _result('Sample-1', True, 10, 1.0, 5.0, False, 1, 100.0, 6.0,
+                run_id='first'),
+        _result('Sample-2', True, 12, 1.0, 0.5, True, 0, 900.0, 2.0,
+                run_id='second'),
+        _result('Sample-3', False, 500, 3.0, 1.5, False, 1, 901.0, 3.0,
+                run_id='second')]
+    s = cb.Stats(results)
+    assert s.elapsed_time == pytest.approx(4.0)
+    assert s.worker_n_samples[0] == 1
+    assert s.worker_n_samples[1] == 1
+    assert s.worker_utilization[0] == pytest.approx(0.5)
+    assert s.worker_utilization[1] == pytest.approx(0.75)
+
+
+def test_convergence_evaluation_checkpoint_resume(tmpdir):
+    ceval = cb._class_import(ceval_fakesolver_str)()
+    spec = ceval.get_specification()
+    fname = str(tmpdir.join('ceval_fakesolver.5.42.json'))
+    checkpoint_dir = str(tmpdir.join('checkpoint'))
+    cb.write_sample_file(spec, fname, ceval_fakesolver_str,
+                         n_points=5, seed=42)
+
+    inputs, samples, results = \
+        cb.run_convergence_evaluation_from_sample_file(
+            fname, workers=1, checkpoint_dir=checkpoint_dir)
+    assert [r['name'] for r in results] == \
+        ['Sample-{}'.format(i) for i in range(1, 6)]
+    assert [r['iters'] for r in results] == \
+        [int(samples[r['name']]['param_b']) for r in results]
+    first_run_id = results[0]['run_id']
+    checkpoint = cb.read_checkpoint(checkpoint_dir)
+    assert list(checkpoint.keys()) == [r['name'] for r in results]
+
+    # simulate a run that was killed after writing the first two samples
+    # and part of the third
+    checkpoint_file = os.path.join(
+        checkpoint_dir, 'results.{}.0.jsonl'.format(first_run_id))
+    with open(checkpoint_file, 'r') as fd:
+        lines = fd.readlines()
+    with open(checkpoint_file, 'w') as fd:
+        fd.writelines(lines[:2])
+        fd.write(lines[2][:20])
+
+    inputs, samples, resumed = \
+        cb.run_convergence_evaluation_from_sample_file(
+            fname, workers=1, checkpoint_dir=checkpoint_dir, resume=True)
+    assert [r['name'] for r in resumed] == \
+        ['Sample-{}'.format(i) for i in range(1, 6)]
+    assert [r['iters'] for r in resumed] == [r['iters'] for r in results]
+    # only the samples without results were run again
+    assert [r['run_id'] == first_run_id for r in resumed] == \
+        [True, True, False, False, False]
+    s = cb.Stats(resumed)
+    assert sum(s.worker_n_samples.values()) == 3
+
+    with pytest.raises(ValueError):
+        cb.run_convergence_evaluation_from_sample_file(
+            fname, workers=1, resume=True)
+
+    # a new run without resume starts over
+    inputs, samples, rerun = \
+        cb.run_convergence_evaluation_from_sample_file(
+            fname, workers=1, checkpoint_dir=checkpoint_dir)
+    assert len(rerun) == 5
+    assert len(set(r['run_id'] for r in rerun)) == 1
+
+
+def test_stats_solver_time():
+    results = [
+        _result('Sample-1', True, 10, 1.0, 5.0, False, 0, 100.0, 6.0,
+                time_function_evals=0.25, time_solver=0.75,
+                restoration_phases=0),
+        _result('Sample-2', True, 12, 2.0, 0.5, True, 0, 106.0, 2.0,
+                time_function_evals=0.5, time_solver=1.5,
+                restoration_phases=2),
+        _result('Sample-3', False, 500, 3.0, 1.5, True, 0, 108.0, 4.0)]
+    s = cb.Stats(results)
+    assert s.time_function_evals == pytest.approx(0.75)
+    assert s.time_solver == pytest.approx(2.25)
+    assert s.restoration_cases == 1
+
+
+_ipopt_log = """
+This is Ipopt version 3.12.12, running with linear solver ma27.
+
+iter    objective    inf_pr   inf_du lg(mu)  ||d||  lg(rg) alpha_du alpha_pr  ls
+   0  0.0000000e+00 1.00e+01 0.00e+00  -1.0 0.00e+00    -  0.00e+00 0.00e+00   0
+   1  0.0000000e+00 9.90e+00 1.00e+02  -1.0 1.00e+01    -  1.00e+00 1.00e-02h  1
+   2r 0.0000000e+00 9.90e+00 9.99e+02   1.0 0.00e+00    -  0.00e+00 0.00e+00R  1
+   3r 0.0000000e+00 2.00e+00 1.00e+01   1.0 9.00e+00    -  9.90e-01 1.00e+00f  1
+   4  0.0000000e+00 1.00e+00 1.00e-01  -1.0 1.00e+00    -  1.00e+00 1.00e+00h  1
+iter    objective    inf_pr   inf_du lg(mu)  ||d||  lg(rg) alpha_du alpha_pr  ls
+   5r 0.0000000e+00 1.00e+00 9.99e+02   0.0 0.00e+00    -  0.00e+00 0.00e+00R  1
+   6  0.0000000e+00 1.00e-09 1.00e-08  -3.8 1.00e+00    -  1.00e+00 1.00e+00h  1
+
+Number of Iterations....: 6
+
+                                   (scaled)                 (unscaled)
+Objective...............:   0.0000000000000000e+00    0.0000000000000000e+00
+Dual infeasibility......:   1.0000000000000000e-07    2.0000000000000000e-08
+Constraint violation....:   1.0000000000000000e-08    5.0000000000000000e-09
+Complementarity.........:   0.0000000000000000e+00    0.0000000000000000e+00
+Overall NLP error.......:   1.0000000000000000e-07    5.0000000000000000e-09
+
+
+Number of objective function evaluations             = 8
+Total CPU secs in IPOPT (w/o function evaluations)   =      0.125
+Total CPU secs in NLP function evaluations           =      0.500
+
+EXIT: Optimal Solution Found.
+"""
+
+
+def test_solver_statistics_from_ipopt():
+    status_obj = SolverResults()
+    status_obj.solver.termination_condition = \
+        TerminationCondition.optimal
+    stats = cb.SolverStatistics.from_ipopt(status_obj, _ipopt_log)
+    assert stats.termination_condition == 'optimal'
+    assert stats.iters == 6
+    assert stats.time_solver == pytest.approx(0.125)
+    assert stats.time_function_evals == pytest.approx(0.5)
+    assert stats.time == pytest.approx(0.625)
+    assert stats.restoration_iters == 3
+    assert stats.restoration_phases == 2
+    assert stats.primal_infeasibility == pytest.approx(5e-9)
+    assert stats.dual_infeasibility == pytest.approx(2e-8)
+    assert list(stats.to_dict().keys()) == list(cb.SolverStatistics.fields)
+
+    # newer versions of ipopt report the total time
+    log = _ipopt_log.replace('CPU secs', 'seconds') + \
+        'Total seconds in IPOPT                               = 0.700\n'
+    stats = cb.SolverStatistics.from_ipopt(status_obj, log)
+    assert stats.time_solver == pytest.approx(0.125)
+    assert stats.time == pytest.approx(0.7)
+
+    # no solver output
+    stats = cb.SolverStatistics.from_ipopt(status_obj, None)
+    assert stats.iters is None
+    assert stats.time is None
+    assert stats.restoration_phases is None
+
+
 if __name__ == '__main__':
     # test_convergence_evaluation_specification_file_fixedvar_mutableparam()
     # test_convergence_evaluation_specification_file_unfixedvar_mutableparam()
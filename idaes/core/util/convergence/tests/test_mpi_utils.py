@@ -0,0 +1,106 @@
+##############################################################################
+# Institute for the Design of Advanced Energy Systems Process Systems
+# Engineering Framework (IDAES PSE Framework) Copyright (c) 2018-2019, by the
+# software owners: The Regents of the University of California, through
+# Lawrence Berkeley National Laboratory,  National Technology & Engineering
+# Solutions of Sandia, LLC, Carnegie Mellon University, West Virginia
+# University Research Corporation, et al. All rights reserved.
+#
+# Please see the files COPYRIGHT.txt and LICENSE.txt for full copyright and
+# license information, respectively. Both files are also available online
+# at the URL "https://github.com/IDAES/idaes-pse".
+##############################################################################
+"""
+Tests for the parallel task managers used by convergence evaluation
+"""
+import os
+import pytest
+import idaes.core.util.convergence.mpi_utils as mpiu
+
+
+def _square_tasks(data, worker, offset):
+    # return the worker process id so we can check where tasks ran
+    return [(d*d + offset, worker, os.getpid()) for d in data]
+
+
+def test_process_pool_task_manager():
+    data = list(range(11))
+    task_mgr = mpiu.ProcessPoolTaskManager(len(data), n_workers=3)
+    assert task_mgr.n_workers == 3
+    assert task_mgr.is_root()
+
+    local_data = task_mgr.global_to_local_data(data)
+    assert local_data == data
+
+    results = task_mgr.run_tasks(_square_tasks, local_data, 1)
+    global_results = task_mgr.gather_global_data(results)
+    assert [r[0] for r in global_results] == [d*d + 1 for d in data]
+    # contiguous blocks of 4, 4 and 3 tasks
+    assert [r[1] for r in global_results] == [0]*4 + [1]*4 + [2]*3
+    assert os.getpid() not in [r[2] for r in global_results]
+
+
+def test_process_pool_task_manager_more_workers_than_tasks():
+    task_mgr = mpiu.ProcessPoolTaskManager(2, n_workers=8)
+    assert task_mgr.n_workers == 2
+
+
+def test_process_pool_task_manager_exception():
+    task_mgr = mpiu.ProcessPoolTaskManager(2, n_workers=2)
+    with pytest.raises(TypeError):
+        task_mgr.run_tasks(_square_tasks, ['a', 'b'], 1)
+
+
+def test_process_pool_task_manager_dynamic():
+    data = list(range(11))
+    task_mgr = mpiu.ProcessPoolTaskManager(len(data), n_workers=3)
+    done = []
+
+    def _progress(n_done, n_total, result):
+        done.append(n_done)
+        assert n_total == 11
+
+    results = task_mgr.run_tasks_dynamic(_square_tasks, data, 2,
+                                         progress=_progress)
+    assert [r[0] for r in results] == [d*d + 2 for d in data]
+    assert done == list(range(1, 12))
+    # tasks are run by the pool workers, which are numbered 0 to 2
+    assert set(r[1] for r in results).issubset(set([0, 1, 2]))
+    assert os.getpid() not in [r[2] for r in results]
+
+
+def test_parallel_task_manager_dynamic_serial():
+    data = list(range(5))
+    task_mgr = mpiu.ParallelTaskManager(
+        len(data), mpi_interface=_SerialInterface())
+    results = task_mgr.run_tasks_dynamic(_square_tasks, data, 0)
+    assert [r[0] for r in results] == [d*d for d in data]
+    assert [r[1] for r in results] == [0]*5
+
+
+class _SerialInterface(object):
+    have_mpi = False
+    comm = None
+    rank = None
+    size = None
+
+
+def test_get_task_manager():
+    task_mgr = mpiu.get_task_manager(10, n_workers=4)
+    if isinstance(task_mgr, mpiu.ParallelTaskManager):
+        # running under MPI
+        assert task_mgr._mpi_interface.size > 1
+    else:
+        assert isinstance(task_mgr, mpiu.ProcessPoolTaskManager)
+        assert task_mgr.n_workers == 4
+
+    task_mgr = mpiu.get_task_manager(10)
+    assert isinstance(task_mgr, mpiu.ParallelTaskManager)
+
+    task_mgr = mpiu.get_task_manager(10, n_workers=1)
+    assert isinstance(task_mgr, mpiu.ParallelTaskManager)
+    results = task_mgr.run_tasks(_square_tasks,
+                                 task_mgr.global_to_local_data(list(range(10))),
+                                 0)
+    assert [r[0] for r in task_mgr.gather_global_data(results)] == \
+        [d*d for d in range(10)]
@@ -15,30 +15,68 @@
 This module contains utility functions for initialization of IDAES models.
 """
 
-from pyomo.environ import Block
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import uuid
+
+import numpy as np
+
+from pyomo.environ import Block, Constraint, Objective, Param, Var, value
+from pyomo.core.base.component import Component, ComponentData
+from pyomo.core.expr.current import identify_variables
+from pyomo.core.kernel.component_map import ComponentMap
+from pyomo.network import Arc, Port
+
+from idaes.core.util.model_serializer import StateSnapshot
+from idaes.core.util.residuals import max_residual
 
 __author__ = "Andrew Lee, John Siirola"
 
+# Set up logger
+_log = logging.getLogger(__name__)
+
+# Solver, solver keyword arguments and groups for the current parallel
+# decomposed solve. This is set before the worker processes are forked.
+_pool_solve = None
+
 
 # HACK, courtesy of J. Siirola
-def solve_indexed_blocks(solver, blocks, **kwds):
+def solve_indexed_blocks(solver, blocks, decompose=False,
+                         group_identical=False, workers=None, **kwds):
     """
     This method allows for solving of Indexed Block components as if they were
     a single Block. A temporary Block object is created which is populated with
     the contents of the objects in the blocks argument and then solved.
 
+    If decompose is True, the elements of the blocks are split into groups
+    that don't share any unfixed variables, and each group is solved as a
+    separate problem (see solve_indexed_blocks_decomposed).
+
     Args:
         solve : a Pyomo solver object to use when solving the Indexed Block
         blocks : an object which inherits from Block, or a list of Blocks
+        decompose : if True solve independent elements separately
+        group_identical : if True (and decompose is True) solve elements with
+            identical structure and fixed values only once
+        workers : number of processes to use for decomposed solves
         kwds : a dict of argumnets to be passed to the solver
 
     Returns:
-        A Pyomo solver results object
+        A Pyomo solver results object, or if decompose is True a ComponentMap
+        with a solver results object for each block element
     """
     # Check blocks argument, and convert to a list of Blocks
     if isinstance(blocks, Block):
         blocks = [blocks]
 
+    if decompose:
+        return solve_indexed_blocks_decomposed(
+            solver, blocks, group_identical=group_identical, workers=workers,
+            **kwds)
+
     try:
         # Create a temporary Block
         tmp = Block(concrete=True)
@@ -74,3 +112,458 @@ def solve_indexed_blocks(solver, blocks, **kwds):
 
     # Return results
     return results
+
+
+def _block_elements(blocks):
+    """
+    Get the list of active BlockData elements in a list of (possibly indexed)
+    Blocks.
+    """
+    elements = []
+    for b in blocks:
+        if not isinstance(b, Block):
+            raise TypeError("Trying to apply solve_indexed_blocks to "
+                            "object containing non-Block objects")
+        if b.is_indexed():
+            elements.extend(el for el in b.values() if el.active)
+        elif b.active:
+            elements.append(b)
+    return elements
+
+
+def _element_variables(el):
+    """
+    Get the variables that appear in the active constraints and objectives of
+    a block element.
+
+    Returns:
+        (unfixed, fixed) lists of variables in order of first appearance
+    """
+    unfixed = []
+    fixed = []
+    seen = set()
+    for ctype in (Constraint, Objective):
+        for c in el.component_data_objects(ctype, active=True,
+                                           descend_into=True):
+            expr = c.body if ctype is Constraint else c.expr
+            for v in identify_variables(expr, include_fixed=True):
+                if id(v) in seen:
+                    continue
+                seen.add(id(v))
+                if v.fixed:
+                    fixed.append(v)
+                else:
+                    unfixed.append(v)
+    return unfixed, fixed
+
+
+def _element_signature(el, unfixed, fixed):
+    """
+    Make a key for a block element such that elements with the same key have
+    the same equations, fixed variable values and parameter values. Elements
+    built by the same rule have the same equations if their component names
+    are the same. Returns None if the element's problem includes unfixed
+    variables outside the element, since its solution can't be copied to
+    another element.
+    """
+    internal = set(id(v) for v in el.component_data_objects(
+        Var, descend_into=True))
+
+    def name(o):
+        if id(o) in internal:
+            return o.getname(fully_qualified=True, relative_to=el)
+        return o.name
+
+    if any(id(v) not in internal for v in unfixed):
+        return None
+    return (
+        type(el),
+        tuple((c.getname(fully_qualified=True, relative_to=el),
+               value(c.lower), value(c.upper))
+              for c in el.component_data_objects(
+                  Constraint, active=True, descend_into=True)),
+        tuple(name(v) for v in unfixed),
+        tuple((name(v), v.value) for v in fixed),
+        tuple(value(p) for p in el.component_data_objects(
+            Param, descend_into=True)))
+
+
+def _solve_elements(solver, elements, **kwds):
+    """
+    Solve a group of block elements together. A single element is solved
+    directly, otherwise the components containing the elements are solved with
+    the other elements temporarily deactivated.
+    """
+    if len(elements) == 1:
+        return solver.solve(elements[0], **kwds)
+    keep = set(id(el) for el in elements)
+    parents = []
+    for el in elements:
+        p = el.parent_component()
+        if not any(p is q for q in parents):
+            parents.append(p)
+    others = [el for p in parents for el in p.values()
+              if id(el) not in keep and el.active]
+    for el in others:
+        el.deactivate()
+    try:
+        return solve_indexed_blocks(solver, parents, **kwds)
+    finally:
+        for el in others:
+            el.activate()
+
+
+def _pool_solve_group(i):
+    """
+    Solve a group of block elements in a worker process and return the
+    results and the values of the unfixed variables.
+    """
+    solver, kwds, groups = _pool_solve
+    elements, var_list = groups[i]
+    results = _solve_elements(solver, elements, **kwds)
+    return results, [v.value for v in var_list]
+
+
+def solve_indexed_blocks_decomposed(solver, blocks, group_identical=False,
+                                    workers=None, **kwds):
+    """
+    Solve the elements of Indexed Block components as separate problems.  The
+    elements are grouped so that elements sharing an unfixed variable (through
+    constraints or objectives) are solved together, and each group is solved
+    separately. For example, the state blocks in a 1D control volume are
+    usually all independent, so each one is solved as a small problem instead
+    of one large problem. Deactivated elements are skipped.
+
+    Args:
+        solver : a Pyomo solver object to use when solving the blocks
+        blocks : an object which inherits from Block, or a list of Blocks
+        group_identical : if True, elements with the same equations, fixed
+            variable values and parameter values are only solved once, and the
+            solution is copied to the other elements. Equations are taken to be
+            the same if the elements are of the same type and have the same
+            component names (true for elements built by the same rule).
+        workers : number of processes used to solve the groups in parallel.
+            Worker processes are forked and the solutions are sent back to
+            this process. If None or 1, or if fork is not available on the
+            platform, the groups are solved one at a time.
+        kwds : a dict of argumnets to be passed to the solver
+
+    Returns:
+        A ComponentMap with a Pyomo solver results object for each element, so
+        failures can be checked element by element.
+    """
+    global _pool_solve
+    if isinstance(blocks, Block):
+        blocks = [blocks]
+    elements = _block_elements(blocks)
+    variables = [_element_variables(el) for el in elements]
+
+    # Union elements that share unfixed variables
+    parent = list(range(len(elements)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    owner = {}
+    for i, (unfixed, fixed) in enumerate(variables):
+        for v in unfixed:
+            j = owner.setdefault(id(v), i)
+            if j != i:
+                parent[find(i)] = find(j)
+    members = {}
+    for i in range(len(elements)):
+        members.setdefault(find(i), []).append(i)
+
+    # List the groups to solve, and elements that copy another's solution
+    groups = []
+    copies = []
+    signatures = {}
+    for root in sorted(members):
+        idx = members[root]
+        sig = None
+        if group_identical and len(idx) == 1:
+            sig = _element_signature(elements[idx[0]], *variables[idx[0]])
+        if sig is not None and sig in signatures:
+            copies.append((idx[0], signatures[sig]))
+            continue
+        if sig is not None:
+            signatures[sig] = len(groups)
+        var_list = []
+        seen = set()
+        for i in idx:
+            for v in variables[i][0]:
+                if id(v) not in seen:
+                    seen.add(id(v))
+                    var_list.append(v)
+        groups.append(([elements[i] for i in idx], var_list, idx))
+
+    # Solve the groups
+    if (workers is not None and workers > 1 and len(groups) > 1 and
+            "fork" in multiprocessing.get_all_start_methods()):
+        _pool_solve = (solver, kwds, [(g[0], g[1]) for g in groups])
+        try:
+            ctx = multiprocessing.get_context("fork")
+            pool = ctx.Pool(processes=min(workers, len(groups)))
+            try:
+                solved = pool.map(_pool_solve_group, range(len(groups)))
+            finally:
+                pool.close()
+                pool.join()
+        finally:
+            _pool_solve = None
+        for (els, var_list, idx), (res, vals) in zip(groups, solved):
+            for v, x in zip(var_list, vals):
+                v.value = x
+    else:
+        solved = []
+        for els, var_list, idx in groups:
+            solved.append((_solve_elements(solver, els, **kwds), None))
+
+    results = ComponentMap()
+    for (els, var_list, idx), (res, vals) in zip(groups, solved):
+        for el in els:
+            results[el] = res
+    for i, g in copies:
+        for v, src in zip(variables[i][0], groups[g][1]):
+            v.value = src.value
+        results[elements[i]] = solved[g][0]
+    return results
+
+
+def _quantize(x, digits):
+    """
+    Round a number to a number of significant digits, so nearly identical
+    inputs give the same cache key.
+    """
+    if x is None:
+        return None
+    return float("%.*g" % (digits, x))
+
+
+def _config_key(cfg):
+    """
+    Convert a ConfigBlock to a JSON serializable form for a cache key.
+    Components are represented by name and classes and functions by their
+    qualified name, since their repr includes a memory address.
+    """
+    if hasattr(cfg, "keys") and hasattr(cfg, "value"): # ConfigBlock
+        return [[k, _config_key(cfg[k])] for k in cfg.keys()]
+    if isinstance(cfg, dict):
+        return [[str(k), _config_key(v)] for k, v in sorted(
+            cfg.items(), key=lambda i: str(i[0]))]
+    if isinstance(cfg, (list, tuple)):
+        return [_config_key(v) for v in cfg]
+    if cfg is None or isinstance(cfg, (bool, int, float, str)):
+        return cfg
+    if isinstance(cfg, (Component, ComponentData)):
+        return cfg.name
+    if hasattr(cfg, "__name__"):
+        return "{}.{}".format(getattr(cfg, "__module__", ""), cfg.__name__)
+    return str(cfg)
+
+
+def _unit_class_name(unit):
+    """
+    Name of the class of a unit model. The Scalar/Indexed classes created by
+    declare_process_block_class are skipped, so scalar and indexed units of
+    the same type get the same name.
+    """
+    for cls in type(unit).__mro__:
+        if cls.__module__ != "idaes.core.process_block":
+            return "{}.{}".format(cls.__module__, cls.__name__)
+
+
+class InitializationCache(object):
+    """
+    A persistent on-disk cache of unit model initialization results. The key
+    for a unit is a hash of its class, its config, its quantized fixed
+    variable and mutable parameter values, and its quantized inlet port
+    values. The values of the unit's variables after initialization are
+    stored under that key.  When a unit with the same key is initialized
+    again, the stored values of the variables that are not fixed are loaded
+    and the unit's initialize method is not called.
+
+    Inlet ports are the ports whose variables belong to a state block with
+    defined_state = True, and ports that are the destination of an Arc. The
+    cache directory is limited to max_size bytes by deleting the least
+    recently used entries. Entries are single files written atomically, so a
+    cache directory can be shared by several processes.
+
+    Args:
+        path: cache directory, created if it doesn't exist
+        max_size: maximum total size of the cache files in bytes
+        digits: number of significant digits inputs are rounded to for the
+            key
+        residual_tol: if not None, results are only stored when the largest
+            absolute residual of the unit's active constraints after
+            initialization is less than residual_tol. This avoids storing
+            failed initializations.
+    """
+    def __init__(self, path, max_size=100*2**20, digits=6, residual_tol=None):
+        """
+        (see above)
+        """
+        self.path = path
+        self.max_size = max_size
+        self.digits = digits
+        self.residual_tol = residual_tol
+        self.hits = 0
+        self.misses = 0
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def _inlet_ports(self, unit):
+        """
+        Get the list of inlet ports of a unit.
+        """
+        destinations = set()
+        for arc in unit.model().component_data_objects(
+                Arc, descend_into=True):
+            if arc.directed:
+                destinations.add(id(arc.destination))
+        ports = []
+        for port in unit.component_data_objects(Port, descend_into=False):
+            inlet = id(port) in destinations
+            if not inlet:
+                for k, v in port.vars.items():
+                    for d in v.values():
+                        cfg = getattr(d.parent_block(), "config", None)
+                        if getattr(cfg, "defined_state", False) is True:
+                            inlet = True
+                        break
+                    break
+            if inlet:
+                ports.append(port)
+        return ports
+
+    def key(self, unit, snapshot=None):
+        """
+        Calculate the cache key for a unit.
+
+        Args:
+            unit: unit model
+            snapshot: StateSnapshot of the unit variables, if None it is
+                created
+
+        Returns:
+            hex string key
+        """
+        q = self.digits
+        if snapshot is None:
+            snapshot = StateSnapshot(unit, bounds=False, params=False,
+                                     active=False)
+        fixed = [[v.getname(fully_qualified=True, relative_to=unit),
+                  _quantize(v.value, q)]
+                 for v in snapshot.var_data if v.fixed]
+        params = [[p.getname(fully_qualified=True, relative_to=unit),
+                   _quantize(value(p, exception=False), q)]
+                  for c in unit.component_objects(Param, descend_into=True)
+                  if c._mutable for p in c.values()]
+        inlets = []
+        for port in self._inlet_ports(unit):
+            for k, v in port.vars.items():
+                inlets.append([port.local_name, k, [
+                    _quantize(value(d, exception=False), q)
+                    for d in v.values()]])
+        d = [_unit_class_name(unit), _config_key(unit.config),
+             len(snapshot.var_data), fixed, params, inlets]
+        return hashlib.sha1(json.dumps(d).encode("utf-8")).hexdigest()
+
+    def _fname(self, key):
+        return os.path.join(self.path, key + ".npy")
+
+    def load(self, unit, key, snapshot):
+        """
+        Load stored values of the unfixed variables of a unit.
+
+        Returns:
+            True if the key was in the cache, otherwise False
+        """
+        fname = self._fname(key)
+        try:
+            vals = np.load(fname)
+        except (IOError, OSError, ValueError):
+            return False
+        if len(vals) != len(snapshot.var_data):
+            return False
+        idx = np.array([i for i, v in enumerate(snapshot.var_data)
+                        if not v.fixed], dtype=int)
+        snapshot.load_delta({"value": (idx, vals[idx])})
+        try:
+            os.utime(fname, None) # mark as recently used
+        except OSError:
+            pass
+        return True
+
+    def store(self, key, snapshot):
+        """
+        Store the current values of the unit variables, then evict least
+        recently used entries if the cache is too big.
+        """
+        tmp = os.path.join(self.path, ".tmp.{}.npy".format(uuid.uuid4().hex))
+        np.save(tmp, snapshot.save()["value"])
+        os.replace(tmp, self._fname(key))
+        self._evict()
+
+    def _evict(self):
+        """
+        Delete least recently used entries until the cache size is at most
+        max_size.
+        """
+        entries = []
+        total = 0
+        for f in os.listdir(self.path):
+            if f.startswith(".") or not f.endswith(".npy"):
+                continue
+            fname = os.path.join(self.path, f)
+            try:
+                st = os.stat(fname)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, fname))
+            total += st.st_size
+        entries.sort()
+        while total > self.max_size and entries:
+            mtime, size, fname = entries.pop(0)
+            try:
+                os.remove(fname)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        """
+        Delete all entries in the cache.
+        """
+        for f in os.listdir(self.path):
+            if f.endswith(".npy"):
+                os.remove(os.path.join(self.path, f))
+
+    def initialize(self, unit, **kwargs):
+        """
+        Initialize a unit, using the cache if possible.
+
+        Args:
+            unit: unit model to initialize
+            kwargs: keyword arguments for the unit's initialize method
+
+        Returns:
+            True if the unit state was loaded from the cache, False if the
+            unit's initialize method was called
+        """
+        snapshot = StateSnapshot(unit, bounds=False, params=False,
+                                 active=False)
+        key = self.key(unit, snapshot)
+        if self.load(unit, key, snapshot):
+            self.hits += 1
+            _log.debug("{} initialization loaded from cache".format(unit.name))
+            return True
+        self.misses += 1
+        unit.initialize(**kwargs)
+        if self.residual_tol is None or \
+                max_residual(unit) < self.residual_tol:
+            self.store(key, snapshot)
+        return False
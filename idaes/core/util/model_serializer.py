@@ -21,11 +21,15 @@ from __future__ import absolute_import #disable implicit relative imports
 from pyomo.environ import *
 from pyomo.network import Port, Arc
 from pyomo.dae import *
-from pyomo.core.base.component import ComponentData
+from pyomo.core.base.component import (
+    ComponentData, ActiveComponent, ActiveComponentData)
+import numpy as np
 import json
 import datetime
 import time
 import gzip
+import struct
+import zipfile
 
 # Some more inforation about this module
 __author__ = "John Eslick"
@@ -800,3 +804,386 @@ def from_json(o, sd=None, fname=None, s=None, wts=None, gz=False):
     pdict["etime_read_dict"] = read_time - dict_time
     pdict["etime_read_suffixes"] = suffix_time - read_time
     return pdict
+
+
+def _nan_to_none(a):
+    """
+    Convert an array of floats to a list, replacing NaN with None.
+    Args:
+        a: numpy array
+    Returns:
+        list
+    """
+    return [None if x != x else x for x in a.tolist()]
+
+_snapshot_keys = ("value", "fixed", "lb", "ub", "param", "active")
+
+class StateSnapshot(object):
+    """
+    An array-backed snapshot of a model state. When the snapshot is created the
+    model is walked once to collect an ordered list of variable data, mutable
+    parameter data, and active component/component data objects. After that,
+    save() reads the current state into NumPy arrays and load() writes a saved
+    state back, without building nested dictionaries or looking up components
+    by name. This is meant for cases where the state of the same model is saved
+    and loaded many times (e.g. initialization routines or repeated solves).
+
+    A saved state is a dict of NumPy arrays with the keys "value", "fixed",
+    "lb", "ub" (variable data), "param" (mutable parameter data), and "active"
+    (active flags).  A missing value or bound is stored as NaN.  The state can
+    only be loaded into the model the snapshot was created for, and the
+    snapshot must be recreated if components are added to or removed from the
+    model.
+
+    For states that are saved repeatedly with only small changes (e.g. in
+    dynamic studies), save_delta() records only the entries that differ from a
+    base state and load_delta() sets only those entries.
+
+    Args:
+        o: Pyomo block to snapshot
+        bounds: If True save/load variable bounds
+        params: If True save/load mutable parameter values
+        active: If True save/load if components are active
+    """
+    def __init__(self, o, bounds=True, params=True, active=True):
+        """
+        (see above)
+        """
+        self.component = o
+        self.include_bounds = bounds
+        self.include_params = params
+        self.include_active = active
+        self.var_data = list(o.component_data_objects(Var, descend_into=True))
+        self.param_data = []
+        if params:
+            for p in o.component_objects(Param, descend_into=True):
+                if p._mutable:
+                    self.param_data.extend(p.values())
+        self.active_data = []
+        if active:
+            if isinstance(o, (ActiveComponent, ActiveComponentData)):
+                self.active_data.append(o)
+            # Components come before their data so that loading an indexed
+            # component's active flag doesn't override its data's flags
+            for c in o.component_objects(descend_into=True):
+                if not isinstance(c, ActiveComponent):
+                    continue
+                if c.is_indexed():
+                    self.active_data.append(c)
+                    self.active_data.extend(c.values())
+                else:
+                    self.active_data.append(c)
+
+    def save(self):
+        """
+        Save the current model state to arrays.
+
+        Returns:
+            A dict of NumPy arrays containing the model state
+        """
+        vd = self.var_data
+        state = {
+            "value":np.array([v.value for v in vd], dtype=float),
+            "fixed":np.array([v.fixed for v in vd], dtype=bool)}
+        if self.include_bounds:
+            state["lb"] = np.array([v.lb for v in vd], dtype=float)
+            state["ub"] = np.array([v.ub for v in vd], dtype=float)
+        if self.include_params:
+            state["param"] = np.array(
+                [p.value for p in self.param_data], dtype=float)
+        if self.include_active:
+            state["active"] = np.array(
+                [c.active for c in self.active_data], dtype=bool)
+        return state
+
+    def _data_list(self, key):
+        """
+        Get the list of component data objects for a state key.
+        """
+        if key == "param":
+            return self.param_data
+        elif key == "active":
+            return self.active_data
+        return self.var_data
+
+    def _set(self, key, objs, x):
+        """
+        Set a state attribute for a list of component data objects.
+
+        Args:
+            key: state key ("value", "fixed", "lb", "ub", "param", or "active")
+            objs: list of component data objects
+            x: array of values to set
+        Returns:
+            None
+        """
+        if key in ("value", "param"):
+            for o, d in zip(objs, _nan_to_none(x)):
+                o.value = d
+        elif key == "fixed":
+            for o, d in zip(objs, x.tolist()):
+                o.fixed = d
+        elif key == "lb":
+            for o, d in zip(objs, _nan_to_none(x)):
+                o.setlb(d)
+        elif key == "ub":
+            for o, d in zip(objs, _nan_to_none(x)):
+                o.setub(d)
+        elif key == "active":
+            for o, d in zip(objs, x.tolist()):
+                if o.active != d:
+                    _set_active(o, d)
+
+    def load(self, state):
+        """
+        Load a model state saved by save().  Only the keys present in state are
+        loaded, so removing a key from the state dict (e.g. "fixed") will skip
+        loading that part of the state.
+
+        Args:
+            state: dict of NumPy arrays from save()
+        Returns:
+            None
+        """
+        for k in _snapshot_keys:
+            if k not in state:
+                continue
+            objs = self._data_list(k)
+            if len(state[k]) != len(objs):
+                raise ValueError(
+                    "State '{}' has {} elements, but the snapshot expects {}."
+                    " The state is not from this snapshot.".format(
+                        k, len(state[k]), len(objs)))
+        for k in _snapshot_keys:
+            if k in state:
+                self._set(k, self._data_list(k), state[k])
+
+    def save_delta(self, base):
+        """
+        Save only the parts of the current model state that differ from a base
+        state.  Reading the current state still visits the whole model, but
+        the delta only holds the changed entries, so storing it and loading it
+        with load_delta() is proportional to the size of the change.
+
+        Args:
+            base: state dict from save() to compare with
+        Returns:
+            A dict with the same keys as base, where each value is a tuple of
+            (array of changed positions, array of new values)
+        """
+        state = self.save()
+        delta = {}
+        for k in base:
+            if k not in state:
+                continue
+            new, old = state[k], base[k]
+            changed = new != old
+            if new.dtype.kind == "f": # NaN (None) != NaN, so that's no change
+                changed &= ~(np.isnan(new) & np.isnan(old))
+            idx = np.flatnonzero(changed)
+            delta[k] = (idx, new[idx])
+        return delta
+
+    def load_delta(self, delta):
+        """
+        Load a delta from save_delta().  Only the changed entries are set.
+
+        Args:
+            delta: dict from save_delta()
+        Returns:
+            None
+        """
+        for k in _snapshot_keys:
+            if k not in delta:
+                continue
+            idx, x = delta[k]
+            objs = self._data_list(k)
+            if len(idx) and idx.max() >= len(objs):
+                raise ValueError(
+                    "Delta '{}' has an index out of range for the snapshot."
+                    " The delta is not from this snapshot.".format(k))
+            self._set(k, [objs[i] for i in idx.tolist()], x)
+
+    @staticmethod
+    def apply_delta(state, delta):
+        """
+        Apply a delta to a state dict without loading it into the model.  This
+        can be used to combine a base state and a series of deltas.
+
+        Args:
+            state: state dict from save()
+            delta: dict from save_delta()
+        Returns:
+            New state dict with the delta applied
+        """
+        new = dict((k, v.copy()) for k, v in state.items())
+        for k, (idx, x) in delta.items():
+            if k in new:
+                new[k][idx] = x
+        return new
+
+def _block_key(o):
+    """
+    Key used for a block in the npz state file index. Fully qualified names
+    don't include the name of the top level model, so the top level model
+    gets the key "" and other blocks use their fully qualified name.
+    """
+    if o.parent_block() is None:
+        return ""
+    return o.getname(fully_qualified=True)
+
+def _block_index(o, snap):
+    """
+    Make the block index for a npz state file.  The snapshot lists are in
+    depth-first block order, so the entries for each block and its sub-blocks
+    are a contiguous slice of the snapshot arrays.
+
+    Args:
+        o: block the snapshot was taken of
+        snap: StateSnapshot of o
+    Returns:
+        (names, index) where names is a list of block keys and index is an
+        array with a row for each block with the columns: var start, var stop,
+        param start, param stop, position of the block's own active flag (-1 if
+        not stored), active start, active stop.
+    """
+    blocks = list(o.block_data_objects(descend_into=True))
+    own = dict((id(b), [0, 0, 0]) for b in blocks)
+    for j, lst in enumerate((snap.var_data, snap.param_data, snap.active_data)):
+        for c in lst:
+            p = own.get(id(c.parent_block()))
+            if p is not None:
+                p[j] += 1
+    total = dict((k, list(v)) for k, v in own.items())
+    for b in reversed(blocks):
+        p = total.get(id(b.parent_block()))
+        if p is not None:
+            for j in range(3):
+                p[j] += total[id(b)][j]
+    active_pos = dict((id(c), i) for i, c in enumerate(snap.active_data))
+    # anything not owned by a block in the list is o itself, which comes first
+    start = [0, 0, len(snap.active_data) - sum(v[2] for v in own.values())]
+    names = []
+    index = np.zeros((len(blocks), 7), dtype=np.int64)
+    for i, b in enumerate(blocks):
+        t = total[id(b)]
+        names.append(_block_key(b))
+        index[i] = (start[0], start[0] + t[0], start[1], start[1] + t[1],
+                    active_pos.get(id(b), -1), start[2], start[2] + t[2])
+        for j in range(3):
+            start[j] += own[id(b)][j]
+    return names, index
+
+def _npz_arrays(fname, mmap=True):
+    """
+    Get the arrays in a npz file. If mmap is True, arrays that are stored
+    uncompressed are memory-mapped, so only the parts of the arrays that are
+    used are read from disk. Compressed arrays are read when accessed.
+
+    Args:
+        fname: npz file name
+        mmap: If True memory-map uncompressed arrays
+    Returns:
+        dict-like object with array name keys
+    """
+    if not mmap:
+        return np.load(fname)
+    arrays = {}
+    npz = None
+    with zipfile.ZipFile(fname) as zf, open(fname, "rb") as f:
+        for info in zf.infolist():
+            key = info.filename[:-4] # strip .npy
+            if info.compress_type != zipfile.ZIP_STORED:
+                if npz is None:
+                    npz = np.load(fname)
+                arrays[key] = npz[key]
+                continue
+            # array data follows the zip local file header and the npy header
+            f.seek(info.header_offset)
+            lfh = f.read(30)
+            n, m = struct.unpack("<HH", lfh[26:30])
+            f.seek(info.header_offset + 30 + n + m)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            if int(np.prod(shape)) == 0:
+                arrays[key] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[key] = np.memmap(
+                    fname, dtype=dtype, mode="r", shape=shape,
+                    offset=f.tell(), order="F" if fortran else "C")
+    return arrays
+
+def to_npz(o, fname, bounds=True, params=True, active=True, compress=False):
+    """
+    Save the state of a block to a binary NumPy npz file. The file contains
+    the state arrays from StateSnapshot.save() plus an index that gives the
+    slice of each array belonging to each sub-block, so a single sub-block can
+    be loaded from the file with from_npz without reading the rest.
+
+    Args:
+        o: Pyomo block to save
+        fname: file name to write
+        bounds: If True save variable bounds
+        params: If True save mutable parameter values
+        active: If True save if components are active
+        compress: If True compress the file. Compressed files can't be
+            memory-mapped, so partial loads will read the full arrays.
+
+    Returns:
+        None
+    """
+    snap = StateSnapshot(o, bounds=bounds, params=params, active=active)
+    state = snap.save()
+    names, index = _block_index(o, snap)
+    state["index_names"] = np.array(names, dtype=str)
+    state["index"] = index
+    state["format_version"] = np.array(__format_version__)
+    if compress:
+        np.savez_compressed(fname, **state)
+    else:
+        np.savez(fname, **state)
+
+def from_npz(o, fname, mmap=True):
+    """
+    Load the state of a block from a npz file written by to_npz.  The block o
+    can be the block that was saved or any of its sub-blocks (e.g. a single
+    unit model from a saved flowsheet), in which case only the part of the
+    file for the sub-block is read.  The model structure must be the same as
+    when the file was saved.
+
+    Args:
+        o: Pyomo block to load
+        fname: npz file to read
+        mmap: If True memory-map the file arrays
+
+    Returns:
+        None
+    """
+    arrays = _npz_arrays(fname, mmap=mmap)
+    key = _block_key(o)
+    names = [str(n) for n in arrays["index_names"]]
+    try:
+        i = names.index(key)
+    except ValueError:
+        raise ValueError(
+            "Block '{}' is not in the state file {}".format(key, fname))
+    vs, ve, ps, pe, apos, a_s, ae = [int(x) for x in arrays["index"][i]]
+    snap = StateSnapshot(o, bounds="lb" in arrays, params="param" in arrays,
+                         active="active" in arrays)
+    state = {
+        "value":np.array(arrays["value"][vs:ve]),
+        "fixed":np.array(arrays["fixed"][vs:ve])}
+    if "lb" in arrays:
+        state["lb"] = np.array(arrays["lb"][vs:ve])
+        state["ub"] = np.array(arrays["ub"][vs:ve])
+    if "param" in arrays:
+        state["param"] = np.array(arrays["param"][ps:pe])
+    if "active" in arrays:
+        act = np.array(arrays["active"][a_s:ae])
+        if apos >= 0:
+            act = np.concatenate(([arrays["active"][apos]], act))
+        state["active"] = act
+    snap.load(state)
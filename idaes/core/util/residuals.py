@@ -0,0 +1,52 @@
+# -*- coding: UTF-8 -*-
+##############################################################################
+# Institute for the Design of Advanced Energy Systems Process Systems
+# Engineering Framework (IDAES PSE Framework) Copyright (c) 2018-2019, by the
+# software owners: The Regents of the University of California, through
+# Lawrence Berkeley National Laboratory,  National Technology & Engineering
+# Solutions of Sandia, LLC, Carnegie Mellon University, West Virginia
+# University Research Corporation, et al. All rights reserved.
+#
+# Please see the files COPYRIGHT.txt and LICENSE.txt for full copyright and
+# license information, respectively. Both files are also available online
+# at the URL "https://github.com/IDAES/idaes-pse".
+##############################################################################
+"""
+This module contains utility functions for the constraint residuals of
+IDAES models.
+"""
+
+from pyomo.environ import Constraint, value
+
+
+def _residual(c):
+    """
+    Residual of a constraint data object, the larger of lower - body and
+    body - upper, so it is positive when the constraint is violated.
+    """
+    body = value(c.body)
+    res = -float("inf")
+    if c.lower is not None:
+        res = max(res, value(c.lower) - body)
+    if c.upper is not None:
+        res = max(res, body - value(c.upper))
+    return res
+
+
+def max_residual(blk):
+    """
+    Return the largest residual of the active constraints in a block, or in
+    all the elements of an indexed block.
+
+    Args:
+        blk: a Pyomo block in which to look for constraints
+
+    Returns:
+        Largest residual, 0 if no constraints are violated
+    """
+    res = 0.0
+    for b in (blk.values() if blk.is_indexed() else [blk]):
+        for c in b.component_data_objects(
+                Constraint, active=True, descend_into=True):
+            res = max(res, _residual(c))
+    return res
@@ -0,0 +1,78 @@
+##############################################################################
+# Institute for the Design of Advanced Energy Systems Process Systems
+# Engineering Framework (IDAES PSE Framework) Copyright (c) 2018-2019, by the
+# software owners: The Regents of the University of California, through
+# Lawrence Berkeley National Laboratory,  National Technology & Engineering
+# Solutions of Sandia, LLC, Carnegie Mellon University, West Virginia
+# University Research Corporation, et al. All rights reserved.
+#
+# Please see the files COPYRIGHT.txt and LICENSE.txt for full copyright and
+# license information, respectively. Both files are also available online
+# at the URL "https://github.com/IDAES/idaes-pse".
+##############################################################################
+"""
+Tests for the build profiler.
+"""
+import pytest
+from pyomo.environ import ConcreteModel, Var
+from idaes.core import ProcessBlockData, declare_process_block_class
+from idaes.core.util.build_profiler import (BuildProfiler, build_step,
+                                            active_profiler)
+
+
+@declare_process_block_class("_Inner")
+class _InnerData(ProcessBlockData):
+    def build(self):
+        self.x = Var([1, 2, 3])
+
+
+@declare_process_block_class("_Outer")
+class _OuterData(ProcessBlockData):
+    def build(self):
+        self.add_inner()
+        self.y = Var()
+
+    @build_step
+    def add_inner(self):
+        self.inner = _Inner([1, 2])
+        self.z = Var()
+
+
+def test_build_profiler(tmpdir):
+    m = ConcreteModel()
+    with BuildProfiler() as prof:
+        assert active_profiler() is prof
+        m.a = _Outer()
+    assert active_profiler() is None
+
+    outer = prof.root.children["a (_Outer)"]
+    assert outer.calls == 1
+    # counts include the implicit index sets of inner and x
+    assert outer.components == 5  # inner[1], inner[2], inner_index, z, y
+    step = outer.children["add_inner"]
+    assert step.components == 4
+    inner = step.children["inner (_Inner)"]
+    assert inner.calls == 2
+    assert inner.components == 8
+    assert outer.time >= step.time >= inner.time > 0
+    assert outer.memory > 0
+
+    lines = prof.report().splitlines()
+    assert len(lines) == 4
+    assert lines[3].endswith("    inner (_Inner)")
+    folded = prof.folded().splitlines()
+    assert folded[2].startswith("a (_Outer);add_inner;inner (_Inner) ")
+    fname = str(tmpdir.join("build.folded"))
+    prof.write_folded(fname)
+    with open(fname) as f:
+        assert f.read() == prof.folded()
+
+    # building without a profiler isn't recorded
+    m.b = _Outer()
+    assert "b (_Outer)" not in prof.root.children
+
+
+def test_build_profiler_nested_error():
+    with BuildProfiler(trace_memory=False):
+        with pytest.raises(RuntimeError):
+            BuildProfiler().enable()
@@ -14,11 +14,18 @@
 Tests for math util methods.
 """
 
+import multiprocessing
+import os
+
 import pytest
 from pyomo.environ import Block, ConcreteModel,  Constraint, \
                             Set, SolverFactory, Var, value
-from pyomo.network import Port
-from idaes.core.util.initialization import solve_indexed_blocks
+from pyomo.network import Arc, Port
+from pyomo.opt import SolverResults, TerminationCondition
+from idaes.core import (declare_process_block_class, FlowsheetBlock,
+                        UnitModelBlockData)
+from idaes.core.util.initialization import (solve_indexed_blocks,
+                                            InitializationCache)
 
 __author__ = "Andrew Lee"
 
@@ -71,3 +78,210 @@ def test_solve_indexed_block_error():
     # Try solve_indexed_block on non-block object
     with pytest.raises(TypeError):
         solve_indexed_blocks(solver=None, blocks=[1, 2, 3])
+
+
+@pytest.mark.skipif(solver is None, reason="Solver not available")
+def test_solve_indexed_block_decomposed():
+    m = ConcreteModel()
+    m.s = Set(initialize=[1, 2, 3])
+
+    def block_rule(b, x):
+        b.v = Var(initialize=1.0)
+        b.c = Constraint(expr=b.v == 2.0)
+    m.b = Block(m.s, rule=block_rule)
+
+    results = solve_indexed_blocks(solver=solver, blocks=m.b, decompose=True)
+
+    for i in m.s:
+        assert value(m.b[i].v == 2.0)
+        assert results[m.b[i]].solver.termination_condition == \
+            TerminationCondition.optimal
+
+
+class _FakeSolver(object):
+    """
+    Solves y == 2*x for each element with x fixed, and reports the problem as
+    infeasible if any x is negative.
+    """
+    def __init__(self):
+        self.solved = []
+
+    def solve(self, blk, **kwds):
+        n = 0
+        feasible = True
+        for el in blk.block_data_objects(active=True):
+            if hasattr(el, "y"):
+                n += 1
+                el.y.value = 2*value(el.x) + value(el.model().z)
+                feasible = feasible and value(el.x) >= 0
+        self.solved.append(n)
+        results = SolverResults()
+        results.solver.termination_condition = (
+            TerminationCondition.optimal if feasible else
+            TerminationCondition.infeasible)
+        return results
+
+
+def _fake_model():
+    m = ConcreteModel()
+    m.s = Set(initialize=[1, 2, 3, 4, 5])
+    m.z = Var(initialize=0.0)
+    m.z.fix()
+
+    def block_rule(b, i):
+        b.x = Var(initialize=1.0)
+        b.x.fix()
+        b.y = Var(initialize=0.0)
+        b.c = Constraint(expr=b.y == 2*b.x + m.z)
+    m.b = Block(m.s, rule=block_rule)
+    return m
+
+
+def test_solve_indexed_block_decomposed_groups():
+    m = _fake_model()
+    m.b[5].x.fix(-1)
+    slv = _FakeSolver()
+    results = solve_indexed_blocks(solver=slv, blocks=[m.b], decompose=True)
+    # each element solved on its own
+    assert slv.solved == [1, 1, 1, 1, 1]
+    for i in [1, 2, 3, 4]:
+        assert value(m.b[i].y) == pytest.approx(2.0)
+        assert results[m.b[i]].solver.termination_condition == \
+            TerminationCondition.optimal
+    assert results[m.b[5]].solver.termination_condition == \
+        TerminationCondition.infeasible
+
+    # elements sharing an unfixed variable are solved together
+    slv = _FakeSolver()
+    m.z.unfix()
+    solve_indexed_blocks(solver=slv, blocks=[m.b], decompose=True)
+    assert slv.solved == [5]
+
+
+def test_solve_indexed_block_decomposed_identical():
+    m = _fake_model()
+    m.b[2].x.fix(2.0)
+    slv = _FakeSolver()
+    results = solve_indexed_blocks(
+        solver=slv, blocks=[m.b], decompose=True, group_identical=True)
+    # elements 1, 3, 4, 5 are identical, so only two solves are needed
+    assert slv.solved == [1, 1]
+    for i in [1, 3, 4, 5]:
+        assert value(m.b[i].y) == pytest.approx(2.0)
+        assert results[m.b[i]] is results[m.b[1]]
+    assert value(m.b[2].y) == pytest.approx(4.0)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(),
+                    reason="fork not available")
+def test_solve_indexed_block_decomposed_parallel():
+    m = _fake_model()
+    for i in m.s:
+        m.b[i].x.fix(i)
+    m.b[5].x.fix(-1)
+    slv = _FakeSolver()
+    results = solve_indexed_blocks(
+        solver=slv, blocks=[m.b], decompose=True, workers=2)
+    # solves happened in worker processes
+    assert slv.solved == []
+    for i in [1, 2, 3, 4]:
+        assert value(m.b[i].y) == pytest.approx(2.0*i)
+        assert results[m.b[i]].solver.termination_condition == \
+            TerminationCondition.optimal
+    assert results[m.b[5]].solver.termination_condition == \
+        TerminationCondition.infeasible
+
+
+@declare_process_block_class("_SquareUnit")
+class _SquareUnitData(UnitModelBlockData):
+    def build(self):
+        super(_SquareUnitData, self).build()
+        self.x = Var(initialize=1.0)
+        self.k = Var(initialize=1.0)
+        self.k.fix()
+        self.y = Var(initialize=0.0)
+        self.c = Constraint(expr=self.y == self.k*self.x**2)
+        self.inlet = Port(initialize={"x": self.x})
+        self.outlet = Port(initialize={"x": self.y})
+        self.calls = 0
+
+    def initialize(self, outlvl=0, solver='ipopt', optarg=None):
+        self.calls += 1
+        self.y.value = self.k.value*self.x.value**2
+
+
+def _square_model():
+    m = ConcreteModel()
+    m.fs = FlowsheetBlock(default={"dynamic": False})
+    m.fs.u1 = _SquareUnit()
+    m.fs.u2 = _SquareUnit()
+    m.fs.s01 = Arc(source=m.fs.u1.outlet, destination=m.fs.u2.inlet)
+    return m
+
+
+def test_initialization_cache(tmpdir):
+    cache = InitializationCache(str(tmpdir), residual_tol=1e-8)
+    m = _square_model()
+    m.fs.u2.x.value = 3.0
+    assert not cache.initialize(m.fs.u2)
+    assert m.fs.u2.calls == 1
+
+    # same inputs in a new model load the stored state
+    m2 = _square_model()
+    m2.fs.u2.x.value = 3.0 + 1e-9  # within the key rounding
+    assert cache.initialize(m2.fs.u2)
+    assert m2.fs.u2.calls == 0
+    assert m2.fs.u2.y.value == pytest.approx(9.0)
+    # fixed variables are not loaded
+    assert m2.fs.u2.k.value == 1.0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # inlet and fixed variable values are part of the key, outlets aren't
+    m2.fs.u2.y.value = 5.0
+    assert cache.key(m2.fs.u2) == cache.key(m.fs.u2)
+    m2.fs.u2.x.value = 2.0
+    assert cache.key(m2.fs.u2) != cache.key(m.fs.u2)
+    m2.fs.u2.x.value = 3.0
+    m2.fs.u2.k.fix(2.0)
+    assert not cache.initialize(m2.fs.u2)
+    assert m2.fs.u2.y.value == pytest.approx(18.0)
+    assert len(os.listdir(str(tmpdir))) == 2
+
+    # u1 inlet isn't connected, so it isn't part of the key
+    m.fs.u1.x.value = 4.0
+    k = cache.key(m.fs.u1)
+    m.fs.u1.x.value = 5.0
+    assert cache.key(m.fs.u1) == k
+
+    cache.clear()
+    assert len(os.listdir(str(tmpdir))) == 0
+
+
+def test_initialization_cache_unconverged(tmpdir):
+    cache = InitializationCache(str(tmpdir), residual_tol=1e-8)
+    m = _square_model()
+    m.fs.u2.initialize = lambda **kwargs: None
+    m.fs.u2.x.value = 3.0
+    cache.initialize(m.fs.u2)
+    assert len(os.listdir(str(tmpdir))) == 0
+
+
+def test_initialization_cache_evict(tmpdir):
+    m = _square_model()
+    cache = InitializationCache(str(tmpdir))
+    cache.initialize(m.fs.u2)
+    size = os.path.getsize(os.path.join(str(tmpdir),
+                                        os.listdir(str(tmpdir))[0]))
+    cache = InitializationCache(str(tmpdir), max_size=2*size)
+    for x in [1.0, 2.0, 3.0]:
+        m.fs.u2.x.value = x
+        cache.initialize(m.fs.u2)
+        os.utime(cache._fname(cache.key(m.fs.u2)), (x, x))
+    # the oldest entries are evicted
+    m.fs.u2.x.value = 4.0
+    cache.initialize(m.fs.u2)
+    assert len(os.listdir(str(tmpdir))) == 2
+    m.fs.u2.x.value = 3.0
+    assert cache.initialize(m.fs.u2)
+    m.fs.u2.x.value = 1.0
+    assert not cache.initialize(m.fs.u2)
@@ -17,21 +17,26 @@ from __future__ import division
 
 import unittest
 import os
+import numpy as np
 
 from pyomo.environ import *
-from idaes.core.util import to_json, from_json, StoreSpec
+from idaes.core.util import to_json, from_json, StoreSpec, StateSnapshot, \
+    to_npz, from_npz
+from idaes.core.util.model_serializer import _npz_arrays
 
 __author__ = "John Eslick"
 
 
 class TestModelSerialize(unittest.TestCase):
     fname = "crAzYStuff1010202030.json"
+    fname_npz = "crAzYStuff1010202030.npz"
 
     def tearDown(self):
-        try:
-            os.remove(self.fname)
-        except:
-            pass
+        for fname in (self.fname, self.fname_npz):
+            try:
+                os.remove(fname)
+            except:
+                pass
 
     def setup_model01(self):
         model = ConcreteModel()
@@ -314,5 +319,137 @@ class TestModelSerialize(unittest.TestCase):
         assert(abs(model.ipopt_zU_out[model.x[1]] - 10) < 1e-5)
         assert(abs(model.ipopt_zU_out[model.x[2]] - 10) < 1e-5)
 
+    def test12(self):
+        """Save and load the state with an array-backed snapshot"""
+        model = self.setup_model01()
+        model.p = Param([1, 2], initialize={1:1, 2:2}, mutable=True)
+        a = model.b[1].a
+        b = model.b[1].b
+        b.setub(None)
+        snap = StateSnapshot(model)
+        state = snap.save()
+        assert(len(state["value"]) == 2)
+        assert(state["fixed"].tolist() == [True, False])
+        assert(state["ub"][1] != state["ub"][1]) # NaN for no bound
+        a.value = 0.11
+        b.value = None
+        a.unfix()
+        model.b[1].deactivate()
+        model.b[1].c.deactivate()
+        b.setlb(2)
+        b.setub(4)
+        model.p[2] = 10
+        snap.load(state)
+        assert(a.fixed)
+        assert(model.b[1].active)
+        assert(model.b[1].c.active)
+        assert(abs(value(b) - 20) < 1e-4)
+        assert(abs(value(a) - 2) < 1e-4)
+        assert(abs(b.lb - -100) < 1e-4)
+        assert(b.ub is None)
+        assert(abs(value(model.p[2]) - 2) < 1e-4)
+        # repeat loads of the same state
+        a.value = 3
+        snap.load(state)
+        assert(abs(value(a) - 2) < 1e-4)
+
+    def test13(self):
+        """Snapshot partial loads and state checking"""
+        model = self.setup_model02()
+        snap = StateSnapshot(model, bounds=False, active=False)
+        state = snap.save()
+        assert(sorted(state.keys()) == ["fixed", "param", "value"])
+        model.x[1].value = 5
+        model.x[1].fix()
+        del state["fixed"]
+        snap.load(state)
+        assert(abs(value(model.x[1]) - 1.5) < 1e-5)
+        assert(model.x[1].fixed)
+        state["value"] = state["value"][:1]
+        self.assertRaises(ValueError, snap.load, state)
+
+    def test14(self):
+        """Save and load a binary npz state file"""
+        for compress in (False, True):
+            model = self.setup_model01()
+            a = model.b[1].a
+            b = model.b[1].b
+            to_npz(model, self.fname_npz, compress=compress)
+            a.value = 0.11
+            b.value = 0.11
+            a.unfix()
+            model.b[1].deactivate()
+            b.setlb(2)
+            from_npz(model, self.fname_npz)
+            assert(a.fixed)
+            assert(model.b[1].active)
+            assert(abs(value(b) - 20) < 1e-4)
+            assert(abs(value(a) - 2) < 1e-4)
+            assert(abs(b.lb - -100) < 1e-4)
+
+    def test15(self):
+        """Load a single sub-block from a npz state file"""
+        model = self.setup_model01()
+        model.b[2].x = Var([1, 2], initialize=3)
+        model.b[2].s = Block()
+        model.b[2].s.y = Var(initialize=4)
+        model.b[2].s.c = Constraint(expr=model.b[2].s.y == 4)
+        model.z = Var(initialize=5)
+        to_npz(model, self.fname_npz)
+        arrays = _npz_arrays(self.fname_npz)
+        assert(isinstance(arrays["value"], np.memmap))
+        del arrays
+        for v in model.component_data_objects(Var):
+            v.value = -1
+        model.b[2].s.c.deactivate()
+        model.b[2].s.deactivate()
+        from_npz(model.b[2], self.fname_npz)
+        assert(abs(value(model.b[2].x[1]) - 3) < 1e-4)
+        assert(abs(value(model.b[2].s.y) - 4) < 1e-4)
+        assert(model.b[2].s.active)
+        assert(model.b[2].s.c.active)
+        # other blocks are not loaded
+        assert(abs(value(model.b[1].a) - -1) < 1e-4)
+        assert(abs(value(model.z) - -1) < 1e-4)
+        # a block that is not in the file
+        model2 = ConcreteModel()
+        model2.q = Block()
+        self.assertRaises(ValueError, from_npz, model2.q, self.fname_npz)
+
+    def test16(self):
+        """Save and load state deltas"""
+        model = self.setup_model02()
+        x = model.x
+        snap = StateSnapshot(model)
+        base = snap.save()
+        x[1].value = 3
+        x[2].fix(4)
+        model.g.deactivate()
+        delta = snap.save_delta(base)
+        assert(delta["value"][0].tolist() == [0, 1])
+        assert(delta["fixed"][0].tolist() == [1])
+        assert(len(delta["active"][0]) == 1)
+        assert(len(delta["lb"][0]) == 0)
+        assert(len(delta["param"][0]) == 0)
+        # None values aren't changes
+        x[1].value = None
+        base2 = snap.save()
+        assert(len(snap.save_delta(base2)["value"][0]) == 0)
+        snap.load(base)
+        assert(not x[2].fixed)
+        assert(model.g.active)
+        snap.load_delta(delta)
+        assert(abs(value(x[1]) - 3) < 1e-5)
+        assert(abs(value(x[2]) - 4) < 1e-5)
+        assert(x[2].fixed)
+        assert(not model.g.active)
+        state = StateSnapshot.apply_delta(base, delta)
+        assert(state["value"].tolist() == [3, 4])
+        assert(base["value"].tolist() == [1.5, 2.5])
+        snap.load(base)
+        snap.load(state)
+        assert(abs(value(x[1]) - 3) < 1e-5)
+        assert(x[2].fixed)
+
 if __name__ == '__main__':
     unittest.main()
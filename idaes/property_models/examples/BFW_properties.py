@@ -28,12 +28,14 @@ import logging
 from pyomo.environ import (Constraint, log, Param, value,
                            PositiveReals, RangeSet, Reals, Set, Var)
 from pyomo.opt import SolverFactory, TerminationCondition
+from pyomo.common.config import ConfigValue, In
 
 # Import IDAES cores
 from idaes.core import (declare_process_block_class,
                         PhysicalParameterBlock,
                         StateBlockData,
                         StateBlock)
+from idaes.core.property_base import indexed_properties
 from idaes.core.util.misc import add_object_reference
 from idaes.core.util.initialization import solve_indexed_blocks
 from idaes.ui.report import degrees_of_freedom
@@ -55,6 +57,21 @@ class PhysicalParameterData(PhysicalParameterBlock):
     superheated steam.
 
     """
+    CONFIG = PhysicalParameterBlock.CONFIG()
+
+    CONFIG.declare("indexed_properties", ConfigValue(
+        default=False,
+        domain=In([True, False]),
+        description="Flag indicating whether to use indexed properties",
+        doc="""Flag indicating whether the properties of indexed state blocks
+should be built as indexed components shared by all elements of the state
+block, rather than as separate components on each element,
+**default** - False.
+**Valid values:** {
+**True** - build properties as indexed components (reduces the number of
+components in large models, e.g. 1D models),
+**False** - build properties on each element.}"""))
+
     def build(self):
         """Callable method for Block construction."""
         super(PhysicalParameterData, self).build()
@@ -253,7 +270,15 @@ class _StateBlock(StateBlock):
 
         # ---------------------------------------------------------------------
         # Solve property correlation
-        results = solve_indexed_blocks(opt, [blk], tee=stee)
+        blocks = [blk]
+        for k in blk.keys():
+            if indexed_properties(blk[k].config.parameters):
+                # Property constraints are on the indexed property block,
+                # which is built when a property is first used
+                blk[k].enth_mol_phase
+                blocks.append(blk.indexed_property_block())
+            break
+        results = solve_indexed_blocks(opt, blocks, tee=stee)
 
         if outlvl > 0:
             if results.solver.termination_condition \
@@ -298,6 +323,39 @@ class _StateBlock(StateBlock):
             if outlvl > 0:
                 _log.info('{} State Released.'.format(blk.name))
 
+    def build_indexed_properties(blk, params):
+        """Create property variables and constraints as indexed components."""
+        blk.add_indexed_property("dens_mol_phase", Param, params.phase_list,
+                                 initialize=43E3,
+                                 doc="molar density mol/m3")
+
+        blk.add_indexed_property("enth_mol_phase", Var, params.phase_list,
+                                 doc='Specific Enthalpy [J/mol]')
+
+        blk.add_indexed_property("cp_mol_phase", Var, params.phase_list,
+                                 doc="Specific heat capacity [J/mol/K]")
+
+        blk.add_indexed_property("visc_d_phase", Var, params.phase_list,
+                                 initialize=0.001,
+                                 doc="Dynamic viscosity [Pa.s]")
+
+        blk.add_indexed_property("therm_cond_phase", Var, params.phase_list,
+                                 initialize=1,
+                                 doc="thermal conductivity [W/m/K]")
+
+        blk.add_indexed_property("cp_mol_phase_liq_correlation", Constraint,
+                                 params.phase_list,
+                                 rule=_cp_mol_phase_liq_correlation)
+        blk.add_indexed_property("enthalpy_correlation", Constraint,
+                                 params.phase_list,
+                                 rule=_enthalpy_correlation)
+        blk.add_indexed_property("visc_correlation", Constraint,
+                                 params.phase_list,
+                                 rule=_visc_correlation)
+        blk.add_indexed_property("therm_cond_phase_correlation", Constraint,
+                                 params.phase_list,
+                                 rule=_therm_cond_phase_correlation)
+
 @declare_process_block_class("BFWStateBlock",
                              block_class=_StateBlock)
 class StateTestBlockData(StateBlockData):
@@ -308,8 +366,11 @@ class StateTestBlockData(StateBlockData):
         super(StateTestBlockData, self).build()
         self._make_params()
         self._make_state_vars()
-        self._make_prop_vars()
-        self._make_constraints()
+        # In indexed property mode the property variables and constraints
+        # are built for the whole state block by build_indexed_properties
+        if not indexed_properties(self.config.parameters):
+            self._make_prop_vars()
+            self._make_constraints()
 
     def _make_params(self):
         """Make references to the necessary parameters contained."""
@@ -354,74 +415,35 @@ class StateTestBlockData(StateBlockData):
                                     [unitless]", bounds=(0, 1))
 
     def _make_prop_vars(self):
-            """Make additional variables for calcuations."""
-            self.dens_mol_phase = Param(self.phase_list,
-                                        initialize=43E3,
-                                        doc="molar density mol/m3")
+        """Make additional variables for calcuations."""
+        self.dens_mol_phase = Param(self.phase_list,
+                                    initialize=43E3,
+                                    doc="molar density mol/m3")
 
-            self.enth_mol_phase = Var(self.phase_list,
-                                      doc='Specific Enthalpy [J/mol]')
+        self.enth_mol_phase = Var(self.phase_list,
+                                  doc='Specific Enthalpy [J/mol]')
 
-            self.cp_mol_phase = Var(self.phase_list,
-                                    doc="Specific heat capacity [J/mol/K]")
+        self.cp_mol_phase = Var(self.phase_list,
+                                doc="Specific heat capacity [J/mol/K]")
 
-            self.visc_d_phase = Var(self.phase_list,
-                                    initialize=0.001,
-                                    doc="Dynamic viscosity [Pa.s]")
+        self.visc_d_phase = Var(self.phase_list,
+                                initialize=0.001,
+                                doc="Dynamic viscosity [Pa.s]")
 
-            self.therm_cond_phase = Var(self.phase_list,
-                                        initialize=1,
-                                        doc="thermal conductivity [W/m/K]")
+        self.therm_cond_phase = Var(self.phase_list,
+                                    initialize=1,
+                                    doc="thermal conductivity [W/m/K]")
 
     def _make_constraints(self):
-            """Create property constraints."""
-            # Specific heat capacity
-            def cp_mol_phase_liq_correlation(self, p):
-                return self.cp_mol_phase[p] == \
-                    1E-3 * (self.cp_param[1] +
-                            (self.cp_param[2] * self.temperature) +
-                            (self.cp_param[3] * self.temperature**2) +
-                            (self.cp_param[4] * self.temperature**3) +
-                            (self.cp_param[5] * self.temperature**4))
-            self.cp_mol_phase_liq_correlation = Constraint(
-                self.phase_list, rule=cp_mol_phase_liq_correlation)
-
-            # Specific Enthalpy
-            def enthalpy_correlation(self, p):
-                return self.enth_mol_phase[p] * 1E3 == \
-                    ((self.cp_param[1] * self.temperature) +
-                     (self.cp_param[2] * 0.5 * self.temperature**2) +
-                     (self.cp_param[3] * 0.33 * self.temperature**3) +
-                     (self.cp_param[4] * 0.25 * self.temperature**4) +
-                     (self.cp_param[5] * 0.2 * self.temperature**5)) - \
-                    ((self.cp_param[1] * self.temperature_ref) +
-                     (self.cp_param[2] * 0.5 * self.temperature_ref**2) +
-                     (self.cp_param[3] * 0.33 * self.temperature_ref**3) +
-                     (self.cp_param[4] * 0.25 * self.temperature_ref**4) +
-                     (self.cp_param[5] * 0.2 * self.temperature_ref**5))
-            self.enthalpy_correlation = Constraint(self.phase_list,
-                                                   rule=enthalpy_correlation)
-
-            # Dynamic viscosity (1E3 factor to convert from CP to Pa.s)
-            def visc_correlation(self, p):
-                return self.temperature * log(self.visc_d_phase[p] * 1E3) == \
-                    self.visc_d_phase_param[1] * self.temperature + \
-                    self.visc_d_phase_param[2] + self.visc_d_phase_param[3] * \
-                    self.temperature * log(self.temperature) + \
-                    self.visc_d_phase_param[4] *\
-                    self.temperature**(self.visc_d_phase_param[5] + 1)
-            self.visc_correlation = Constraint(self.phase_list,
-                                               rule=visc_correlation)
-
-            # Thermal conductivity (1E3 factor is to convert from W/m-K)
-            def therm_cond_phase_correlation(self, p):
-                return self.therm_cond_phase[p] ==\
-                    self.therm_cond_phase_param[1] + \
-                    self.therm_cond_phase_param[2] * self.temperature + \
-                    self.therm_cond_phase_param[3] * self.temperature**2 +\
-                    self.therm_cond_phase_param[4] * self.temperature**3
-            self.therm_cond_phase_correlation = Constraint(
-                self.phase_list, rule=therm_cond_phase_correlation)
+        """Create property constraints."""
+        self.cp_mol_phase_liq_correlation = Constraint(
+            self.phase_list, rule=_cp_mol_phase_liq_correlation)
+        self.enthalpy_correlation = Constraint(self.phase_list,
+                                               rule=_enthalpy_correlation)
+        self.visc_correlation = Constraint(self.phase_list,
+                                           rule=_visc_correlation)
+        self.therm_cond_phase_correlation = Constraint(
+            self.phase_list, rule=_therm_cond_phase_correlation)
 
     def get_material_flow_terms(b, p, j):
         """Define material flow terms for control volume."""
@@ -461,3 +483,49 @@ class StateTestBlockData(StateBlockData):
             _log.error('{} Pressure set below lower bound.'.format(blk.name))
         if value(blk.pressure) > blk.pressure.ub:
             _log.error('{} Pressure set above upper bound.'.format(blk.name))
+
+
+# Property correlations, shared by the elements of state blocks and by the
+# indexed properties of state blocks in indexed property mode
+def _cp_mol_phase_liq_correlation(self, p):
+    """Specific heat capacity."""
+    return self.cp_mol_phase[p] == \
+        1E-3 * (self.cp_param[1] +
+                (self.cp_param[2] * self.temperature) +
+                (self.cp_param[3] * self.temperature**2) +
+                (self.cp_param[4] * self.temperature**3) +
+                (self.cp_param[5] * self.temperature**4))
+
+
+def _enthalpy_correlation(self, p):
+    """Specific enthalpy."""
+    return self.enth_mol_phase[p] * 1E3 == \
+        ((self.cp_param[1] * self.temperature) +
+         (self.cp_param[2] * 0.5 * self.temperature**2) +
+         (self.cp_param[3] * 0.33 * self.temperature**3) +
+         (self.cp_param[4] * 0.25 * self.temperature**4) +
+         (self.cp_param[5] * 0.2 * self.temperature**5)) - \
+        ((self.cp_param[1] * self.temperature_ref) +
+         (self.cp_param[2] * 0.5 * self.temperature_ref**2) +
+         (self.cp_param[3] * 0.33 * self.temperature_ref**3) +
+         (self.cp_param[4] * 0.25 * self.temperature_ref**4) +
+         (self.cp_param[5] * 0.2 * self.temperature_ref**5))
+
+
+def _visc_correlation(self, p):
+    """Dynamic viscosity (1E3 factor to convert from CP to Pa.s)."""
+    return self.temperature * log(self.visc_d_phase[p] * 1E3) == \
+        self.visc_d_phase_param[1] * self.temperature + \
+        self.visc_d_phase_param[2] + self.visc_d_phase_param[3] * \
+        self.temperature * log(self.temperature) + \
+        self.visc_d_phase_param[4] *\
+        self.temperature**(self.visc_d_phase_param[5] + 1)
+
+
+def _therm_cond_phase_correlation(self, p):
+    """Thermal conductivity (1E3 factor is to convert from W/m-K)."""
+    return self.therm_cond_phase[p] ==\
+        self.therm_cond_phase_param[1] + \
+        self.therm_cond_phase_param[2] * self.temperature + \
+        self.therm_cond_phase_param[3] * self.temperature**2 +\
+        self.therm_cond_phase_param[4] * self.temperature**3
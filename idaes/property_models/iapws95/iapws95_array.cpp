@@ -0,0 +1,80 @@
+/*------------------------------------------------------------------------------
+ Institute for the Design of Advanced Energy Systems Process Systems
+ Engineering Framework (IDAES PSE Framework) Copyright (c) 2018, by the
+ software owners: The Regents of the University of California, through
+ Lawrence Berkeley National Laboratory,  National Technology & Engineering
+ Solutions of Sandia, LLC, Carnegie Mellon University, West Virginia
+ University Research Corporation, et al. All rights reserved.
+
+ Please see the files COPYRIGHT.txt and LICENSE.txt for full copyright and
+ license information, respectively. Both files are also available online
+ at the URL "https://github.com/IDAES/idaes".
+------------------------------------------------------------------------------*/
+
+/*------------------------------------------------------------------------------
+ Functions to evaluate IAPWS95 properties over arrays of points.
+
+ File: iapws95_array.cpp
+------------------------------------------------------------------------------*/
+
+#include"iapws95.h"
+#include"iapws95_array.h"
+
+int iapws95_props_array(int n, const double *delta, const double *tau,
+                        int prop, double *out){
+  s_real (*fun)(s_real, s_real);
+  switch(prop){
+    case IAPWS95_P: fun = p; break;
+    case IAPWS95_U: fun = u; break;
+    case IAPWS95_S: fun = s; break;
+    case IAPWS95_H: fun = h; break;
+    case IAPWS95_G: fun = g; break;
+    case IAPWS95_F: fun = f; break;
+    case IAPWS95_CV: fun = cv; break;
+    case IAPWS95_CP: fun = cp; break;
+    case IAPWS95_W: fun = w; break;
+    default: return -1;
+  }
+  for(int i=0; i<n; ++i) out[i] = (double)fun(delta[i], tau[i]);
+  return 0;
+}
+
+int iapws95_delta_array(int n, const double *pr, const double *tau,
+                        int phase, double *out){
+  if(phase == 0){
+    for(int i=0; i<n; ++i) out[i] = (double)delta_liq(pr[i], tau[i]);
+  }
+  else if(phase == 1){
+    for(int i=0; i<n; ++i) out[i] = (double)delta_vap(pr[i], tau[i]);
+  }
+  else return -1;
+  return 0;
+}
+
+int iapws95_p_sat_array(int n, const double *tau, double *out){
+  for(int i=0; i<n; ++i) out[i] = (double)sat_p_with_derivs(tau[i], NULL, NULL);
+  return 0;
+}
+
+int iapws95_tau_sat_array(int n, const double *pr, double *out){
+  for(int i=0; i<n; ++i) out[i] = (double)sat_tau_with_derivs(pr[i], NULL, NULL);
+  return 0;
+}
+
+int iapws95_delta_sat_array(int n, const double *tau, double *delta_l,
+                            double *delta_v){
+  for(int i=0; i<n; ++i){
+    delta_l[i] = (double)sat_delta_liq_with_derivs(tau[i], NULL, NULL);
+    delta_v[i] = (double)sat_delta_vap_with_derivs(tau[i], NULL, NULL);
+  }
+  return 0;
+}
+
+int iapws95_tau_vf_array(int n, const double *ht, const double *pr,
+                         double *tau, double *vf){
+  for(int i=0; i<n; ++i){
+    tau[i] = (double)tau_with_derivs(ht[i], pr[i], NULL, NULL);
+    vf[i] = (double)vf_with_derivs(ht[i], pr[i], NULL, NULL);
+  }
+  return 0;
+}
@@ -0,0 +1,57 @@
+/*------------------------------------------------------------------------------
+ Institute for the Design of Advanced Energy Systems Process Systems
+ Engineering Framework (IDAES PSE Framework) Copyright (c) 2018, by the
+ software owners: The Regents of the University of California, through
+ Lawrence Berkeley National Laboratory,  National Technology & Engineering
+ Solutions of Sandia, LLC, Carnegie Mellon University, West Virginia
+ University Research Corporation, et al. All rights reserved.
+
+ Please see the files COPYRIGHT.txt and LICENSE.txt for full copyright and
+ license information, respectively. Both files are also available online
+ at the URL "https://github.com/IDAES/idaes".
+------------------------------------------------------------------------------*/
+
+/*------------------------------------------------------------------------------
+ Functions to evaluate IAPWS95 properties over arrays of points. These have C
+ linkage, so they can be called directly from Python (e.g. with ctypes) without
+ going through the ASL function interface or building a Pyomo model.
+
+ File: iapws95_array.h
+------------------------------------------------------------------------------*/
+
+#ifndef _INCLUDE_IAPWS95_ARRAY_H_
+#define _INCLUDE_IAPWS95_ARRAY_H_
+
+// Property ids for iapws95_props_array
+#define IAPWS95_P 0  // pressure (kPa)
+#define IAPWS95_U 1  // internal energy (kJ/kg)
+#define IAPWS95_S 2  // entropy (kJ/kg/K)
+#define IAPWS95_H 3  // enthalpy (kJ/kg)
+#define IAPWS95_G 4  // Gibbs free energy (kJ/kg)
+#define IAPWS95_F 5  // Helmholtz free energy (kJ/kg)
+#define IAPWS95_CV 6 // constant volume heat capacity (kJ/kg/K)
+#define IAPWS95_CP 7 // constant pressure heat capacity (kJ/kg/K)
+#define IAPWS95_W 8  // speed of sound (m/s)
+
+extern "C" {
+  // Property prop at reduced density delta and tau = T_c/T. Returns 0, or -1
+  // if prop is not a valid property id
+  int iapws95_props_array(int n, const double *delta, const double *tau,
+                          int prop, double *out);
+  // Reduced density of liquid (phase = 0) or vapor (phase = 1) from pressure
+  // (kPa) and tau
+  int iapws95_delta_array(int n, const double *pr, const double *tau,
+                          int phase, double *out);
+  // Saturation pressure (kPa) at tau
+  int iapws95_p_sat_array(int n, const double *tau, double *out);
+  // Saturation tau at pressure (kPa)
+  int iapws95_tau_sat_array(int n, const double *pr, double *out);
+  // Saturated liquid and vapor reduced densities at tau
+  int iapws95_delta_sat_array(int n, const double *tau, double *delta_l,
+                              double *delta_v);
+  // tau and vapor fraction from enthalpy (kJ/kg) and pressure (kPa)
+  int iapws95_tau_vf_array(int n, const double *ht, const double *pr,
+                           double *tau, double *vf);
+}
+
+#endif
@@ -24,6 +24,8 @@
 #include"iapws95.h"
 #include"iapws95_phi.h"
 #include"iapws95_asl_funcs.h"
+#include"iapws95_memo.h"
+#include"iapws95_table.h"
 
 void funcadd(AmplExports *ae){
     /* Arguments for addfunc (this is not fully detailed see funcadd.h)
@@ -46,6 +48,10 @@ void funcadd(AmplExports *ae){
     addfunc("hlpt", (rfunc)hlpt_asl, typ, 2, NULL);
     addfunc("tau", (rfunc)tau_asl, typ, 2, NULL);
     addfunc("vf", (rfunc)vf_asl, typ, 2, NULL);
+    addfunc("tau_tab", (rfunc)tau_tab_asl, typ, 2, NULL);
+    addfunc("vf_tab", (rfunc)vf_tab_asl, typ, 2, NULL);
+    addfunc("delta_liq_tab", (rfunc)delta_liq_tab_asl, typ, 2, NULL);
+    addfunc("delta_vap_tab", (rfunc)delta_vap_tab_asl, typ, 2, NULL);
     addfunc("delta_liq", (rfunc)delta_liq_asl, typ, 2, NULL);
     addfunc("delta_vap", (rfunc)delta_vap_asl, typ, 2, NULL);
     addfunc("delta_sat_l", (rfunc)delta_sat_l_asl, typ, 1, NULL);
@@ -63,6 +69,8 @@ void funcadd(AmplExports *ae){
     addfunc("phir_tau", (rfunc)phir_tau_asl, typ, 2, NULL);
     addfunc("phir_tau2", (rfunc)phir_tau2_asl, typ, 2, NULL);
     addfunc("phir_delta_tau", (rfunc)phir_delta_tau_asl, typ, 2, NULL);
+    addfunc("memo_stats", (rfunc)memo_stats_asl, typ, 3, NULL);
+    addfunc("memo_capacity", (rfunc)memo_capacity_asl, typ, 1, NULL);
 }
 
 void cast_deriv2(s_real *g1, double *g2, s_real *h1, double *h2){
@@ -225,6 +233,50 @@ double vf_asl(arglist *al){
   }
 }
 
+double tau_tab_asl(arglist *al){
+  s_real f, grad[2], hes[3];
+  if(al->derivs==NULL && al->hes==NULL){
+    return tau_tab_with_derivs(al->ra[al->at[0]], al->ra[al->at[1]], NULL, NULL);}
+  else{
+    f = tau_tab_with_derivs(al->ra[al->at[0]], al->ra[al->at[1]], grad, hes);
+    cast_deriv2(grad, al->derivs, hes, al->hes);
+    return f;
+  }
+}
+
+double vf_tab_asl(arglist *al){
+  s_real f, grad[2], hes[3];
+  if(al->derivs==NULL && al->hes==NULL){
+    return vf_tab_with_derivs(al->ra[al->at[0]], al->ra[al->at[1]], NULL, NULL);}
+  else{
+    f = vf_tab_with_derivs(al->ra[al->at[0]], al->ra[al->at[1]], grad, hes);
+    cast_deriv2(grad, al->derivs, hes, al->hes);
+    return f;
+  }
+}
+
+double delta_liq_tab_asl(arglist *al){
+  s_real f, grad[2], hes[3];
+  if(al->derivs==NULL && al->hes==NULL){
+    return delta_liq_tab_with_derivs(al->ra[al->at[0]], al->ra[al->at[1]], NULL, NULL);}
+  else{
+    f = delta_liq_tab_with_derivs(al->ra[al->at[0]], al->ra[al->at[1]], grad, hes);
+    cast_deriv2(grad, al->derivs, hes, al->hes);
+    return f;
+  }
+}
+
+double delta_vap_tab_asl(arglist *al){
+  s_real f, grad[2], hes[3];
+  if(al->derivs==NULL && al->hes==NULL){
+    return delta_vap_tab_with_derivs(al->ra[al->at[0]], al->ra[al->at[1]], NULL, NULL);}
+  else{
+    f = delta_vap_tab_with_derivs(al->ra[al->at[0]], al->ra[al->at[1]], grad, hes);
+    cast_deriv2(grad, al->derivs, hes, al->hes);
+    return f;
+  }
+}
+
 double delta_sat_l_asl(arglist *al){
   s_real f, grad[1], hes[1];
   if(al->derivs==NULL && al->hes==NULL){
@@ -458,3 +510,37 @@ double phir_tau2_asl(arglist *al){
   return phir_tau2_derivs(al->ra[al->at[0]], al->ra[al->at[1]], al->derivs, al->hes);}
 double phir_delta_tau_asl(arglist *al){
   return phir_delta_tau_derivs(al->ra[al->at[0]], al->ra[al->at[1]], al->derivs, al->hes);}
+
+void zero_derivs(arglist *al){
+  for(int i=0; i<al->n; ++i){
+    if(al->derivs != NULL) al->derivs[i] = 0;
+  }
+  for(int i=0; i<al->n*(al->n + 1)/2; ++i){
+    if(al->hes != NULL) al->hes[i] = 0;
+  }
+}
+
+double memo_stats_asl(arglist *al){
+  /* Memo table statistics
+   * 1) memo table (see memoize::BIN, UN, BIN0, UN0)
+   * 2) function id in the memo table
+   * 3) statistic: 0 = hits, 1 = misses, 2 = table size, 3 = table capacity */
+  unsigned char t = (unsigned char)al->ra[al->at[0]];
+  unsigned char f = (unsigned char)al->ra[al->at[1]];
+  int stat = (int)al->ra[al->at[2]];
+  zero_derivs(al);
+  if(stat == 0) return (double)memoize::hits(t, f);
+  if(stat == 1) return (double)memoize::misses(t, f);
+  if(stat == 2) return (double)memoize::size(t);
+  if(stat == 3) return (double)memoize::get_capacity();
+  return NAN;
+}
+
+double memo_capacity_asl(arglist *al){
+  /* Set the capacity of the memo tables if the argument is not negative, and
+   * return the capacity */
+  double n = al->ra[al->at[0]];
+  zero_derivs(al);
+  if(n >= 0) memoize::set_capacity((unsigned long)n);
+  return (double)memoize::get_capacity();
+}
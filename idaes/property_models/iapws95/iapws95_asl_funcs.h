@@ -39,6 +39,11 @@ double hlpt_asl(arglist *al);
 double vf_asl(arglist *al);
 double tau_asl(arglist *al);
 
+double tau_tab_asl(arglist *al);
+double vf_tab_asl(arglist *al);
+double delta_liq_tab_asl(arglist *al);
+double delta_vap_tab_asl(arglist *al);
+
 double delta_sat_l_asl(arglist *al);
 double delta_sat_v_asl(arglist *al);
 double p_sat_asl(arglist *al);
@@ -59,4 +64,7 @@ double phir_tau_asl(arglist *al);
 double phir_tau2_asl(arglist *al);
 double phir_delta_tau_asl(arglist *al);
 
+double memo_stats_asl(arglist *al);
+double memo_capacity_asl(arglist *al);
+
 #endif
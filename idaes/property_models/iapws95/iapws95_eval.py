@@ -0,0 +1,204 @@
+##############################################################################
+# Institute for the Design of Advanced Energy Systems Process Systems
+# Engineering Framework (IDAES PSE Framework) Copyright (c) 2018-2019, by the
+# software owners: The Regents of the University of California, through
+# Lawrence Berkeley National Laboratory,  National Technology & Engineering
+# Solutions of Sandia, LLC, Carnegie Mellon University, West Virginia
+# University Research Corporation, et al. All rights reserved.
+#
+# Please see the files COPYRIGHT.txt and LICENSE.txt for full copyright and
+# license information, respectively. Both files are also available online
+# at the URL "https://github.com/IDAES/idaes-pse".
+##############################################################################
+"""Evaluate IAPWS-95 steam properties over NumPy arrays
+
+This calls the compiled IAPWS-95 library directly through ctypes, so many
+property values can be calculated without building a Pyomo model. The
+results are the same as those of the IAPWS-95 property package.
+"""
+from __future__ import division
+
+import ctypes
+import os
+
+import numpy as np
+
+# Parameters, these should match what's in the C code
+temperature_crit = 647.096  # K
+pressure_crit = 2.2064e7  # Pa
+dens_mass_crit = 322  # kg/m3
+mw = 0.01801528  # kg/mol
+
+# Property ids in the library (see iapws95_array.h), and the factor to convert
+# the library units (kPa, kJ/kg, kJ/kg/K, m/s) to SI molar units
+_props = {
+    "u": (1, 1000.0*mw),
+    "s": (2, 1000.0*mw),
+    "h": (3, 1000.0*mw),
+    "g": (4, 1000.0*mw),
+    "f": (5, 1000.0*mw),
+    "cv": (6, 1000.0*mw),
+    "cp": (7, 1000.0*mw),
+    "w": (8, 1.0)}
+
+# Properties combined as x*vapor + (1 - x)*liquid in the two phase region,
+# the same as in the property package
+_mixed = ("u", "s", "h", "g", "f", "cv", "cp")
+
+#: Properties that can be calculated with evaluate
+properties = tuple(_props) + ("dens_mass", "dens_mol", "vapor_frac",
+                              "temperature", "pressure")
+
+_lib = None
+
+
+def _library():
+    """Load the IAPWS-95 library and set up the array functions."""
+    global _lib
+    if _lib is None:
+        plib = os.path.join(os.path.dirname(__file__), "iapws95.so")
+        if not os.path.isfile(plib):
+            raise RuntimeError("IAPWS library file not found. Was it "
+                               "compiled?")
+        lib = ctypes.CDLL(plib)
+        arr = np.ctypeslib.ndpointer(dtype=np.float64, flags="C_CONTIGUOUS")
+        n = ctypes.c_int
+        for name, args in (
+                ("iapws95_props_array", [n, arr, arr, n, arr]),
+                ("iapws95_delta_array", [n, arr, arr, n, arr]),
+                ("iapws95_p_sat_array", [n, arr, arr]),
+                ("iapws95_tau_sat_array", [n, arr, arr]),
+                ("iapws95_delta_sat_array", [n, arr, arr, arr]),
+                ("iapws95_tau_vf_array", [n, arr, arr, arr, arr])):
+            f = getattr(lib, name)
+            f.argtypes = args
+            f.restype = ctypes.c_int
+        _lib = lib
+    return _lib
+
+
+def _array(x, n):
+    """Convert x to a float array of length n."""
+    return np.array(np.broadcast_to(np.asarray(x, dtype=np.float64), (n,)))
+
+
+def _call(name, *args):
+    """Call an array function of the library, and raise if it fails."""
+    ret = getattr(_library(), name)(*args)
+    if ret != 0:
+        raise RuntimeError("IAPWS-95 library function {} returned {}.".format(
+            name, ret))
+
+
+def _masked(name, mask, a, tau, i):
+    """
+    Call the array function name(n, a, tau, i, out), which is
+    iapws95_delta_array or iapws95_props_array, only on the points where mask
+    is True. The result is NaN on the other points.
+    """
+    out = np.full(len(mask), np.nan)
+    k = int(np.count_nonzero(mask))
+    if k > 0:
+        res = np.empty(k)
+        _call(name, k, a[mask], tau[mask], i, res)
+        out[mask] = res
+    return out
+
+
+def evaluate(props, T=None, P=None, x=None, h=None):
+    """
+    Calculate IAPWS-95 properties for arrays of states. The state is given by
+    one of:
+
+    * T and P: single phase (liquid if T is below the saturation temperature
+      or P is above the critical pressure, otherwise vapor)
+    * T and x, or P and x: saturated with vapor fraction x
+    * h and P: any phase
+
+    Inputs are broadcast to a common 1D shape, so scalars can be mixed with
+    arrays.
+
+    Args:
+        props: list of property names (see properties): u, s, h, g, f, cv,
+            cp, w, dens_mass, dens_mol, vapor_frac, temperature, pressure
+        T: Temperature [K]
+        P: Pressure [Pa]
+        x: Vapor fraction [mol vapor/mol total]
+        h: Molar enthalpy [J/mol]
+
+    Returns:
+        dict of arrays by property name, in SI units on a molar basis (J/mol,
+        J/mol/K, Pa, m/s, kg/m3, mol/m3)
+    """
+    for prop in props:
+        if prop not in properties:
+            raise ValueError("Unknown IAPWS-95 property {}.".format(prop))
+    given = [np.atleast_1d(v) for v in (T, P, x, h) if v is not None]
+    if len(given) != 2 or np.broadcast(*given).nd != 1:
+        raise ValueError("Give a state as two of T, P, x and h, broadcast "
+                         "to a 1D shape.")
+    n = np.broadcast(*given).size
+
+    if h is not None and P is not None and T is None and x is None:
+        pr = _array(P, n)/1000.0
+        ht = _array(h, n)/mw/1000.0
+        tau = np.empty(n)
+        vf = np.empty(n)
+        _call("iapws95_tau_vf_array", n, ht, pr, tau, vf)
+        delta_l = _masked("iapws95_delta_array", vf < 1, pr, tau, 0)
+        delta_v = _masked("iapws95_delta_array", vf > 0, pr, tau, 1)
+    elif T is not None and P is not None and x is None and h is None:
+        tau = temperature_crit/_array(T, n)
+        pr = _array(P, n)/1000.0
+        tau_sat = np.empty(n)
+        _call("iapws95_tau_sat_array", n, pr, tau_sat)
+        liquid = (tau > tau_sat) | (pr > pressure_crit/1000.0)
+        vf = np.where(liquid, 0.0, 1.0)
+        delta_l = _masked("iapws95_delta_array", liquid, pr, tau, 0)
+        delta_v = _masked("iapws95_delta_array", ~liquid, pr, tau, 1)
+    elif x is not None and h is None and (T is None) != (P is None):
+        vf = _array(x, n)
+        if T is not None:
+            tau = temperature_crit/_array(T, n)
+            pr = np.empty(n)
+            _call("iapws95_p_sat_array", n, tau, pr)
+        else:
+            pr = _array(P, n)/1000.0
+            tau = np.empty(n)
+            _call("iapws95_tau_sat_array", n, pr, tau)
+        delta_l = np.empty(n)
+        delta_v = np.empty(n)
+        _call("iapws95_delta_sat_array", n, tau, delta_l, delta_v)
+    else:
+        raise ValueError("Give a state as T and P, T and x, P and x, or h "
+                         "and P.")
+
+    # Each phase is only evaluated where it is present, and is NaN elsewhere,
+    # so the phases are selected with np.where rather than blended
+    res = {}
+    for prop in props:
+        if prop == "vapor_frac":
+            res[prop] = vf.copy()
+        elif prop == "temperature":
+            res[prop] = temperature_crit/tau
+        elif prop == "pressure":
+            res[prop] = pr*1000.0
+        elif prop in ("dens_mass", "dens_mol"):
+            rho_l = delta_l*dens_mass_crit
+            rho_v = delta_v*dens_mass_crit
+            rho = np.where(vf >= 1, rho_v, np.where(
+                vf <= 0, rho_l, 1.0/(vf/rho_v + (1 - vf)/rho_l)))
+            res[prop] = rho if prop == "dens_mass" else rho/mw
+        else:
+            i, factor = _props[prop]
+            liq = _masked("iapws95_props_array", vf < 1, delta_l, tau, i)
+            vap = _masked("iapws95_props_array", vf > 0, delta_v, tau, i)
+            if prop in _mixed:
+                val = np.where(vf >= 1, vap, np.where(
+                    vf <= 0, liq, vf*vap + (1 - vf)*liq))
+            else:
+                # not defined for a two phase mixture
+                val = np.where(vf >= 1, vap,
+                               np.where(vf <= 0, liq, np.nan))
+            res[prop] = factor*val
+    return res
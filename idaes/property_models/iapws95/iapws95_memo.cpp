@@ -19,69 +19,156 @@
 
 #include"iapws95_memo.h"
 
+#include<algorithm>
+#include<atomic>
+#include<cstdlib>
+#include<mutex>
+#include<vector>
+
 using namespace memoize;
 
-std::unordered_map<args_bin, memo2, boost::hash<args_bin>> table_bin;
-std::unordered_map<args_un, memo1, boost::hash<args_un>> table_un;
-std::unordered_map<args_bin, memo0, boost::hash<args_bin>> table_bin0;
-std::unordered_map<args_un, memo0, boost::hash<args_un>> table_un0;
+// Capacity from the IAPWS95_MEMO_CAPACITY environment variable if set, so it
+// can be set for solvers that load the library
+static unsigned long initial_capacity(){
+  const char *env = std::getenv("IAPWS95_MEMO_CAPACITY");
+  if(env == NULL || *env == '\0') return max_memo;
+  return std::strtoul(env, NULL, 10);
+}
+
+static std::atomic<unsigned long> capacity(initial_capacity());
+
+// Each thread has its own memo tables, so the library can be used from
+// several threads at once without locking.  The tables pick up changes to
+// the capacity the next time they are used.
+thread_local lru_table<args_bin, memo2> table_bin(capacity);
+thread_local lru_table<args_un, memo1> table_un(capacity);
+thread_local lru_table<args_bin, memo0> table_bin0(capacity);
+thread_local lru_table<args_un, memo0> table_un0(capacity);
+
+// Hit and miss counts by table and function. Each thread counts in its own
+// counters, so counting doesn't contend on shared cache lines. Only the owning
+// thread writes them, so a relaxed load and store is enough to increment them,
+// and they are atomic so hits() and misses() can read them from other threads.
+// The counters of all running threads are registered in stats_list and summed
+// when read, and the counts of threads that have exited are kept in
+// stats_exited.
+struct thread_stats{
+  std::atomic<unsigned long> hits[4][256];
+  std::atomic<unsigned long> misses[4][256];
+  thread_stats();
+  ~thread_stats();
+};
+
+static std::mutex stats_mutex; // guards stats_list and stats_exited
+static std::vector<thread_stats*> stats_list;
+static unsigned long stats_exited[2][4][256];
+
+thread_stats::thread_stats(){
+  for(int t=0; t<4; ++t){
+    for(int f=0; f<256; ++f){
+      hits[t][f].store(0, std::memory_order_relaxed);
+      misses[t][f].store(0, std::memory_order_relaxed);
+    }
+  }
+  std::lock_guard<std::mutex> lock(stats_mutex);
+  stats_list.push_back(this);
+}
+
+thread_stats::~thread_stats(){
+  std::lock_guard<std::mutex> lock(stats_mutex);
+  for(int t=0; t<4; ++t){
+    for(int f=0; f<256; ++f){
+      stats_exited[0][t][f] += hits[t][f].load(std::memory_order_relaxed);
+      stats_exited[1][t][f] += misses[t][f].load(std::memory_order_relaxed);
+    }
+  }
+  stats_list.erase(std::find(stats_list.begin(), stats_list.end(), this));
+}
+
+thread_local thread_stats stats;
+
+static inline void increment(std::atomic<unsigned long> &c){
+  c.store(c.load(std::memory_order_relaxed) + 1, std::memory_order_relaxed);
+}
+
+template<typename V> static inline V *count(unsigned char t, unsigned char f,
+                                            V *data){
+  if(data == NULL) increment(stats.misses[t][f]);
+  else increment(stats.hits[t][f]);
+  return data;
+}
+
+// Get this thread's memo table, with the current capacity, or NULL if
+// memoization is off
+template<typename T> static inline T *table(T &tab){
+  unsigned long n = capacity.load(std::memory_order_relaxed);
+  if(tab.capacity() != n) tab.set_capacity(n);
+  if(n == 0) return NULL;
+  return &tab;
+}
 
 unsigned int memoize::add_bin0(unsigned char f, s_real x, s_real y, s_real val){
-  if(max_memo == 0) return 0;
-  if(table_bin0.size() > max_memo) table_bin0.clear(); //wipe out if it goes oversize
-  memo0 *data = &table_bin0[std::make_tuple(f, x, y)];
+  auto *tab = table(table_bin0);
+  if(tab == NULL) return 0;
+  memo0 *data = tab->put(std::make_tuple(f, x, y));
   data->val = val;
-  return table_bin0.size();
+  return tab->size();
 }
 
 unsigned int memoize::add_un0(unsigned char f, s_real x, s_real val){
-  if(max_memo == 0) return 0;
-  if(table_un0.size() > max_memo) table_un0.clear(); //wipe out if it goes oversize
-  memo0 *data = &table_un0[std::make_tuple(f, x)];
+  auto *tab = table(table_un0);
+  if(tab == NULL) return 0;
+  memo0 *data = tab->put(std::make_tuple(f, x));
   data->val = val;
-  return table_un0.size();
+  return tab->size();
 }
 
 s_real memoize::get_bin0(unsigned char f, s_real x, s_real y){
-  if(max_memo == 0) return (s_real)NAN;
-  memo0 *data = &table_bin0[std::make_tuple(f, x, y)];
+  auto *tab = table(table_bin0);
+  if(tab == NULL) return (s_real)NAN;
+  memo0 *data = count(BIN0, f, tab->get(std::make_tuple(f, x, y)));
+  if(data == NULL) return (s_real)NAN;
   return data->val;
 }
 
 s_real memoize::get_un0(unsigned char f, s_real x){
-  if(max_memo == 0) return (s_real)NAN;
-  memo0 *data = &table_un0[std::make_tuple(f, x)];
+  auto *tab = table(table_un0);
+  if(tab == NULL) return (s_real)NAN;
+  memo0 *data = count(UN0, f, tab->get(std::make_tuple(f, x)));
+  if(data == NULL) return (s_real)NAN;
   return data->val;
 }
 
 unsigned int memoize::add_bin(unsigned char f, s_real x, s_real y, s_real val,
                      s_real *grad, s_real *hes){
-  if(max_memo == 0) return 0;
-  if(table_bin.size() > max_memo) table_bin.clear(); //wipe out if it goes oversize
-  memo2 *data = &table_bin[std::make_tuple(f, x, y)];
+  auto *tab = table(table_bin);
+  if(tab == NULL) return 0;
+  memo2 *data = tab->put(std::make_tuple(f, x, y));
   data->val = val;
   data->grad[0] = grad[0];
   data->grad[1] = grad[1];
   data->hes[0] = hes[0];
   data->hes[1] = hes[1];
   data->hes[2] = hes[2];
-  return table_bin.size();
+  return tab->size();
 }
 
 unsigned int memoize::add_un(unsigned char f, s_real x,
                     s_real val, s_real *grad, s_real *hes){
-  if(max_memo == 0) return 0;
-  if(table_un.size() > max_memo) table_un.clear(); //wipe out if it goes oversize
-  memo1 *data = &table_un[std::make_tuple(f, x)];
+  auto *tab = table(table_un);
+  if(tab == NULL) return 0;
+  memo1 *data = tab->put(std::make_tuple(f, x));
   data->val = val;
   data->grad[0] = grad[0];
   data->hes[0] = hes[0];
-  return table_un.size();
+  return tab->size();
 }
 
 s_real memoize::get_bin(unsigned char f, s_real x, s_real y, s_real *grad, s_real *hes){
-  if(max_memo == 0) return (s_real)NAN;
-  memo2 *data = &table_bin[std::make_tuple(f, x, y)];
+  auto *tab = table(table_bin);
+  if(tab == NULL) return (s_real)NAN;
+  memo2 *data = count(BIN, f, tab->get(std::make_tuple(f, x, y)));
+  if(data == NULL) return (s_real)NAN;
   if(!std::isnan(data->val)){
     if(grad!=NULL){
       grad[0] = data->grad[0];
@@ -97,11 +184,61 @@ s_real memoize::get_bin(unsigned char f, s_real x, s_real y, s_real *grad, s_rea
 }
 
 s_real memoize::get_un(unsigned char f, s_real x, s_real *grad, s_real *hes){
-  if(max_memo == 0) return (s_real)NAN;
-  memo1 *data = &table_un[std::make_tuple(f, x)];
+  auto *tab = table(table_un);
+  if(tab == NULL) return (s_real)NAN;
+  memo1 *data = count(UN, f, tab->get(std::make_tuple(f, x)));
+  if(data == NULL) return (s_real)NAN;
   if(!std::isnan(data->val)){
     if(grad!=NULL)grad[0] = data->grad[0];
     if(hes!=NULL) hes[0] = data->hes[0];
   }
   return data->val;
 }
+
+void memoize::set_capacity(unsigned long n){
+  capacity.store(n);
+}
+
+unsigned long memoize::get_capacity(){
+  return capacity.load();
+}
+
+unsigned long memoize::hits(unsigned char t, unsigned char f){
+  if(t > UN0) return 0;
+  std::lock_guard<std::mutex> lock(stats_mutex);
+  unsigned long n = stats_exited[0][t][f];
+  for(auto ts : stats_list) n += ts->hits[t][f].load(std::memory_order_relaxed);
+  return n;
+}
+
+unsigned long memoize::misses(unsigned char t, unsigned char f){
+  if(t > UN0) return 0;
+  std::lock_guard<std::mutex> lock(stats_mutex);
+  unsigned long n = stats_exited[1][t][f];
+  for(auto ts : stats_list){
+    n += ts->misses[t][f].load(std::memory_order_relaxed);
+  }
+  return n;
+}
+
+unsigned long memoize::size(unsigned char t){
+  if(t == BIN) return table_bin.size();
+  if(t == UN) return table_un.size();
+  if(t == BIN0) return table_bin0.size();
+  if(t == UN0) return table_un0.size();
+  return 0;
+}
+
+void memoize::reset_stats(){
+  std::lock_guard<std::mutex> lock(stats_mutex);
+  for(int t=0; t<4; ++t){
+    for(int f=0; f<256; ++f){
+      stats_exited[0][t][f] = 0;
+      stats_exited[1][t][f] = 0;
+      for(auto ts : stats_list){
+        ts->hits[t][f].store(0, std::memory_order_relaxed);
+        ts->misses[t][f].store(0, std::memory_order_relaxed);
+      }
+    }
+  }
+}
@@ -17,6 +17,8 @@
  Author: John Eslick
 -------------------------------------------------*/
 
+#include<iterator>
+#include<list>
 #include<unordered_map>
 #include<boost/functional/hash.hpp>
 #include"iapws95_param.h"
@@ -25,7 +27,9 @@
 #define _INCLUDE_IAPWS95_MEMO_H_
 
 namespace memoize{
-  static const unsigned int max_memo=MAX_MEMO;
+  // default number of entries in each memo table, can be changed at run time
+  // with set_capacity or the IAPWS95_MEMO_CAPACITY environment variable
+  static const unsigned long max_memo=MAX_MEMO;
 
   typedef struct{  // storage type for no derivatives
     s_real val = (s_real)NAN;
@@ -46,6 +50,60 @@ namespace memoize{
   typedef std::tuple<unsigned char, s_real, s_real> args_bin;
   typedef std::tuple<unsigned char, s_real> args_un;
 
+  // Fixed capacity memo table, which drops the least recently used entry
+  // when it is full. Entries are kept in a list in order of use, and the
+  // hash map points to the list entries. Tables are not thread safe, each
+  // thread uses its own tables.
+  template<typename K, typename V> class lru_table{
+    public:
+      lru_table(unsigned long capacity) : cap(capacity) {}
+      // Return a pointer to the value for key, or NULL if not in the table
+      V *get(const K &key){
+        auto it = index.find(key);
+        if(it == index.end()) return NULL;
+        items.splice(items.begin(), items, it->second); // mark most recent
+        return &it->second->second;
+      }
+      // Return a pointer to the value for key, adding it if needed
+      V *put(const K &key){
+        V *data = get(key);
+        if(data != NULL) return data;
+        if(index.size() >= cap){ // reuse the least recently used entry
+          auto last = std::prev(items.end());
+          index.erase(last->first);
+          last->first = key;
+          last->second = V();
+          items.splice(items.begin(), items, last);
+        }
+        else{
+          items.emplace_front(key, V());
+        }
+        index[key] = items.begin();
+        return &items.front().second;
+      }
+      void set_capacity(unsigned long capacity){
+        cap = capacity;
+        while(index.size() > cap){
+          index.erase(items.back().first);
+          items.pop_back();
+        }
+      }
+      unsigned long size(){return index.size();}
+      unsigned long capacity(){return cap;}
+    private:
+      typedef std::list<std::pair<K, V>> item_list;
+      item_list items;
+      std::unordered_map<K, typename item_list::iterator, boost::hash<K>> index;
+      unsigned long cap;
+  };
+
+  // memo tables (used to look up statistics)
+  static const unsigned char
+    BIN = 0,  // binary functions with derivatives
+    UN = 1,   // unary functions with derivatives
+    BIN0 = 2, // binary functions without derivatives
+    UN0 = 3;  // unary functions without derivatives
+
   //binary functions without derivatives
   static const unsigned char
     phir = 1,
@@ -86,6 +144,17 @@ namespace memoize{
   unsigned int add_un0(unsigned char f, s_real x, s_real val);
   s_real get_bin0(unsigned char f, s_real x, s_real y);
   s_real get_un0(unsigned char f, s_real x);
+
+  // Capacity of each memo table (0 deactivates memoization).  Each thread
+  // has its own memo tables, so this is the capacity per thread.
+  void set_capacity(unsigned long capacity);
+  unsigned long get_capacity();
+  // Lookup statistics for function f in memo table t (for all threads), and
+  // size of the calling thread's memo table t
+  unsigned long hits(unsigned char t, unsigned char f);
+  unsigned long misses(unsigned char t, unsigned char f);
+  unsigned long size(unsigned char t);
+  void reset_stats();
 }
 
 #endif
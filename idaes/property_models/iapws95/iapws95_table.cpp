@@ -0,0 +1,206 @@
+/*------------------------------------------------------------------------------
+ Institute for the Design of Advanced Energy Systems Process Systems
+ Engineering Framework (IDAES PSE Framework) Copyright (c) 2018, by the
+ software owners: The Regents of the University of California, through
+ Lawrence Berkeley National Laboratory,  National Technology & Engineering
+ Solutions of Sandia, LLC, Carnegie Mellon University, West Virginia
+ University Research Corporation, et al. All rights reserved.
+
+ Please see the files COPYRIGHT.txt and LICENSE.txt for full copyright and
+ license information, respectively. Both files are also available online
+ at the URL "https://github.com/IDAES/idaes".
+------------------------------------------------------------------------------*/
+
+/*------------------------------------------------------------------------------
+ Table lookup of IAPWS95 properties as functions of enthalpy and pressure.
+
+ File: iapws95_table.cpp
+------------------------------------------------------------------------------*/
+
+#include<cmath>
+#include<cstdio>
+#include<cstdint>
+#include<cstdlib>
+#include<cstring>
+#include<iostream>
+#include<mutex>
+#include<string>
+#include<vector>
+#include<dlfcn.h>
+#include"iapws95.h"
+#include"iapws95_table.h"
+
+namespace table{
+
+struct table_data{
+  int nh, np;
+  s_real h_min, h_max, lnp_min, lnp_max, dh, dlnp;
+  s_real tol[NFUNC], err[NFUNC];
+  std::vector<double> node;     // [NFUNC][nh][np][4]
+  std::vector<uint8_t> exact;   // [nh - 1][np - 1]
+};
+
+static table_data *tab = NULL;
+static std::once_flag tried;
+
+int load(const char *path){
+  FILE *fp = fopen(path, "rb");
+  if(fp == NULL) return 1;
+  char mag[8];
+  int32_t dim[3];
+  double range[4];
+  table_data *t = new table_data;
+  bool ok = fread(mag, 1, 8, fp) == 8 && memcmp(mag, magic, 8) == 0 &&
+            fread(dim, sizeof(int32_t), 3, fp) == 3 && dim[0] == NFUNC &&
+            dim[1] > 1 && dim[2] > 1 &&
+            fread(range, sizeof(double), 4, fp) == 4 &&
+            fread(t->tol, sizeof(double), NFUNC, fp) == (size_t)NFUNC &&
+            fread(t->err, sizeof(double), NFUNC, fp) == (size_t)NFUNC;
+  if(ok){
+    t->nh = dim[1];
+    t->np = dim[2];
+    t->h_min = range[0];
+    t->h_max = range[1];
+    t->lnp_min = range[2];
+    t->lnp_max = range[3];
+    t->dh = (t->h_max - t->h_min)/(t->nh - 1);
+    t->dlnp = (t->lnp_max - t->lnp_min)/(t->np - 1);
+    size_t nn = (size_t)NFUNC*t->nh*t->np*4, nc = (size_t)(t->nh - 1)*(t->np - 1);
+    t->node.resize(nn);
+    t->exact.resize(nc);
+    ok = fread(t->node.data(), sizeof(double), nn, fp) == nn &&
+         fread(t->exact.data(), 1, nc, fp) == nc;
+  }
+  fclose(fp);
+  if(!ok){
+    delete t;
+    return 2;
+  }
+  delete tab;
+  tab = t;
+  return 0;
+}
+
+static void load_default(void){
+  std::string path;
+  const char *env = getenv("IAPWS95_TABLE");
+  if(env != NULL){
+    path = env;
+  }
+  else{
+    // look next to the library
+    Dl_info info;
+    if(dladdr((void*)&load_default, &info) && info.dli_fname != NULL){
+      path = info.dli_fname;
+      size_t i = path.find_last_of('/');
+      path = (i == std::string::npos) ? "" : path.substr(0, i + 1);
+    }
+    path += "iapws95_table.bin";
+  }
+  int err = load(path.c_str());
+  if(err == 1 && env == NULL) return; // no default table, use exact functions
+  if(err){
+    std::cerr << "IAPWS95 TABLE WARNING: could not read " << path
+              << ", using exact functions\n";
+  }
+}
+
+bool available(){
+  std::call_once(tried, load_default);
+  return tab != NULL;
+}
+
+s_real exact(int i, s_real ht, s_real pr, s_real *grad, s_real *hes){
+  if(i == TAU) return tau_with_derivs(ht, pr, grad, hes);
+  if(i == VF) return vf_with_derivs(ht, pr, grad, hes);
+  // delta(p, tau(h, p))
+  s_real gradt[2], hest[3], gradd[2], hesd[3], tau, delta;
+  tau = tau_with_derivs(ht, pr, gradt, hest);
+  if(i == DELTA_LIQ) delta = delta_liq(pr, tau, gradd, hesd);
+  else delta = delta_vap(pr, tau, gradd, hesd);
+  if(grad != NULL){
+    grad[0] = gradd[1]*gradt[0];
+    grad[1] = gradd[0] + gradd[1]*gradt[1];
+    if(hes != NULL){
+      hes[0] = hesd[2]*gradt[0]*gradt[0] + gradd[1]*hest[0];
+      hes[1] = (hesd[1] + hesd[2]*gradt[1])*gradt[0] + gradd[1]*hest[1];
+      hes[2] = hesd[0] + 2*hesd[1]*gradt[1] + hesd[2]*gradt[1]*gradt[1] + gradd[1]*hest[2];
+    }
+  }
+  return delta;
+}
+
+// Cubic Hermite basis functions and their first and second derivatives,
+// b[k][d] for the value at 0, slope at 0, value at 1, and slope at 1
+static inline void hermite(s_real t, s_real b[4][3]){
+  s_real t2 = t*t, t3 = t2*t;
+  b[0][0] = 2*t3 - 3*t2 + 1; b[0][1] = 6*t2 - 6*t;   b[0][2] = 12*t - 6;
+  b[1][0] = t3 - 2*t2 + t;   b[1][1] = 3*t2 - 4*t + 1; b[1][2] = 6*t - 4;
+  b[2][0] = -2*t3 + 3*t2;    b[2][1] = -6*t2 + 6*t;  b[2][2] = -12*t + 6;
+  b[3][0] = t3 - t2;         b[3][1] = 3*t2 - 2*t;   b[3][2] = 6*t - 2;
+}
+
+s_real lookup(int i, s_real ht, s_real pr, s_real *grad, s_real *hes){
+  if(!available() || !(pr > 0)) return exact(i, ht, pr, grad, hes);
+  const table_data &t = *tab;
+  s_real lnp = log(pr);
+  s_real x = (ht - t.h_min)/t.dh, y = (lnp - t.lnp_min)/t.dlnp;
+  if(!(x >= 0 && x <= t.nh - 1 && y >= 0 && y <= t.np - 1)){
+    return exact(i, ht, pr, grad, hes);
+  }
+  int ih = (int)x, ip = (int)y;
+  if(ih > t.nh - 2) ih = t.nh - 2;
+  if(ip > t.np - 2) ip = t.np - 2;
+  if(t.exact[(size_t)ih*(t.np - 1) + ip] & (1 << i)){
+    return exact(i, ht, pr, grad, hes);
+  }
+  s_real bx[4][3], by[4][3];
+  hermite(x - ih, bx);
+  hermite(y - ip, by);
+  // f and its derivatives w.r.t. the cell coordinates, [f, f_u, f_v, f_uu,
+  // f_uv, f_vv]
+  s_real f[6] = {0, 0, 0, 0, 0, 0};
+  static const int du[6] = {0, 1, 0, 2, 1, 0}, dv[6] = {0, 0, 1, 0, 1, 2};
+  for(int a = 0; a < 2; ++a){
+    for(int b = 0; b < 2; ++b){
+      const double *n = &t.node[(((size_t)i*t.nh + ih + a)*t.np + ip + b)*4];
+      // node derivatives scaled to cell coordinates
+      s_real c[4] = {n[0], n[1]*t.dh, n[2]*t.dlnp, n[3]*t.dh*t.dlnp};
+      for(int k = 0; k < 6; ++k){
+        s_real bu0 = bx[2*a][du[k]], bu1 = bx[2*a + 1][du[k]];
+        s_real bv0 = by[2*b][dv[k]], bv1 = by[2*b + 1][dv[k]];
+        f[k] += c[0]*bu0*bv0 + c[1]*bu1*bv0 + c[2]*bu0*bv1 + c[3]*bu1*bv1;
+      }
+    }
+  }
+  if(grad != NULL){
+    // convert to derivatives w.r.t. h and p
+    s_real fy = f[2]/t.dlnp;
+    grad[0] = f[1]/t.dh;
+    grad[1] = fy/pr;
+    if(hes != NULL){
+      hes[0] = f[3]/t.dh/t.dh;
+      hes[1] = f[4]/t.dh/t.dlnp/pr;
+      hes[2] = (f[5]/t.dlnp/t.dlnp - fy)/pr/pr;
+    }
+  }
+  return f[0];
+}
+
+} // namespace table
+
+s_real tau_tab_with_derivs(s_real ht, s_real pr, s_real *grad, s_real *hes){
+  return table::lookup(table::TAU, ht, pr, grad, hes);
+}
+
+s_real vf_tab_with_derivs(s_real ht, s_real pr, s_real *grad, s_real *hes){
+  return table::lookup(table::VF, ht, pr, grad, hes);
+}
+
+s_real delta_liq_tab_with_derivs(s_real ht, s_real pr, s_real *grad, s_real *hes){
+  return table::lookup(table::DELTA_LIQ, ht, pr, grad, hes);
+}
+
+s_real delta_vap_tab_with_derivs(s_real ht, s_real pr, s_real *grad, s_real *hes){
+  return table::lookup(table::DELTA_VAP, ht, pr, grad, hes);
+}
@@ -0,0 +1,78 @@
+/*------------------------------------------------------------------------------
+ Institute for the Design of Advanced Energy Systems Process Systems
+ Engineering Framework (IDAES PSE Framework) Copyright (c) 2018, by the
+ software owners: The Regents of the University of California, through
+ Lawrence Berkeley National Laboratory,  National Technology & Engineering
+ Solutions of Sandia, LLC, Carnegie Mellon University, West Virginia
+ University Research Corporation, et al. All rights reserved.
+
+ Please see the files COPYRIGHT.txt and LICENSE.txt for full copyright and
+ license information, respectively. Both files are also available online
+ at the URL "https://github.com/IDAES/idaes".
+------------------------------------------------------------------------------*/
+
+/*------------------------------------------------------------------------------
+ Table lookup of IAPWS95 properties as functions of enthalpy and pressure.
+
+ Calculating temperature, vapor fraction and phase densities from enthalpy and
+ pressure requires iterative solves.  These can be replaced by bicubic Hermite
+ interpolation over a precomputed table on a grid uniform in h and ln(p).  The
+ first and second derivatives returned are the exact derivatives of the
+ interpolating function.  The table generator (iapws95_table_gen.cpp) checks
+ the interpolation error in each cell, and cells where it is above the
+ tolerance (e.g. cells crossing the saturation curve) are marked to use the
+ exact functions instead, as are points outside the table.
+
+ The table file is read the first time a lookup is done. Its location is set
+ by the IAPWS95_TABLE environment variable, otherwise iapws95_table.bin in the
+ directory of the library is used.  If there is no table file, the exact
+ functions are used.
+
+ File: iapws95_table.h
+------------------------------------------------------------------------------*/
+
+#include"iapws95_param.h"
+
+#ifndef _INCLUDE_IAPWS95_TABLE_H_
+#define _INCLUDE_IAPWS95_TABLE_H_
+
+namespace table{
+  // Functions in the table
+  static const int
+    TAU = 0,       // tau = T_c/T
+    VF = 1,        // vapor fraction
+    DELTA_LIQ = 2, // reduced liquid density
+    DELTA_VAP = 3, // reduced vapor density
+    NFUNC = 4;
+
+  // Table file format (all little endian):
+  //   char[8] magic "IAPWSTB1"
+  //   int32 number of functions, number of h nodes, number of p nodes
+  //   double h_min, h_max (kJ/kg), ln(p_min), ln(p_max) (p in kPa)
+  //   double[NFUNC] error tolerance (relative for TAU and densities, absolute
+  //     for VF)
+  //   double[NFUNC] max error found in cells using interpolation
+  //   double[NFUNC][nh][np][4] f, df/dh, df/dlnp, d2f/dh/dlnp at nodes
+  //   uint8[nh - 1][np - 1] bit i set if function i uses exact evaluation in
+  //     the cell
+  static const char magic[9] = "IAPWSTB1";
+
+  // Exact function i of h (kJ/kg) and p (kPa), with derivatives
+  s_real exact(int i, s_real ht, s_real pr, s_real *grad, s_real *hes);
+
+  // Function i from the table (or the exact function where the table isn't
+  // used), with derivatives w.r.t. h and p
+  s_real lookup(int i, s_real ht, s_real pr, s_real *grad, s_real *hes);
+
+  // Load a table file, returns 0 on success
+  int load(const char *path);
+  // True if a table is loaded (loads the default table if not tried yet)
+  bool available();
+}
+
+s_real tau_tab_with_derivs(s_real ht, s_real pr, s_real *grad, s_real *hes);
+s_real vf_tab_with_derivs(s_real ht, s_real pr, s_real *grad, s_real *hes);
+s_real delta_liq_tab_with_derivs(s_real ht, s_real pr, s_real *grad, s_real *hes);
+s_real delta_vap_tab_with_derivs(s_real ht, s_real pr, s_real *grad, s_real *hes);
+
+#endif
@@ -0,0 +1,238 @@
+/*------------------------------------------------------------------------------
+ Institute for the Design of Advanced Energy Systems Process Systems
+ Engineering Framework (IDAES PSE Framework) Copyright (c) 2018, by the
+ software owners: The Regents of the University of California, through
+ Lawrence Berkeley National Laboratory,  National Technology & Engineering
+ Solutions of Sandia, LLC, Carnegie Mellon University, West Virginia
+ University Research Corporation, et al. All rights reserved.
+
+ Please see the files COPYRIGHT.txt and LICENSE.txt for full copyright and
+ license information, respectively. Both files are also available online
+ at the URL "https://github.com/IDAES/idaes".
+------------------------------------------------------------------------------*/
+
+/*------------------------------------------------------------------------------
+ Generate the IAPWS95 property table used by iapws95_table.cpp, and compare
+ the speed and accuracy of the table to the exact functions.
+
+ Usage: iapws95_table_gen [file [nh np [tol]]]
+
+ The default file is iapws95_table.bin.  The table covers enthalpies of 10 to
+ 4500 kJ/kg and pressures of 1 to 1e5 kPa.  Node derivatives are calculated
+ by central differences of the exact functions.  The interpolation error is
+ checked at points inside and on the edges of each cell, and cells where it
+ is larger than the tolerance, cells crossing the saturation curve and cells
+ crossing the critical pressure use the exact functions.  The largest error
+ found in cells using the table is written to the file and printed.
+
+ File: iapws95_table_gen.cpp
+------------------------------------------------------------------------------*/
+
+#include<chrono>
+#include<cmath>
+#include<cstdio>
+#include<cstdint>
+#include<cstdlib>
+#include<iostream>
+#include<random>
+#include<sstream>
+#include<vector>
+#include"iapws95.h"
+#include"iapws95_table.h"
+
+using namespace table;
+
+static const double H_MIN = 10, H_MAX = 4500, P_MIN = 1, P_MAX = 1e5;
+static const char *names[NFUNC] = {"tau", "vf", "delta_liq", "delta_vap"};
+
+// Error measure, relative except for vapor fraction
+static double error(int i, double f, double f_exact){
+  if(i == VF) return fabs(f - f_exact);
+  return fabs(f - f_exact)/fabs(f_exact);
+}
+
+// Exact values of all functions at a point, false if any are bad or the
+// temperature is outside the range of the library
+static bool exact_all(double ht, double pr, double *f){
+  for(int i = 0; i < NFUNC; ++i){
+    f[i] = exact(i, ht, pr, NULL, NULL);
+    if(!std::isfinite(f[i])) return false;
+  }
+  return f[TAU] > 0.15 && f[TAU] < 4.0;
+}
+
+// Write a table file, returns 0 on success
+static int write(const char *path, int nh, int np, const double *range,
+                 const double *tol, const double *err,
+                 const std::vector<double> &node,
+                 const std::vector<uint8_t> &flags){
+  FILE *fp = fopen(path, "wb");
+  if(fp == NULL) return 1;
+  int32_t dim[3] = {NFUNC, nh, np};
+  fwrite(magic, 1, 8, fp);
+  fwrite(dim, sizeof(int32_t), 3, fp);
+  fwrite(range, sizeof(double), 4, fp);
+  fwrite(tol, sizeof(double), NFUNC, fp);
+  fwrite(err, sizeof(double), NFUNC, fp);
+  fwrite(node.data(), sizeof(double), node.size(), fp);
+  fwrite(flags.data(), 1, flags.size(), fp);
+  return fclose(fp) ? 1 : 0;
+}
+
+int main(int argc, char **argv){
+  const char *path = (argc > 1) ? argv[1] : "iapws95_table.bin";
+  int nh = (argc > 3) ? atoi(argv[2]) : 300;
+  int np = (argc > 3) ? atoi(argv[3]) : 120;
+  double tol_arg = (argc > 4) ? atof(argv[4]) : 1e-6;
+  double tol[NFUNC] = {tol_arg, tol_arg, tol_arg, tol_arg};
+  double lnp_min = log(P_MIN), lnp_max = log(P_MAX);
+  double dh = (H_MAX - H_MIN)/(nh - 1), dlnp = (lnp_max - lnp_min)/(np - 1);
+  // central difference steps
+  double eh = 1e-2*dh, ey = 1e-2*dlnp;
+
+  // the exact functions warn when clipping temperature, don't print that
+  std::stringstream quiet;
+  std::streambuf *cerr_buf = std::cerr.rdbuf(quiet.rdbuf());
+
+  auto t0 = std::chrono::steady_clock::now();
+  std::vector<double> node((size_t)NFUNC*nh*np*4);
+  std::vector<uint8_t> bad_node((size_t)nh*np, 0);
+  for(int a = 0; a < nh; ++a){
+    for(int b = 0; b < np; ++b){
+      double ht = H_MIN + a*dh, y = lnp_min + b*dlnp;
+      double f[3][3][NFUNC];
+      bool ok = true;
+      for(int j = 0; j < 3; ++j){
+        for(int k = 0; k < 3; ++k){
+          ok = exact_all(ht + (j - 1)*eh, exp(y + (k - 1)*ey), f[j][k]) && ok;
+        }
+      }
+      if(!ok) bad_node[(size_t)a*np + b] = 1;
+      for(int i = 0; i < NFUNC; ++i){
+        double *n = &node[(((size_t)i*nh + a)*np + b)*4];
+        n[0] = f[1][1][i];
+        n[1] = (f[2][1][i] - f[0][1][i])/2/eh;
+        n[2] = (f[1][2][i] - f[1][0][i])/2/ey;
+        n[3] = (f[2][2][i] - f[2][0][i] - f[0][2][i] + f[0][0][i])/4/eh/ey;
+      }
+    }
+  }
+
+  // check the cells
+  static const double ts[13][2] = {
+    {0.25, 0.25}, {0.25, 0.5}, {0.25, 0.75}, {0.5, 0.25}, {0.5, 0.5},
+    {0.5, 0.75}, {0.75, 0.25}, {0.75, 0.5}, {0.75, 0.75}, {0.5, 0}, {0, 0.5},
+    {0.5, 1}, {1, 0.5}};
+  std::vector<uint8_t> flags((size_t)(nh - 1)*(np - 1), 0);
+  double err[NFUNC] = {0, 0, 0, 0};
+  // write the nodes first so the table can be used to check cells
+  double range[4] = {H_MIN, H_MAX, lnp_min, lnp_max};
+  if(write(path, nh, np, range, tol, err, node, flags) || load(path)){
+    std::cerr.rdbuf(cerr_buf);
+    std::cerr << "Could not write " << path << "\n";
+    return 1;
+  }
+  int n_exact = 0;
+  for(int a = 0; a < nh - 1; ++a){
+    for(int b = 0; b < np - 1; ++b){
+      double h0 = H_MIN + a*dh, h1 = h0 + dh;
+      double p0 = exp(lnp_min + b*dlnp), p1 = exp(lnp_min + (b + 1)*dlnp);
+      bool use_exact = bad_node[(size_t)a*np + b] ||
+                       bad_node[(size_t)(a + 1)*np + b] ||
+                       bad_node[(size_t)a*np + b + 1] ||
+                       bad_node[(size_t)(a + 1)*np + b + 1] ||
+                       (p0 <= P_c && p1 >= P_c);
+      // cells crossing the saturation curve
+      for(int k = 0; k < 3 && !use_exact && p0 < P_c; ++k){
+        double pr = exp(lnp_min + (b + 0.5*k)*dlnp);
+        if(pr >= P_c) break;
+        double tau_sat = sat_tau_with_derivs(pr, NULL, NULL);
+        double hl = hlpt_with_derivs(pr, tau_sat, NULL, NULL);
+        double hv = hvpt_with_derivs(pr, tau_sat, NULL, NULL);
+        if((hl >= h0 - dh && hl <= h1 + dh) || (hv >= h0 - dh && hv <= h1 + dh))
+          use_exact = true;
+      }
+      double cell_err[NFUNC] = {0, 0, 0, 0};
+      for(int s = 0; s < 13 && !use_exact; ++s){
+        double ht = h0 + ts[s][0]*dh;
+        double pr = exp(lnp_min + (b + ts[s][1])*dlnp), f[NFUNC];
+        if(!exact_all(ht, pr, f)){
+          use_exact = true;
+          break;
+        }
+        for(int i = 0; i < NFUNC; ++i){
+          double e = error(i, lookup(i, ht, pr, NULL, NULL), f[i]);
+          if(!(e <= tol[i])) use_exact = true;
+          if(e > cell_err[i]) cell_err[i] = e;
+        }
+      }
+      if(use_exact){
+        flags[(size_t)a*(np - 1) + b] = (1 << NFUNC) - 1;
+        ++n_exact;
+      }
+      else{
+        for(int i = 0; i < NFUNC; ++i) if(cell_err[i] > err[i]) err[i] = cell_err[i];
+      }
+    }
+  }
+  write(path, nh, np, range, tol, err, node, flags);
+  load(path);
+  auto t1 = std::chrono::steady_clock::now();
+
+  printf("Wrote %s: %d x %d nodes, h = %g to %g kJ/kg, p = %g to %g kPa\n",
+    path, nh, np, H_MIN, H_MAX, P_MIN, P_MAX);
+  printf("Generated in %.1f s, %d of %d cells use exact functions\n",
+    std::chrono::duration<double>(t1 - t0).count(), n_exact,
+    (nh - 1)*(np - 1));
+  printf("Max error in cells using the table (vf absolute, others relative):\n");
+  for(int i = 0; i < NFUNC; ++i){
+    printf("  %-10s %10.3e (tolerance %.1e)\n", names[i], err[i], tol[i]);
+  }
+
+  // Compare to the exact functions at random points
+  int n = 10000;
+  std::mt19937 gen(42);
+  std::uniform_real_distribution<double> uh(H_MIN, H_MAX), uy(lnp_min, lnp_max);
+  std::vector<double> hs(n), ps(n);
+  for(int k = 0; k < n; ++k){
+    hs[k] = uh(gen);
+    ps[k] = exp(uy(gen));
+  }
+  printf("\nBenchmark, %d random points, with first and second derivatives\n", n);
+  printf("  function   exact (us) table (us)  max error  max grad error\n");
+  for(int i = 0; i < NFUNC; ++i){
+    // sum the values so the timed loops are not optimized out
+    double grad[2], hes[3], grad_e[2], hes_e[3], sum = 0, max_e = 0, max_g = 0;
+    auto a0 = std::chrono::steady_clock::now();
+    for(int k = 0; k < n; ++k) sum += exact(i, hs[k], ps[k], grad, hes);
+    auto a1 = std::chrono::steady_clock::now();
+    for(int k = 0; k < n; ++k) sum += lookup(i, hs[k], ps[k], grad, hes);
+    auto a2 = std::chrono::steady_clock::now();
+    for(int k = 0; k < n; ++k){
+      double f = lookup(i, hs[k], ps[k], grad, hes);
+      double fe = exact(i, hs[k], ps[k], grad_e, hes_e);
+      if(!std::isfinite(fe)) continue;
+      // only compare the density of phases that exist, the exact density of
+      // a phase that doesn't exist can be discontinuous
+      double vf = vf_with_derivs(hs[k], ps[k], NULL, NULL);
+      if(i == DELTA_LIQ && vf >= 1) continue;
+      if(i == DELTA_VAP && vf <= 0) continue;
+      double e = error(i, f, fe);
+      if(e > max_e) max_e = e;
+      // the exact tau derivatives are zero in the two-phase region, so only
+      // compare derivatives of tau and density for a single phase
+      if(i != VF && vf > 0 && vf < 1) continue;
+      for(int j = 0; j < 2; ++j){
+        double s = fabs(grad_e[j]) > 1e-8 ? fabs(grad_e[j]) : 1.0;
+        double g = fabs(grad[j] - grad_e[j])/s;
+        if(g > max_g) max_g = g;
+      }
+    }
+    printf("  %-10s %10.3f %10.3f %10.3e %10.3e\n", names[i],
+      std::chrono::duration<double>(a1 - a0).count()/n*1e6,
+      std::chrono::duration<double>(a2 - a1).count()/n*1e6, max_e, max_g);
+    if(!std::isfinite(sum)) printf("  (some values not finite)\n");
+  }
+  std::cerr.rdbuf(cerr_buf);
+  return 0;
+}
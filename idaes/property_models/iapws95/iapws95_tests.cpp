@@ -1,6 +1,8 @@
 
 #include <stdio.h>
 #include <math.h>
+#include <thread>
+#include <vector>
 
 #include "iapws95.h"
 #include "iapws95_param.h"
@@ -262,6 +264,57 @@ int test_spline(){
   return 0;
 }
 
+// p, h, and s (with derivatives) at point i of a grid over enthalpy and
+// pressure, for test_threads
+void eval_point(int i, int n, s_real *res){
+  s_real grad[2], hes[3];
+  s_real ht = 100.0 + 3500.0*(i/n)/(n - 1); // kJ/kg
+  s_real pr = 50.0 + 20000.0*(i%n)/(n - 1); // kPa
+  s_real tau = tau_with_derivs(ht, pr, grad, hes);
+  s_real delta = delta_liq(pr, tau, grad, hes);
+  res[0] = p_with_derivs(delta, tau, grad, hes);
+  res[1] = grad[0];
+  res[2] = hes[0];
+  res[3] = h_with_derivs(delta, tau, grad, hes);
+  res[4] = grad[1];
+  res[5] = s_with_derivs(delta, tau, grad, hes);
+  res[6] = hes[2];
+}
+
+int test_threads(int nthreads, int n){
+  // Evaluate properties from several threads at once, and check that the
+  // results match single threaded evaluation
+  const int npts = n*n, nres = 7;
+  std::vector<s_real> ref(npts*nres);
+  std::vector<int> err(nthreads, 0);
+  std::vector<std::thread> threads;
+  for(int i=0; i<npts; ++i) eval_point(i, n, &ref[i*nres]);
+  for(int t=0; t<nthreads; ++t){
+    threads.push_back(std::thread([&, t](){
+      s_real res[nres];
+      for(int rep=0; rep<3; ++rep){
+        for(int k=0; k<npts; ++k){
+          int i = (k*(t + 1) + rep)%npts; // each thread uses its own order
+          eval_point(i, n, res);
+          for(int j=0; j<nres; ++j){
+            s_real a = res[j], b = ref[i*nres + j];
+            if(!(a == b || (std::isnan(a) && std::isnan(b)) ||
+                 fabs(a - b) <= 1e-12*fabs(b))) ++err[t];
+          }
+        }
+      }
+    }));
+  }
+  int nerr = 0;
+  for(int t=0; t<nthreads; ++t){
+    threads[t].join();
+    nerr += err[t];
+  }
+  printf("\n\nThreaded evaluation (%d threads, %d points): %d mismatches\n",
+    nthreads, npts, nerr);
+  return nerr;
+}
+
 int main(){
   test_15_6();
   test_15_7();
@@ -274,5 +327,6 @@ int main(){
   test_delta_from_p_tau();
   test_spline();
   test_sat_tau(0.5, P_c, 100);
+  test_threads(8, 20);
   printf("\n");
 }
@@ -51,24 +51,55 @@ import os
 # Import Pyomo libraries
 from pyomo.environ import Constraint, Expression, Param, PositiveReals,\
                           RangeSet, Reals, Set, value, Var, NonNegativeReals,\
-                          exp, sqrt, log, tanh, ConcreteModel
+                          exp, sqrt, log, tanh
 from pyomo.environ import ExternalFunction as EF
 from pyomo.opt import SolverFactory, TerminationCondition
 from pyomo.core.kernel.component_set import ComponentSet
-from pyutilib.misc.config import ConfigValue
+from pyomo.common.config import ConfigValue, In
 
 # Import IDAES
 from idaes.core import declare_process_block_class, ProcessBlock, \
                        StateBlock, StateBlockData, PhysicalParameterBlock
+from idaes.core.property_base import indexed_properties
+from idaes.core.util.misc import add_object_reference
+from idaes.property_models.iapws95.iapws95_eval import evaluate
 
 # Logger
 _log = logging.getLogger(__name__)
 
+# External functions declared on the parameter block, which state blocks
+# reference by the same name
+_external_functions = (
+    "func_p", "func_u", "func_s", "func_h", "func_hvpt", "func_hlpt",
+    "func_tau", "func_vf", "func_g", "func_f", "func_cv", "func_cp", "func_w",
+    "func_delta_liq", "func_delta_vap", "func_delta_sat_l",
+    "func_delta_sat_v", "func_p_sat", "func_tau_sat", "func_phi0",
+    "func_phi0_delta", "func_phi0_delta2", "func_phi0_tau", "func_phi0_tau2",
+    "func_phir", "func_phir_delta", "func_phir_delta2", "func_phir_tau",
+    "func_phir_tau2", "func_phir_delta_tau")
+
+# External functions declared on the parameter block only with use_table
+_table_functions = ("func_delta_liq_tab", "func_delta_vap_tab")
+
+# Memo tables and function ids used in the IAPWS95 library (iapws95_memo.h),
+# by the name of the memoized function
+_memo_functions = {
+    "p": (0, 1), "delta_liq": (0, 3), "delta_vap": (0, 4),
+    "p_sat": (1, 1), "delta_sat_l": (1, 2), "delta_sat_v": (1, 3),
+    "tau_sat": (1, 4),
+    "phir": (2, 1), "phir_delta": (2, 2), "phir_tau": (2, 3),
+    "phir_delta2": (2, 4), "phir_delta_tau": (2, 5), "phir_tau2": (2, 6),
+    "phir_delta3": (2, 7), "phir_delta2_tau": (2, 8),
+    "phir_delta_tau2": (2, 9), "phir_delta4": (2, 10),
+    "phir_delta2_tau2": (2, 11), "phir_delta3_tau": (2, 12),
+    "phir_delta_tau3": (2, 13), "phir_tau3": (2, 14), "phir_tau4": (2, 15)}
+
 def htpx(T, P=None, x=None):
     """
     Conveneince function to calculate steam enthalpy from temperature and
     either pressure or vapor fraction. This function can be used for inlet
     streams and initialization where temperature is known instread of enthalpy.
+    For many states at once, use evaluate.
     Args:
         T: Temperature [K]
         P: Pressure [Pa], None if saturated steam
@@ -77,23 +108,53 @@ def htpx(T, P=None, x=None):
     Returns:
         Molar enthalpy [J/mol].
     """
-    model = ConcreteModel()
-    model.prop_param = Iapws95ParameterBlock()
-    prop = model.prop = Iapws95StateBlock(default={"parameters":model.prop_param})
-
     if x is None:
-        Tsat = 647.096/value(prop.func_tau_sat(P/1000))
-        if value(T) < Tsat or value(P/1000) > 22064: #liquid
-            return value(prop.func_hlpt(P/1000, 647.096/T)*prop.mw*1000.0)
-        else: #vapor
-            return value(prop.func_hvpt(P/1000, 647.096/T)*prop.mw*1000.0)
-    if P is None:
-        Psat = value(prop.func_p_sat(647.096/T))
-        return value(prop.func_hlpt(Psat, 647.096/T)*prop.mw*1000.0)*(x-1) +\
-            value(prop.func_hlpt(Psat, 647.096/T)*prop.mw*1000.0)*x
+        res = evaluate(["h"], T=value(T), P=value(P))
+    else:
+        res = evaluate(["h"], T=value(T), x=value(x))
+    return float(res["h"][0])
+
+def table_path():
+    """
+    Get the location of the IAPWS95 property table used by the library when
+    the use_table option is set. This is the IAPWS95_TABLE environment
+    variable if set, otherwise iapws95_table.bin next to the library.
+
+    Returns:
+        Path of the table file
+    """
+    return os.environ.get("IAPWS95_TABLE", os.path.join(
+        os.path.dirname(__file__), "iapws95_table.bin"))
 
 @declare_process_block_class("Iapws95ParameterBlock")
 class Iapws95ParameterBlockData(PhysicalParameterBlock):
+    CONFIG = PhysicalParameterBlock.CONFIG()
+
+    CONFIG.declare("use_table", ConfigValue(
+        default=False,
+        domain=In([True, False]),
+        description="Flag indicating whether to use the property table",
+        doc="""Flag indicating whether temperature, vapor fraction and phase
+densities should be interpolated from the precomputed property table
+(generated by make table) instead of solved for from enthalpy and pressure,
+**default** - False.
+**Valid values:** {
+**True** - use the table, and the exact functions where the table is not
+accurate enough or does not cover the state,
+**False** - use the exact functions.}"""))
+
+    CONFIG.declare("indexed_properties", ConfigValue(
+        default=False,
+        domain=In([True, False]),
+        description="Flag indicating whether to use indexed properties",
+        doc="""Flag indicating whether the property expressions of indexed
+state blocks should be built as indexed components shared by all elements of
+the state block, rather than as separate components on each element,
+**default** - False.
+**Valid values:** {
+**True** - build properties as indexed components (reduces the number of
+components in large models, e.g. 1D models),
+**False** - build properties on each element.}"""))
 
     def build(self):
         super(Iapws95ParameterBlockData, self).build()
@@ -102,11 +163,63 @@ class Iapws95ParameterBlockData(PhysicalParameterBlock):
         self.plib = os.path.dirname(__file__)
         self.plib = os.path.join(self.plib, "iapws95.so")
         self.available = os.path.isfile(self.plib)
+        self.table_available = os.path.isfile(table_path())
+        if self.config.use_table and not self.table_available:
+            _log.warning("IAPWS property table {} not found, the exact "
+                         "functions will be used. Was it generated with "
+                         "make table?".format(table_path()))
         # Phase list
         self.private_phase_list = Set(initialize=["Vap", "Liq"])
         self.phase_list = Set(initialize=["Mix"])
         # Component list - a list of component identifiers
         self.component_list = Set(initialize=['H2O'])
+        # External Functions (some of these are included only for testing).
+        # These are shared by all state blocks using this parameter block.
+        plib = self.plib
+        self.func_p = EF(library=plib, function="p")
+        self.func_u = EF(library=plib, function="u")
+        self.func_s = EF(library=plib, function="s")
+        self.func_h = EF(library=plib, function="h")
+        self.func_hvpt = EF(library=plib, function="hvpt")
+        self.func_hlpt = EF(library=plib, function="hlpt")
+        if self.config.use_table:
+            # Interpolate from the property table (see iapws95_table.h)
+            self.func_tau = EF(library=plib, function="tau_tab")
+            self.func_vf = EF(library=plib, function="vf_tab")
+        else:
+            self.func_tau = EF(library=plib, function="tau")
+            self.func_vf = EF(library=plib, function="vf")
+        self.func_g = EF(library=plib, function="g")
+        self.func_f = EF(library=plib, function="f")
+        self.func_cv = EF(library=plib, function="cv")
+        self.func_cp = EF(library=plib, function="cp")
+        self.func_w = EF(library=plib, function="w")
+        self.func_delta_liq = EF(library=plib, function="delta_liq")
+        self.func_delta_vap = EF(library=plib, function="delta_vap")
+        self.func_delta_sat_l = EF(library=plib, function="delta_sat_l")
+        self.func_delta_sat_v = EF(library=plib, function="delta_sat_v")
+        self.func_p_sat = EF(library=plib, function="p_sat")
+        self.func_tau_sat = EF(library=plib, function="tau_sat")
+        self.func_phi0 = EF(library=plib, function="phi0")
+        self.func_phi0_delta = EF(library=plib, function="phi0_delta")
+        self.func_phi0_delta2 = EF(library=plib, function="phi0_delta2")
+        self.func_phi0_tau = EF(library=plib, function="phi0_tau")
+        self.func_phi0_tau2 = EF(library=plib, function="phi0_tau2")
+        self.func_phir = EF(library=plib, function="phir")
+        self.func_phir_delta = EF(library=plib, function="phir_delta")
+        self.func_phir_delta2 = EF(library=plib, function="phir_delta2")
+        self.func_phir_tau = EF(library=plib, function="phir_tau")
+        self.func_phir_tau2 = EF(library=plib, function="phir_tau2")
+        self.func_phir_delta_tau = EF(library=plib, function="phir_delta_tau")
+        # Phase densities as functions of enthalpy and pressure from the table
+        if self.config.use_table:
+            self.func_delta_liq_tab = EF(library=plib,
+                                         function="delta_liq_tab")
+            self.func_delta_vap_tab = EF(library=plib,
+                                         function="delta_vap_tab")
+        # Memo table statistics and capacity (not used in models)
+        self.func_memo_stats = EF(library=plib, function="memo_stats")
+        self.func_memo_capacity = EF(library=plib, function="memo_capacity")
         # Parameters, these should match what's in the C code
         self.temperature_crit = Param(initialize=647.096,
             doc='Critical temperature [K]')
@@ -216,6 +329,40 @@ class Iapws95ParameterBlockData(PhysicalParameterBlock):
             (5,6):-5.93264e-4},
             doc="1st order viscosity parameters")
 
+    def memo_stats(self):
+        """
+        Get the hit and miss counts of the memo tables in the IAPWS95 library.
+        The counts are for evaluations in this process, solvers load their
+        own copy of the library.
+
+        Returns:
+            dict of dicts with hits, misses and hit_rate by function name
+        """
+        stats = {}
+        for name, (table, f) in _memo_functions.items():
+            hits = value(self.func_memo_stats(table, f, 0))
+            misses = value(self.func_memo_stats(table, f, 1))
+            n = hits + misses
+            stats[name] = {"hits": int(hits),
+                           "misses": int(misses),
+                           "hit_rate": hits/n if n else None}
+        return stats
+
+    def set_memo_capacity(self, n):
+        """
+        Set the maximum number of entries in each memo table of the IAPWS95
+        library in this process. When a table is full the least recently used
+        entry is dropped. Solvers read the capacity from the
+        IAPWS95_MEMO_CAPACITY environment variable.
+
+        Args:
+            n: number of entries, 0 turns off memoization
+
+        Returns:
+            None
+        """
+        value(self.func_memo_capacity(n))
+
     @classmethod
     def define_metadata(cls, obj):
         obj.add_properties({
@@ -296,6 +443,13 @@ class _StateBlock(StateBlock):
             self._set_fixed(self[i].enth_mol, f[1])
             self._set_fixed(self[i].pressure, f[2])
 
+    def build_indexed_properties(self, params):
+        """Create the property expressions as indexed components."""
+        def add(name, *sets, **kwargs):
+            return self.add_indexed_property(name, Expression, *sets,
+                                             **kwargs)
+        _make_properties(params, add)
+
 
 @declare_process_block_class("Iapws95StateBlock", block_class=_StateBlock, doc="""
     This is some placeholder doc.
@@ -329,15 +483,6 @@ class Iapws95StateBlockData(StateBlockData):
         """
         super(Iapws95StateBlockData, self).build(*args)
 
-        # parameters
-        component_list = self.config.parameters.component_list
-        phase_list = self.config.parameters.phase_list
-        private_phase_list = self.config.parameters.private_phase_list
-        temperature_crit = self.config.parameters.temperature_crit
-        pressure_crit = self.config.parameters.pressure_crit
-        dens_mass_crit = self.config.parameters.dens_mass_crit
-        gas_const = self.config.parameters.gas_const
-
         # Set if the IAPWS library is available.
         self.available = self.config.parameters.available
         if not self.available:
@@ -360,242 +505,24 @@ class Iapws95StateBlockData(StateBlockData):
         self.extensive_set = ComponentSet((self.flow_mol,))
         self.intensive_set = ComponentSet((self.enth_mol, self.pressure))
 
-        # External Functions (some of these are included only for testing)
-        plib = self.config.parameters.plib
-        self.func_p = EF(library=plib, function="p")
-        self.func_u = EF(library=plib, function="u")
-        self.func_s = EF(library=plib, function="s")
-        self.func_h = EF(library=plib, function="h")
-        self.func_hvpt = EF(library=plib, function="hvpt")
-        self.func_hlpt = EF(library=plib, function="hlpt")
-        self.func_tau = EF(library=plib, function="tau")
-        self.func_vf = EF(library=plib, function="vf")
-        self.func_g = EF(library=plib, function="g")
-        self.func_f = EF(library=plib, function="f")
-        self.func_cv = EF(library=plib, function="cv")
-        self.func_cp = EF(library=plib, function="cp")
-        self.func_w = EF(library=plib, function="w")
-        self.func_delta_liq = EF(library=plib, function="delta_liq")
-        self.func_delta_vap = EF(library=plib, function="delta_vap")
-        self.func_delta_sat_l = EF(library=plib, function="delta_sat_l")
-        self.func_delta_sat_v = EF(library=plib, function="delta_sat_v")
-        self.func_p_sat = EF(library=plib, function="p_sat")
-        self.func_tau_sat = EF(library=plib, function="tau_sat")
-        self.func_phi0 = EF(library=plib, function="phi0")
-        self.func_phi0_delta = EF(library=plib, function="phi0_delta")
-        self.func_phi0_delta2 = EF(library=plib, function="phi0_delta2")
-        self.func_phi0_tau = EF(library=plib, function="phi0_tau")
-        self.func_phi0_tau2 = EF(library=plib, function="phi0_tau2")
-        self.func_phir = EF(library=plib, function="phir")
-        self.func_phir_delta = EF(library=plib, function="phir_delta")
-        self.func_phir_delta2 = EF(library=plib, function="phir_delta2")
-        self.func_phir_tau = EF(library=plib, function="phir_tau")
-        self.func_phir_tau2 = EF(library=plib, function="phir_tau2")
-        self.func_phir_delta_tau = EF(library=plib, function="phir_delta_tau")
-
-        # Calcuations (In this case all expressions no constraints)
-
-        # molecular weight
-        self.mw = Expression(expr=self.config.parameters.mw,
-            doc="molecular weight [kg/mol]")
-        mw = self.mw
-        mw.latex_symbol = "M"
-
-        self.flow_mass = Expression(expr=self.mw*self.flow_mol,
-            doc="mass flow rate [kg/s]")
-
-        self.enth_mass = Expression(expr = self.enth_mol/mw,
-            doc="Mass enthalpy (J/kg)")
-
-        # Conveneint shorter names and expressions
-        P = self.pressure/1000.0 # Pressure expr [kPA] (for external func)
-        h_mass = self.enth_mass/1000 #enthalpy expr [kJ/kg] (for external func)
-        Tc = temperature_crit # critical temperature
-
-        # Temperature expression, external function takes
-        self.temperature = Expression(expr=Tc/self.func_tau(h_mass, P),
-            doc="Temperature (K)")
-        self.temperature.latex_symbol = "T"
-
-        self.vapor_frac = Expression(expr=self.func_vf(h_mass, P),
-            doc="Vapor mole fraction (mol vapor/mol total)")
-        self.vapor_frac.latex_symbol = "y"
-
-        # More conveneint shorter names and expressions
-        rhoc = dens_mass_crit
-        T = self.temperature
-        vf = self.vapor_frac
-        phlist = private_phase_list
-
-        # Saturation temperature expression
-        self.temperature_sat = Expression(expr=Tc/self.func_tau_sat(P),
-            doc="Stauration temperature (K)")
-        self.temperature_sat.latex_symbol = "T_\{sat\}"
-
-        # Saturation tau (tau = Tc/T)
-        self.tau_sat = Expression(expr=self.func_tau_sat(P))
-
-        # Reduced temperature
-        self.temperature_red = Expression(expr=T/Tc,
-            doc="reduced temperature T/Tc (unitless)")
-        self.temperature_red.latex_symbol = "T_r"
-
-        self.tau = Expression(expr=Tc/T, doc="Tc/T (unitless)")
-        tau = self.tau
-        self.tau.latex_symbol = "\\tau"
-
-        # Saturation pressure
-        self.pressure_sat = Expression(expr=1000*self.func_p_sat(tau),
-            doc="Saturation pressure (Pa)")
-        self.pressure_sat.latex_symbol = "P_\{sat\}"
-        Psat = self.pressure_sat/1000.0 # expression for Psat in kPA
-
-        # Calculate liquid and vapor density.  If the phase doesn't exist,
-        # density will be calculated at the saturation or critical pressure
-        def rule_dens_mass(b, i):
-            if i=="Liq":
-                return rhoc*self.func_delta_liq(P, tau)
-            else:
-                return rhoc*self.func_delta_vap(P, tau)
-        self.dens_mass_phase = Expression(phlist, rule=rule_dens_mass,
-            doc="Mass density by phase (kg/m3)")
-        self.dens_mass_phase.latex_symbol = "\\rho"
-
-        # Reduced Density (no _mass_ identifier because mass or mol is same)
-        def rule_dens_red(b, p):
-            return self.dens_mass_phase[p]/rhoc
-        self.dens_phase_red = Expression(phlist, rule=rule_dens_red,
-            doc="reduced density (unitless)")
-        self.dens_phase_red.latex_symbol = "\\delta"
-        delta = self.dens_phase_red # this shorter name is from IAPWS
-
-        # Phase property expressions all converted to SI
-
-        # Saturated Enthalpy
-        def rule_enth_mol_sat_phase(b, p):
-            if p == "Liq":
-                return 1000*mw*self.func_hlpt(P, self.tau_sat)
-            elif p == "Vap":
-                return 1000*mw*self.func_hvpt(P, self.tau_sat)
-        self.enth_mol_sat_phase = Expression(phlist,
-            rule=rule_enth_mol_sat_phase,
-            doc="Saturated enthalpy of the phases at pressure (J/mol)")
-
-        self.dh_vap_mol = Expression(
-            expr=self.enth_mol_sat_phase["Vap"] - self.enth_mol_sat_phase["Liq"],
-            doc="Enthaply of vaporization at pressure and saturation (J/mol)")
-
-        # Phase Enthalpy
-        def rule_enth_mol_phase(b, p):
-            return 1000*mw*self.func_h(delta[p], tau)
-        self.enth_mol_phase = Expression(phlist,
-            rule=rule_enth_mol_phase,
-            doc="Phase enthalpy or saturated if phase doesn't exist [J/mol]")
-
-        # Phase Entropy
-        def rule_entr_mol_phase(b, p):
-            return 1000*mw*self.func_s(delta[p], tau)
-        self.entr_mol_phase = Expression(phlist,
-            rule=rule_entr_mol_phase,
-            doc="Phase entropy or saturated if phase doesn't exist [J/mol/K]")
-
-        # Phase constant pressure heat capacity, cp
-        def rule_cp_mol_phase(b, p):
-            return 1000*mw*self.func_cp(delta[p], tau)
-        self.cp_mol_phase = Expression(phlist,
-            rule=rule_cp_mol_phase,
-            doc="Phase cp or saturated if phase doesn't exist [J/mol/K]")
-
-        # Phase constant pressure heat capacity, cv
-        def rule_cv_mol_phase(b, p):
-            return 1000*mw*self.func_cv(delta[p], tau)
-        self.cv_mol_phase = Expression(phlist,
-            rule=rule_cv_mol_phase,
-            doc="Phase cv or saturated if phase doesn't exist [J/mol/K]")
-
-        # Phase speed of sound
-        def rule_speed_sound_phase(b, p):
-            return self.func_w(delta[p], tau)
-        self.speed_sound_phase = Expression(phlist,
-            rule=rule_speed_sound_phase,
-            doc="Phase speed of sound or saturated if phase doesn't exist [m/s]")
-
-        # Phase Mole density
-        def rule_dens_mol_phase(b, p):
-            return self.dens_mass_phase[p]/mw
-        self.dens_mol_phase = Expression(phlist,
-            rule=rule_dens_mol_phase,
-            doc="Phase mole density or saturated if phase doesn't exist [mol/m3]")
-
-        # Phase Thermal conductiviy
-        def rule_tc(b, p):
-            L0 = self.config.parameters.tc_L0
-            L1 = self.config.parameters.tc_L1
-            return 1e-3*sqrt(1.0/tau)/sum(L0[i]*tau**i for i in L0)*\
-                exp(delta[p]*sum((tau - 1)**i*sum(L1[i,j]*(delta[p] - 1)**j\
-                    for j in range(0,6)) for i in range(0,5)))
-        self.therm_cond_phase = Expression(phlist, rule=rule_tc,
-            doc="Thermal conductivity [W/K/m]")
-
-        # Phase dynamic viscosity
-        def rule_mu(b, p):
-            H0 = self.config.parameters.visc_H0
-            H1 = self.config.parameters.visc_H1
-            return 1e-4*sqrt(1.0/tau)/sum(H0[i]*tau**i for i in H0)*\
-                exp(delta[p]*sum((tau - 1)**i*sum(H1[i,j]*(delta[p] - 1)**j\
-                    for j in range(0,7)) for i in range(0,6)))
-        self.visc_d_phase = Expression(phlist, rule=rule_mu,
-            doc="Viscosity (dynamic) [Pa*s]")
-
-        # Phase kinimatic viscosity
-        def rule_nu(b, p):
-            return self.visc_d_phase[p]/self.dens_mass_phase[p]
-        self.visc_k_phase = Expression(phlist, rule=rule_nu,
-            doc="Kinematic viscosity [m^2/s]")
-
-        #Phase fraction
-        def rule_phase_frac(b, p):
-            if p == "Vap":
-                return vf
-            elif p == "Liq":
-                return 1.0 - vf
-        self.phase_frac = Expression(phlist,
-            rule=rule_phase_frac, doc="Phase fraction [unitless]")
-
-        # Component flow (for units that need it)
-        def component_flow(b, i):
-            return self.flow_mol
-        self.flow_mol_comp = Expression(component_list,
-            rule=component_flow,
-            doc="Total flow (both phases) of component [mol/s]")
-
-        # Total (mixed phase) properties
-
-        #Entropy
-        self.entr_mol = Expression(expr=
-            sum(self.phase_frac[p]*self.entr_mol_phase[p] for p in phlist))
-        self.entr_mol.latex_symbol = "s"
-        #cp
-        self.cp_mol = Expression(expr=
-            sum(self.phase_frac[p]*self.cp_mol_phase[p] for p in phlist))
-        self.cp_mol.latex_symbol = "c_p"
-        #cv
-        self.cv_mol = Expression(expr=
-            sum(self.phase_frac[p]*self.cv_mol_phase[p] for p in phlist))
-        self.cv_mol.latex_symbol = "c_v"
-        #mass density
-        self.dens_mass = Expression(expr=
-            1.0/sum(self.phase_frac[p]*1.0/self.dens_mass_phase[p]
-                    for p in phlist))
-        #mole density
-        self.dens_mol = Expression(expr=
-            1.0/sum(self.phase_frac[p]*1.0/self.dens_mol_phase[p]
-                    for p in phlist))
-        #heat capacity ratio
-        self.heat_capacity_ratio = Expression(expr=self.cp_mol/self.cv_mol)
-        #Flows
-        self.flow_vol = Expression(expr=self.flow_mol/self.dens_mol,
-            doc="Total liquid + vapor volumetric flow (m3/s)")
+        # External Functions, declared once on the parameter block and shared
+        # by all state blocks
+        functions = _external_functions
+        if self.config.parameters.config.use_table:
+            functions += _table_functions
+        for name in functions:
+            add_object_reference(self, name,
+                                 getattr(self.config.parameters, name))
+
+        # Calcuations (In this case all expressions no constraints). In
+        # indexed property mode these are built for the whole state block by
+        # build_indexed_properties.
+        if not indexed_properties(self.config.parameters):
+            def add(name, *sets, **kwargs):
+                comp = Expression(*sets, **kwargs)
+                self.add_component(name, comp)
+                return comp
+            _make_properties(self.config.parameters, add)
 
     def get_material_flow_terms(self, p, j):
         if p == "Mix":
@@ -634,3 +561,227 @@ class Iapws95StateBlockData(StateBlockData):
 
     def model_check(self):
         pass
+
+
+def _make_properties(params, add):
+    """
+    Create the property expressions of a state block. Rules are called with
+    the state block element, so the same expressions can be built on each
+    element or as indexed components for the whole state block.
+
+    Args:
+        params: the parameter block of the state block
+        add: function add(name, *sets, **kwargs) which creates an Expression
+            and returns it
+
+    Returns:
+        None
+    """
+    component_list = params.component_list
+    Tc = params.temperature_crit # critical temperature
+    rhoc = params.dens_mass_crit
+    phlist = params.private_phase_list
+
+    # Conveneint shorter names and expressions
+    def P(b):
+        return b.pressure/1000.0 # Pressure expr [kPA] (for external func)
+
+    def h_mass(b):
+        return b.enth_mass/1000 #enthalpy expr [kJ/kg] (for external func)
+
+    # molecular weight
+    mw = add("mw", rule=lambda b: params.mw,
+        doc="molecular weight [kg/mol]")
+    mw.latex_symbol = "M"
+
+    add("flow_mass", rule=lambda b: b.mw*b.flow_mol,
+        doc="mass flow rate [kg/s]")
+
+    add("enth_mass", rule=lambda b: b.enth_mol/b.mw,
+        doc="Mass enthalpy (J/kg)")
+
+    # Temperature expression, external function takes
+    T = add("temperature", rule=lambda b: Tc/b.func_tau(h_mass(b), P(b)),
+        doc="Temperature (K)")
+    T.latex_symbol = "T"
+
+    vf = add("vapor_frac", rule=lambda b: b.func_vf(h_mass(b), P(b)),
+        doc="Vapor mole fraction (mol vapor/mol total)")
+    vf.latex_symbol = "y"
+
+    # Saturation temperature expression
+    Tsat = add("temperature_sat", rule=lambda b: Tc/b.func_tau_sat(P(b)),
+        doc="Stauration temperature (K)")
+    Tsat.latex_symbol = "T_\{sat\}"
+
+    # Saturation tau (tau = Tc/T)
+    add("tau_sat", rule=lambda b: b.func_tau_sat(P(b)))
+
+    # Reduced temperature
+    Tr = add("temperature_red", rule=lambda b: b.temperature/Tc,
+        doc="reduced temperature T/Tc (unitless)")
+    Tr.latex_symbol = "T_r"
+
+    tau = add("tau", rule=lambda b: Tc/b.temperature, doc="Tc/T (unitless)")
+    tau.latex_symbol = "\\tau"
+
+    # Saturation pressure
+    Psat = add("pressure_sat", rule=lambda b: 1000*b.func_p_sat(b.tau),
+        doc="Saturation pressure (Pa)")
+    Psat.latex_symbol = "P_\{sat\}"
+
+    # Calculate liquid and vapor density.  If the phase doesn't exist,
+    # density will be calculated at the saturation or critical pressure
+    if params.config.use_table:
+        def rule_dens_mass(b, i):
+            if i=="Liq":
+                return rhoc*b.func_delta_liq_tab(h_mass(b), P(b))
+            else:
+                return rhoc*b.func_delta_vap_tab(h_mass(b), P(b))
+    else:
+        def rule_dens_mass(b, i):
+            if i=="Liq":
+                return rhoc*b.func_delta_liq(P(b), b.tau)
+            else:
+                return rhoc*b.func_delta_vap(P(b), b.tau)
+    rho = add("dens_mass_phase", phlist, rule=rule_dens_mass,
+        doc="Mass density by phase (kg/m3)")
+    rho.latex_symbol = "\\rho"
+
+    # Reduced Density (no _mass_ identifier because mass or mol is same)
+    def rule_dens_red(b, p):
+        return b.dens_mass_phase[p]/rhoc
+    delta = add("dens_phase_red", phlist, rule=rule_dens_red,
+        doc="reduced density (unitless)")
+    delta.latex_symbol = "\\delta"
+
+    # Phase property expressions all converted to SI
+
+    # Saturated Enthalpy
+    def rule_enth_mol_sat_phase(b, p):
+        if p == "Liq":
+            return 1000*b.mw*b.func_hlpt(P(b), b.tau_sat)
+        elif p == "Vap":
+            return 1000*b.mw*b.func_hvpt(P(b), b.tau_sat)
+    add("enth_mol_sat_phase", phlist,
+        rule=rule_enth_mol_sat_phase,
+        doc="Saturated enthalpy of the phases at pressure (J/mol)")
+
+    def rule_dh_vap_mol(b):
+        return b.enth_mol_sat_phase["Vap"] - b.enth_mol_sat_phase["Liq"]
+    add("dh_vap_mol", rule=rule_dh_vap_mol,
+        doc="Enthaply of vaporization at pressure and saturation (J/mol)")
+
+    # Phase Enthalpy
+    def rule_enth_mol_phase(b, p):
+        return 1000*b.mw*b.func_h(b.dens_phase_red[p], b.tau)
+    add("enth_mol_phase", phlist,
+        rule=rule_enth_mol_phase,
+        doc="Phase enthalpy or saturated if phase doesn't exist [J/mol]")
+
+    # Phase Entropy
+    def rule_entr_mol_phase(b, p):
+        return 1000*b.mw*b.func_s(b.dens_phase_red[p], b.tau)
+    add("entr_mol_phase", phlist,
+        rule=rule_entr_mol_phase,
+        doc="Phase entropy or saturated if phase doesn't exist [J/mol/K]")
+
+    # Phase constant pressure heat capacity, cp
+    def rule_cp_mol_phase(b, p):
+        return 1000*b.mw*b.func_cp(b.dens_phase_red[p], b.tau)
+    add("cp_mol_phase", phlist,
+        rule=rule_cp_mol_phase,
+        doc="Phase cp or saturated if phase doesn't exist [J/mol/K]")
+
+    # Phase constant pressure heat capacity, cv
+    def rule_cv_mol_phase(b, p):
+        return 1000*b.mw*b.func_cv(b.dens_phase_red[p], b.tau)
+    add("cv_mol_phase", phlist,
+        rule=rule_cv_mol_phase,
+        doc="Phase cv or saturated if phase doesn't exist [J/mol/K]")
+
+    # Phase speed of sound
+    def rule_speed_sound_phase(b, p):
+        return b.func_w(b.dens_phase_red[p], b.tau)
+    add("speed_sound_phase", phlist,
+        rule=rule_speed_sound_phase,
+        doc="Phase speed of sound or saturated if phase doesn't exist [m/s]")
+
+    # Phase Mole density
+    def rule_dens_mol_phase(b, p):
+        return b.dens_mass_phase[p]/b.mw
+    add("dens_mol_phase", phlist,
+        rule=rule_dens_mol_phase,
+        doc="Phase mole density or saturated if phase doesn't exist [mol/m3]")
+
+    # Phase Thermal conductiviy
+    def rule_tc(b, p):
+        L0 = params.tc_L0
+        L1 = params.tc_L1
+        tau = b.tau
+        delta = b.dens_phase_red
+        return 1e-3*sqrt(1.0/tau)/sum(L0[i]*tau**i for i in L0)*\
+            exp(delta[p]*sum((tau - 1)**i*sum(L1[i,j]*(delta[p] - 1)**j\
+                for j in range(0,6)) for i in range(0,5)))
+    add("therm_cond_phase", phlist, rule=rule_tc,
+        doc="Thermal conductivity [W/K/m]")
+
+    # Phase dynamic viscosity
+    def rule_mu(b, p):
+        H0 = params.visc_H0
+        H1 = params.visc_H1
+        tau = b.tau
+        delta = b.dens_phase_red
+        return 1e-4*sqrt(1.0/tau)/sum(H0[i]*tau**i for i in H0)*\
+            exp(delta[p]*sum((tau - 1)**i*sum(H1[i,j]*(delta[p] - 1)**j\
+                for j in range(0,7)) for i in range(0,6)))
+    add("visc_d_phase", phlist, rule=rule_mu,
+        doc="Viscosity (dynamic) [Pa*s]")
+
+    # Phase kinimatic viscosity
+    def rule_nu(b, p):
+        return b.visc_d_phase[p]/b.dens_mass_phase[p]
+    add("visc_k_phase", phlist, rule=rule_nu,
+        doc="Kinematic viscosity [m^2/s]")
+
+    #Phase fraction
+    def rule_phase_frac(b, p):
+        if p == "Vap":
+            return b.vapor_frac
+        elif p == "Liq":
+            return 1.0 - b.vapor_frac
+    add("phase_frac", phlist,
+        rule=rule_phase_frac, doc="Phase fraction [unitless]")
+
+    # Component flow (for units that need it)
+    def component_flow(b, i):
+        return b.flow_mol
+    add("flow_mol_comp", component_list,
+        rule=component_flow,
+        doc="Total flow (both phases) of component [mol/s]")
+
+    # Total (mixed phase) properties
+
+    #Entropy
+    s = add("entr_mol", rule=lambda b:
+        sum(b.phase_frac[p]*b.entr_mol_phase[p] for p in phlist))
+    s.latex_symbol = "s"
+    #cp
+    cp = add("cp_mol", rule=lambda b:
+        sum(b.phase_frac[p]*b.cp_mol_phase[p] for p in phlist))
+    cp.latex_symbol = "c_p"
+    #cv
+    cv = add("cv_mol", rule=lambda b:
+        sum(b.phase_frac[p]*b.cv_mol_phase[p] for p in phlist))
+    cv.latex_symbol = "c_v"
+    #mass density
+    add("dens_mass", rule=lambda b:
+        1.0/sum(b.phase_frac[p]*1.0/b.dens_mass_phase[p] for p in phlist))
+    #mole density
+    add("dens_mol", rule=lambda b:
+        1.0/sum(b.phase_frac[p]*1.0/b.dens_mol_phase[p] for p in phlist))
+    #heat capacity ratio
+    add("heat_capacity_ratio", rule=lambda b: b.cp_mol/b.cv_mol)
+    #Flows
+    add("flow_vol", rule=lambda b: b.flow_mol/b.dens_mol,
+        doc="Total liquid + vapor volumetric flow (m3/s)")
@@ -0,0 +1,75 @@
+##############################################################################
+# Institute for the Design of Advanced Energy Systems Process Systems
+# Engineering Framework (IDAES PSE Framework) Copyright (c) 2018-2019, by the
+# software owners: The Regents of the University of California, through
+# Lawrence Berkeley National Laboratory,  National Technology & Engineering
+# Solutions of Sandia, LLC, Carnegie Mellon University, West Virginia
+# University Research Corporation, et al. All rights reserved.
+#
+# Please see the files COPYRIGHT.txt and LICENSE.txt for full copyright and
+# license information, respectively. Both files are also available online
+# at the URL "https://github.com/IDAES/idaes-pse".
+##############################################################################
+"""
+Time building an indexed IAPWS95 state block and writing it to an NL file,
+and report the size of the NL file. Each element gets a constraint using
+temperature, entropy and density, so the external functions are written to
+the NL file. The IAPWS95 library doesn't need to be compiled for this. This
+is a script, not a test; run it with
+
+    python iapws95_benchmark.py [number of elements]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import tempfile
+import time
+
+from pyomo.environ import ConcreteModel, Constraint, ExternalFunction, \
+    Objective, Set
+
+from idaes.property_models import iapws95_ph as iapws95
+
+
+def build(n):
+    """Build an indexed IAPWS95 state block with n elements."""
+    m = ConcreteModel()
+    m.prop_param = iapws95.Iapws95ParameterBlock()
+    m.s = Set(initialize=range(n))
+    m.prop = iapws95.Iapws95StateBlock(m.s,
+        default={"parameters": m.prop_param})
+
+    def rule(m, i):
+        b = m.prop[i]
+        return b.temperature*b.entr_mol == 1e3*b.dens_mol
+    m.c = Constraint(m.s, rule=rule)
+    for i in m.s:
+        m.prop[i].flow_mol.fix(1)
+        m.prop[i].pressure.fix(1e5 + 100*i)
+    m.obj = Objective(expr=sum(m.prop[i].enth_mol for i in m.s))
+    return m
+
+
+def main(n=1000):
+    t0 = time.time()
+    m = build(n)
+    t_build = time.time() - t0
+    fd, fname = tempfile.mkstemp(suffix=".nl")
+    os.close(fd)
+    try:
+        t0 = time.time()
+        m.write(fname, format="nl")
+        t_write = time.time() - t0
+        size = os.path.getsize(fname)
+    finally:
+        os.remove(fname)
+    n_func = len(list(m.component_objects(ExternalFunction,
+                                          descend_into=True)))
+    print("{} elements, build: {:.2f} s, write NL: {:.2f} s, "
+          "NL file: {:.2f} MB, {} external function components".format(
+              n, t_build, t_write, size/2.0**20, n_func))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
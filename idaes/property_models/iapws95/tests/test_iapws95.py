@@ -15,6 +15,7 @@ from __future__ import division, print_function, absolute_import
 import pytest
 from pyomo.environ import *
 from pyomo.opt import SolverFactory
+from pyomo.core.expr.current import identify_variables
 from idaes.property_models import iapws95_ph as iapws95
 from idaes.property_models.iapws95 import iapws95_available
 import csv
@@ -340,3 +341,169 @@ def test_cv():
         else:
             tol = 0.003
         assert(abs(cv-c[2])/c[2] < tol)
+
+def test_external_functions_shared():
+    # External functions are declared once on the parameter block
+    model = ConcreteModel()
+    model.prop_param = iapws95.Iapws95ParameterBlock()
+    model.prop_in = iapws95.Iapws95StateBlock([1, 2, 3],
+        default={"parameters":model.prop_param})
+    for i in model.prop_in:
+        assert model.prop_in[i].func_p is model.prop_param.func_p
+        assert model.prop_in[i].func_tau is model.prop_param.func_tau
+    n = len(list(model.component_objects(ExternalFunction,
+                                         descend_into=True)))
+    assert n == len(list(model.prop_param.component_objects(
+        ExternalFunction)))
+    assert "func_delta_liq_tab" not in model.prop_in[1].__dict__
+
+    # Table functions are referenced only when the table is used
+    model.tab_param = iapws95.Iapws95ParameterBlock(
+        default={"use_table":True})
+    model.tab = iapws95.Iapws95StateBlock([1, 2],
+        default={"parameters":model.tab_param})
+    for i in model.tab:
+        assert (model.tab[i].func_delta_liq_tab is
+                model.tab_param.func_delta_liq_tab)
+        assert (model.tab[i].func_delta_vap_tab is
+                model.tab_param.func_delta_vap_tab)
+
+def test_indexed_properties():
+    # Property expressions are shared by all elements of the state block,
+    # and are the same as the expressions built on each element
+    model = ConcreteModel()
+    model.prop_param = iapws95.Iapws95ParameterBlock()
+    model.prop_in = iapws95.Iapws95StateBlock([1, 2, 3],
+        default={"parameters":model.prop_param})
+    model.ip_param = iapws95.Iapws95ParameterBlock(
+        default={"indexed_properties":True})
+    model.ip = iapws95.Iapws95StateBlock([1, 2, 3],
+        default={"parameters":model.ip_param})
+    assert model.ip[2].temperature is model.ip_indexed.temperature[2]
+    assert (model.ip[2].enth_mol_phase["Liq"] is
+            model.ip_indexed.enth_mol_phase[2, "Liq"])
+    assert model.ip[2].func_tau is model.ip_param.func_tau
+    assert len(list(model.ip[2].component_objects(Expression))) == 0
+    n = len(list(model.prop_in[2].component_objects(Expression)))
+    assert len(list(model.ip_indexed.component_objects(Expression))) == n
+    for name in ("temperature", "vapor_frac", "entr_mol", "dens_mol"):
+        e1 = getattr(model.prop_in[2], name)
+        e2 = getattr(model.ip[2], name)
+        assert e1.polynomial_degree() == e2.polynomial_degree()
+        assert (set(v.name for v in identify_variables(e1)) ==
+                set(v.name.replace("ip[", "prop_in[")
+                    for v in identify_variables(e2)))
+
+
+@pytest.mark.skipif(not prop_available, reason="IAPWS not available")
+@pytest.mark.nocircleci()
+def test_memo_stats():
+    model = ConcreteModel()
+    model.prop_param = iapws95.Iapws95ParameterBlock()
+    model.prop_in = iapws95.Iapws95StateBlock(default={"parameters":model.prop_param})
+    tau_sat = model.prop_in.func_tau_sat
+    model.prop_param.set_memo_capacity(1000)
+    s0 = model.prop_param.memo_stats()["tau_sat"]
+    value(tau_sat(1234.5))
+    value(tau_sat(1234.5))
+    s1 = model.prop_param.memo_stats()["tau_sat"]
+    assert s1["misses"] >= s0["misses"] + 1
+    assert s1["hits"] >= s0["hits"] + 1
+    assert 0 <= s1["hit_rate"] <= 1
+    assert value(model.prop_param.func_memo_stats(1, 4, 3)) == 1000
+
+@pytest.mark.skipif(not prop_available, reason="IAPWS not available")
+@pytest.mark.nocircleci()
+def test_threads():
+    # Evaluate p, h and s from many threads, and check against single
+    # threaded results (ctypes releases the GIL while the library runs)
+    from concurrent.futures import ThreadPoolExecutor
+    model = ConcreteModel()
+    model.prop_param = iapws95.Iapws95ParameterBlock()
+    model.prop_in = iapws95.Iapws95StateBlock(default={"parameters":model.prop_param})
+    prop = model.prop_in
+    points = [(tau, p) for tau in [0.8, 1.0, 1.2, 1.5, 2.0]
+              for p in [10.0, 100.0, 1000.0, 10000.0]]
+
+    def evaluate(point):
+        tau, p = point
+        delta = value(prop.func_delta_liq(p, tau))
+        return (value(prop.func_p(delta, tau)),
+                value(prop.func_h(delta, tau)),
+                value(prop.func_s(delta, tau)))
+
+    expected = [evaluate(pt) for pt in points]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for rep in range(10):
+            results = list(pool.map(evaluate, points))
+            assert results == expected
+
+@pytest.mark.skipif(not prop_available, reason="IAPWS not available")
+@pytest.mark.nocircleci()
+def test_evaluate():
+    # Compare array evaluation with the external functions
+    import numpy as np
+    model = ConcreteModel()
+    model.prop_param = iapws95.Iapws95ParameterBlock()
+    model.prop_in = iapws95.Iapws95StateBlock(default={"parameters":model.prop_param})
+    prop = model.prop_in
+    mw = value(prop.mw)
+    T = np.array([300.0, 400.0, 500.0, 700.0, 900.0])
+    P = np.array([1e5, 1e6, 1e6, 3e7, 1e5])
+    res = iapws95.evaluate(["h", "s", "cp", "vapor_frac"], T=T, P=P)
+    for i in range(len(T)):
+        tau = 647.096/T[i]
+        if res["vapor_frac"][i] == 0:
+            delta = value(prop.func_delta_liq(P[i]/1000, tau))
+        else:
+            delta = value(prop.func_delta_vap(P[i]/1000, tau))
+        assert res["h"][i] == pytest.approx(
+            value(prop.func_h(delta, tau))*mw*1000, rel=1e-9)
+        assert res["s"][i] == pytest.approx(
+            value(prop.func_s(delta, tau))*mw*1000, rel=1e-9)
+        assert res["cp"][i] == pytest.approx(
+            value(prop.func_cp(delta, tau))*mw*1000, rel=1e-9)
+        assert iapws95.htpx(T[i], P[i]) == pytest.approx(res["h"][i])
+    assert list(res["vapor_frac"]) == [0, 0, 1, 0, 1]
+
+    # Saturated states, and h and P round trip
+    res = iapws95.evaluate(["h", "temperature", "pressure"],
+                           P=101325, x=[0, 0.5, 1])
+    assert res["temperature"] == pytest.approx(373.124, abs=0.01)
+    assert res["h"][1] == pytest.approx((res["h"][0] + res["h"][2])/2)
+    assert iapws95.htpx(res["temperature"][1], x=0.5) == \
+        pytest.approx(res["h"][1], rel=1e-6)
+    res2 = iapws95.evaluate(["vapor_frac", "temperature"],
+                            h=res["h"], P=res["pressure"])
+    assert res2["vapor_frac"] == pytest.approx([0, 0.5, 1], abs=1e-6)
+
+    with pytest.raises(ValueError):
+        iapws95.evaluate(["h"], T=T)
+    with pytest.raises(ValueError):
+        iapws95.evaluate(["not_a_property"], T=T, P=P)
+
+@pytest.mark.skipif(not prop_available or
+                    not os.path.isfile(iapws95.table_path()),
+                    reason="IAPWS or property table not available")
+@pytest.mark.nocircleci()
+def test_table():
+    # Compare the table functions to the exact functions
+    model = ConcreteModel()
+    model.prop_param = iapws95.Iapws95ParameterBlock(
+        default={"use_table":True})
+    model.prop_in = iapws95.Iapws95StateBlock(default={"parameters":model.prop_param})
+    model.exact_param = iapws95.Iapws95ParameterBlock()
+    model.exact = iapws95.Iapws95StateBlock(default={"parameters":model.exact_param})
+    prop = model.prop_in
+    for h, p in [(100, 200), (500, 20000), (1500, 1000), (2900, 500),
+                 (3200, 30000), (3400, 100)]:
+        for b in (prop, model.exact):
+            b.enth_mol.fix(h*value(b.mw)*1000)
+            b.pressure.fix(p*1000)
+        assert value(prop.temperature) == pytest.approx(
+            value(model.exact.temperature), rel=1e-5)
+        assert value(prop.vapor_frac) == pytest.approx(
+            value(model.exact.vapor_frac), abs=1e-5)
+        for ph in ("Liq", "Vap"):
+            assert value(prop.dens_mass_phase[ph]) == pytest.approx(
+                value(model.exact.dens_mass_phase[ph]), rel=1e-5)
@@ -23,6 +23,8 @@ from __future__ import division
 # Import Python libraries
 import logging
 
+import numpy as np
+
 # Import Pyomo libraries
 from pyomo.environ import Constraint, Expression, log, NonNegativeReals,\
     value, Var, exp, Set, Param, sqrt
@@ -39,6 +41,7 @@ from idaes.core import (declare_process_block_class,
 from idaes.core.util.initialization import solve_indexed_blocks
 from idaes.core.util.misc import add_object_reference
 from idaes.core.util.exceptions import BurntToast, ConfigurationError
+from idaes.core.util.residuals import max_residual
 from idaes.ui.report import degrees_of_freedom
 
 # Some more inforation about this module
@@ -72,6 +75,20 @@ conditions, and thus corresponding constraints  should be included,
 **('Vap', 'Liq')** - Vapor-liquid equilibrium,
 **('Liq', 'Vap')** - Vapor-liquid equilibrium,}"""))
 
+    CONFIG.declare("indexed_properties", ConfigValue(
+        default=False,
+        domain=In([True, False]),
+        description="Flag indicating whether to use indexed properties",
+        doc="""Flag indicating whether the molar enthalpies of indexed state
+blocks should be built as indexed components shared by all elements of the
+state block, rather than as separate components on each element. Other
+properties are built on each element when used,
+**default** - False.
+**Valid values:** {
+**True** - build molar enthalpies as indexed components
+(reduces the number of components in large models, e.g. 1D models),
+**False** - build properties on each element.}"""))
+
     def build(self):
         '''
         Callable method for Block construction.
@@ -134,16 +151,161 @@ conditions, and thus corresponding constraints  should be included,
                                'holdup': 'mol'})
 
 
+def _pressure_sat_np(temperature, temperature_crit, pressure_crit, coeff):
+    """
+    Vectorized version of the vapor pressure correlation used in the state
+    block constraints.
+
+    Args:
+        temperature: array of temperatures, shape (n, 1)
+        temperature_crit: array of critical temperatures, shape (c,)
+        pressure_crit: array of critical pressures, shape (c,)
+        coeff: array of correlation coefficients A, B, C, D, shape (4, c)
+
+    Returns:
+        array of vapor pressures, shape (n, c), NaN above critical temperature
+    """
+    tau = 1 - temperature/temperature_crit
+    with np.errstate(invalid='ignore', over='ignore', divide='ignore'):
+        return pressure_crit*np.exp(
+            (coeff[0]*tau + coeff[1]*tau**1.5 + coeff[2]*tau**3 +
+             coeff[3]*tau**6)/(1 - tau))
+
+
+def _bisect_np(f, lo, hi, n_iter=100):
+    """
+    Vectorized bisection for an increasing function f.
+
+    Args:
+        f: function taking an array of x and returning an array of f(x)
+        lo: array of lower bounds
+        hi: array of upper bounds
+        n_iter: number of bisection iterations
+
+    Returns:
+        array of roots, NaN where the root is not bracketed
+    """
+    lo = np.array(lo, dtype=float)
+    hi = np.array(hi, dtype=float)
+    with np.errstate(invalid='ignore'):
+        ok = (f(lo) <= 0) & (f(hi) >= 0)
+    for i in range(n_iter):
+        mid = 0.5*(lo + hi)
+        with np.errstate(invalid='ignore'):
+            up = f(mid) > 0
+        hi = np.where(up, mid, hi)
+        lo = np.where(up, lo, mid)
+    return np.where(ok, 0.5*(lo + hi), np.nan)
+
+
 class _IdealStateBlock(StateBlock):
     """
     This Class contains methods which should be applied to Property Blocks as a
     whole, rather than individual elements of indexed Property Blocks.
     """
 
+    def _vectorized_initialize(blk):
+        """
+        Calculate initial values for the bubble and dew points, equilibrium
+        temperature, vapor pressures, and phase split (Rachford-Rice flash) of
+        all the elements with phase equilibrium at once with NumPy, using the
+        current values of the state variables.
+
+        Returns:
+            set of element keys that were initialized. Elements where a bubble
+            or dew point couldn't be bracketed are left out, so they can be
+            initialized one at a time.
+        """
+        # Note: component() is used to check for optional constraints, since
+        # hasattr() on a missing attribute goes through StateBlockData
+        # __getattr__, which is slow
+        keys = [k for k in blk.keys() if blk[k].config.has_phase_equilibrium]
+        if not keys:
+            return set()
+        params = blk[keys[0]]._params
+        comps = list(params.component_list)
+        t_crit = np.array([value(params.temperature_crit[j]) for j in comps])
+        p_crit = np.array([value(params.pressure_crit[j]) for j in comps])
+        coeff = np.array([[value(params.pressure_sat_coeff[j, c])
+                           for j in comps] for c in ('A', 'B', 'C', 'D')])
+
+        def psat(t):
+            return _pressure_sat_np(t, t_crit, p_crit, coeff)
+
+        b0 = [blk[k] for k in keys]
+        temp = np.array([b.temperature.value for b in b0], dtype=float)
+        pres = np.array([b.pressure.value for b in b0], dtype=float)
+        flow = np.array([b.flow_mol.value for b in b0], dtype=float)
+        z = np.array([[b.mole_frac[j].value for j in comps] for b in b0],
+                     dtype=float)
+        eps_1 = np.array([value(b.eps_1) for b in b0])
+        eps_2 = np.array([value(b.eps_2) for b in b0])
+
+        # Bubble and dew temperatures, vapor pressures only defined below the
+        # lowest critical temperature
+        lo = np.full(len(keys), 0.2*t_crit.min())
+        hi = np.full(len(keys), t_crit.min()*(1 - 1e-10))
+        t_bub = _bisect_np(
+            lambda t: np.log(np.sum(z*psat(t[:, None]), axis=1)/pres),
+            lo, hi)
+        t_dew = _bisect_np(
+            lambda t: -np.log(pres*np.sum(z/psat(t[:, None]), axis=1)),
+            lo, hi)
+
+        # Bubble and dew pressures at the current temperatures
+        p_sat_temp = psat(temp[:, None])
+        p_bub = np.sum(z*p_sat_temp, axis=1)
+        with np.errstate(divide='ignore'):
+            p_dew = 1/np.sum(z/p_sat_temp, axis=1)
+
+        # Smooth equilibrium temperature (PSE paper Eqns 13 and 14)
+        t_1 = 0.5*(temp + t_bub + np.sqrt((temp - t_bub)**2 + eps_1**2))
+        t_eq = 0.5*(t_1 + t_dew - np.sqrt((t_1 - t_dew)**2 + eps_2**2))
+        p_sat = psat(t_eq[:, None])
+
+        # Rachford-Rice flash at the equilibrium temperature
+        k_val = p_sat/pres[:, None]
+
+        def rr(v):
+            return -np.sum(z*(k_val - 1)/(1 + v[:, None]*(k_val - 1)), axis=1)
+        with np.errstate(invalid='ignore'):
+            v_frac = np.where(rr(np.zeros(len(keys))) >= 0, 0.0,
+                              np.where(rr(np.ones(len(keys))) <= 0, 1.0,
+                                       _bisect_np(rr, np.zeros(len(keys)),
+                                                  np.ones(len(keys)))))
+        x = z/(1 + v_frac[:, None]*(k_val - 1))
+        y = np.clip(k_val*x, 0, 1)
+        x = np.clip(x, 0, 1)
+
+        done = set()
+        ok = np.isfinite(t_bub) & np.isfinite(t_dew) & np.isfinite(v_frac)
+        for i, k in enumerate(keys):
+            if not ok[i]:
+                continue
+            b = blk[k]
+            b.temperature_bubble.value = t_bub[i]
+            b.temperature_dew.value = t_dew[i]
+            if b.component("eq_pressure_bubble") is not None:
+                b.pressure_bubble.value = p_bub[i]
+            if b.component("eq_pressure_dew") is not None:
+                b.pressure_dew.value = p_dew[i]
+            b._t1.value = t_1[i]
+            b._teq.value = t_eq[i]
+            b.flow_mol_phase['Vap'].value = v_frac[i]*flow[i]
+            b.flow_mol_phase['Liq'].value = (1 - v_frac[i])*flow[i]
+            for n, j in enumerate(comps):
+                b.mole_frac_phase['Liq', j].value = x[i, n]
+                b.mole_frac_phase['Vap', j].value = y[i, n]
+                if b.component("eq_pressure_sat") is not None:
+                    b.pressure_sat[j].value = p_sat[i, n]
+            done.add(k)
+        return done
+
     def initialize(blk, flow_mol=None, mole_frac=None,
                    temperature=None, pressure=None, state_vars_fixed=False,
                    hold_state=False, outlvl=1,
-                   solver='ipopt', optarg={'tol': 1e-8}):
+                   solver='ipopt', optarg={'tol': 1e-8},
+                   vectorized_init=True, skip_solve_tol=None):
         """
         Initialisation routine for property package.
         Keyword Arguments:
@@ -168,6 +330,14 @@ class _IdealStateBlock(StateBlock):
                                        block will deal with fixing/unfixing.
             solver : str indicating whcih solver to use during
                      initialization (default = 'ipopt')
+            vectorized_init : if True, calculate initial values for the
+                     bubble and dew points, vapor pressures and phase split
+                     of all elements at once with NumPy before the solve,
+                     otherwise initialize the bubble and dew points one
+                     element at a time (default=True)
+            skip_solve_tol : if not None, skip the phase equilibrium solve
+                     when the largest constraint residual after the
+                     pre-calculation is less than this value (default=None)
             hold_state : flag indicating whether the initialization routine
                          should unfix any state variables fixed during
                          initialization (default=False).
@@ -265,9 +435,19 @@ class _IdealStateBlock(StateBlock):
         opt = SolverFactory('ipopt')
         opt.options = sopt
 
+        # ---------------------------------------------------------------------
+        # Vectorized calculation of bubble and dew points, vapor pressures and
+        # phase split, elements it can't do are done one at a time below
+        if vectorized_init:
+            vec_done = blk._vectorized_initialize()
+        else:
+            vec_done = set()
+
         # ---------------------------------------------------------------------
         # If present, initialize bubble and dew point calculations
         for k in blk.keys():
+            if k in vec_done:
+                continue
             if hasattr(blk[k], "eq_temperature_bubble"):
                 calculate_variable_from_constraint(
                         blk[k].temperature_bubble,
@@ -292,6 +472,8 @@ class _IdealStateBlock(StateBlock):
         # ---------------------------------------------------------------------
         # If flash, initialize T1 and Teq
         for k in blk.keys():
+            if k in vec_done:
+                continue
             if blk[k].config.has_phase_equilibrium:
                 blk[k]._t1.value = max(blk[k].temperature.value,
                                        blk[k].temperature_bubble.value)
@@ -307,6 +489,8 @@ class _IdealStateBlock(StateBlock):
         # TODO : This will need ot be generalised more when we move to a
         # modular implementation
         for k in blk.keys():
+            if k in vec_done:
+                continue
             if blk[k]._params.config.valid_phase == "Liq":
                 blk[k].flow_mol_phase['Liq'].value = \
                     blk[k].flow_mol.value
@@ -353,16 +537,25 @@ class _IdealStateBlock(StateBlock):
                                         "eq_pressure_sat"):
                     c.deactivate()
 
-        results = solve_indexed_blocks(opt, [blk], tee=stee)
+        if skip_solve_tol is not None and \
+                max_residual(blk) < skip_solve_tol:
+            # Pre-calculated values already satisfy the constraints
+            solved = True
+            if outlvl > 0:
+                _log.info("Phase state initialization for {} skipped solve, "
+                          "residuals below tolerance".format(blk.name))
+        else:
+            results = solve_indexed_blocks(opt, [blk], tee=stee)
+            solved = (results.solver.termination_condition ==
+                      TerminationCondition.optimal)
 
-        if outlvl > 0:
-            if results.solver.termination_condition \
-                    == TerminationCondition.optimal:
-                _log.info("Phase state initialization for "
-                          "{} completed".format(blk.name))
-            else:
-                _log.warning("Phase state initialization for "
-                             "{} failed".format(blk.name))
+            if outlvl > 0:
+                if solved:
+                    _log.info("Phase state initialization for "
+                              "{} completed".format(blk.name))
+                else:
+                    _log.warning("Phase state initialization for "
+                                 "{} failed".format(blk.name))
 
         # ---------------------------------------------------------------------
         # Initialize other properties
@@ -373,8 +566,7 @@ class _IdealStateBlock(StateBlock):
                     c.activate()
 
         if outlvl > 0:
-            if results.solver.termination_condition \
-                    == TerminationCondition.optimal:
+            if solved:
                 _log.info("Property initialization for "
                           "{} completed".format(blk.name))
             else:
@@ -425,6 +617,28 @@ class _IdealStateBlock(StateBlock):
             if outlvl > 0:
                 _log.info('{} states released.'.format(blk.name))
 
+    def build_indexed_properties(blk, params):
+        """
+        Create molar enthalpies as indexed components. These are used by the
+        control volume energy balances; other properties are built on each
+        element when used.
+        """
+        blk.add_indexed_property("enth_mol_phase_comp", Var,
+                                 params.phase_list, params.component_list,
+                                 doc="Phase-component molar specific "
+                                     "enthalpies [J/mol]")
+        blk.add_indexed_property("eq_enth_mol_phase_comp", Constraint,
+                                 params.phase_list, params.component_list,
+                                 rule=_rule_enth_mol_phase_comp)
+
+        blk.add_indexed_property("enth_mol_phase", Var, params.phase_list,
+                                 doc="Phase molar specific enthalpies "
+                                     "[J/mol]")
+        blk.add_indexed_property("eq_enth_mol_phase", Constraint,
+                                 params.phase_list,
+                                 rule=_rule_enth_mol_phase)
+
+
 @declare_process_block_class("IdealStateBlock",
                              block_class=_IdealStateBlock)
 class IdealStateBlockData(StateBlockData):
@@ -607,29 +821,17 @@ class IdealStateBlockData(StateBlockData):
                                        self._params.component_list,
                                        doc="Phase-component molar specific "
                                            "enthalpies [J/mol]")
-
-        def rule_enth_mol_phase_comp(b, p, j):
-            if p == 'Vap':
-                return b._enth_mol_comp_vap(j)
-            else:
-                return b._enth_mol_comp_liq(j)
         self.eq_enth_mol_phase_comp = Constraint(
             self._params.phase_list,
             self._params.component_list,
-            rule=rule_enth_mol_phase_comp)
+            rule=_rule_enth_mol_phase_comp)
 
     def _enth_mol_phase(self):
         self.enth_mol_phase = Var(
             self._params.phase_list,
             doc='Phase molar specific enthalpies [J/mol]')
-
-        def rule_enth_mol_phase(b, p):
-            return b.enth_mol_phase[p] == sum(
-                b.enth_mol_phase_comp[p, i] *
-                b.mole_frac_phase[p, i]
-                for i in b._params.component_list)
         self.eq_enth_mol_phase = Constraint(self._params.phase_list,
-                                            rule=rule_enth_mol_phase)
+                                            rule=_rule_enth_mol_phase)
 
     def _entr_mol_phase_comp(self):
         self.entr_mol_phase_comp = Var(
@@ -1069,3 +1271,19 @@ class IdealStateBlockData(StateBlockData):
                            log(b.temperature / b._params.temperature_ref)) -
             b._params.gas_const * log(b.mole_frac_phase['Vap', j] * b.pressure /
                                       b._params.pressure_ref))
+
+
+# Property rules, shared by the elements of state blocks and by the indexed
+# properties of state blocks in indexed property mode
+def _rule_enth_mol_phase_comp(b, p, j):
+    if p == 'Vap':
+        return b._enth_mol_comp_vap(j)
+    else:
+        return b._enth_mol_comp_liq(j)
+
+
+def _rule_enth_mol_phase(b, p):
+    return b.enth_mol_phase[p] == sum(
+        b.enth_mol_phase_comp[p, i] *
+        b.mole_frac_phase[p, i]
+        for i in b._params.component_list)
@@ -15,11 +15,12 @@ Tests for ideal state block; tests for construction and solves
 Author: Jaffer Ghouse
 """
 import pytest
-from pyomo.environ import ConcreteModel, SolverFactory, TerminationCondition, \
-    SolverStatus, value
+from pyomo.environ import ConcreteModel, Constraint, SolverFactory, \
+    TerminationCondition, SolverStatus, value
 
 from idaes.core import FlowsheetBlock
 from idaes.property_models.ideal.BTX_ideal_VLE import BTXParameterBlock
+from idaes.core.util.residuals import max_residual
 from idaes.ui.report import degrees_of_freedom
 
 # See if ipopt is available and set up solver
@@ -59,7 +60,7 @@ m.fs.state_block_v = m.fs.properties_v.state_block_class(
 
 
 def test_build_inlet_state_blocks():
-    assert len(m.fs.properties_vl.config) == 2
+    assert len(m.fs.properties_vl.config) == 3
 
     # vapor-liquid
     assert m.fs.properties_vl.config.valid_phase == ('Vap', 'Liq') or \
@@ -206,7 +207,7 @@ m.fs1.state_block_v = m.fs1.properties_v.state_block_class(
 
 
 def test_build_outlet_state_blocks():
-    assert len(m.fs1.properties_vl.config) == 2
+    assert len(m.fs1.properties_vl.config) == 3
 
     # vapor-liquid
     assert m.fs1.properties_vl.config.valid_phase == ('Vap', 'Liq') or \
@@ -258,3 +259,122 @@ def test_setInputs_outlet_state_blocks():
     m.fs1.state_block_v.mole_frac["benzene"].fix(0.5)
 
     assert degrees_of_freedom(m.fs.state_block_v) == 0
+
+
+def _indexed_vl_model():
+    m = ConcreteModel()
+    m.fs = FlowsheetBlock(default={"dynamic": False})
+    m.fs.properties = BTXParameterBlock(default={"valid_phase":
+                                                 ('Liq', 'Vap')})
+    m.fs.sb = m.fs.properties.state_block_class(
+        [1, 2, 3],
+        default={"parameters": m.fs.properties,
+                 "defined_state": True})
+    # two-phase, subcooled and superheated
+    for k, t in zip([1, 2, 3], [368, 340, 400]):
+        m.fs.sb[k].flow_mol.fix(1)
+        m.fs.sb[k].temperature.fix(t)
+        m.fs.sb[k].pressure.fix(101325)
+        m.fs.sb[k].mole_frac["benzene"].fix(0.5)
+        m.fs.sb[k].mole_frac["toluene"].fix(0.5)
+    return m
+
+
+def test_vectorized_initialize():
+    m = _indexed_vl_model()
+    assert m.fs.sb._vectorized_initialize() == set([1, 2, 3])
+
+    for k in [1, 2, 3]:
+        assert value(m.fs.sb[k].temperature_bubble) == \
+            pytest.approx(365.347, abs=1e-2)
+        assert value(m.fs.sb[k].temperature_dew) == \
+            pytest.approx(372.02, abs=1e-2)
+    assert value(m.fs.sb[1].mole_frac_phase['Liq', 'benzene']) == \
+        pytest.approx(0.4121, abs=1e-3)
+    assert value(m.fs.sb[1].mole_frac_phase['Vap', 'benzene']) == \
+        pytest.approx(0.6339, abs=1e-3)
+    assert value(m.fs.sb[2].flow_mol_phase['Vap']) == \
+        pytest.approx(0, abs=1e-4)
+    assert value(m.fs.sb[3].flow_mol_phase['Liq']) == \
+        pytest.approx(0, abs=1e-4)
+    # pre-calculated values satisfy the phase equilibrium constraints
+    assert max_residual(m.fs.sb) < 1e-6
+
+
+def test_initialize_skip_solve():
+    m = _indexed_vl_model()
+    m.fs.sb.initialize(skip_solve_tol=1e-6)
+    assert value(m.fs.sb[1].mole_frac_phase['Liq', 'benzene']) == \
+        pytest.approx(0.4121, abs=1e-3)
+    assert m.fs.sb[1].sum_mole_frac.active
+    assert m.fs.sb[1].flow_mol.fixed
+
+
+def _indexed_properties_model():
+    m = _indexed_vl_model()
+    m.fs.properties_ip = BTXParameterBlock(default={"valid_phase":
+                                                    ('Liq', 'Vap'),
+                                                    "indexed_properties":
+                                                    True})
+    m.fs.sb_ip = m.fs.properties_ip.state_block_class(
+        [1, 2, 3],
+        default={"parameters": m.fs.properties_ip,
+                 "defined_state": True})
+    for k in [1, 2, 3]:
+        m.fs.sb_ip[k].flow_mol.fix(value(m.fs.sb[k].flow_mol))
+        m.fs.sb_ip[k].temperature.fix(value(m.fs.sb[k].temperature))
+        m.fs.sb_ip[k].pressure.fix(value(m.fs.sb[k].pressure))
+        m.fs.sb_ip[k].mole_frac["benzene"].fix(0.5)
+        m.fs.sb_ip[k].mole_frac["toluene"].fix(0.5)
+        for sb in (m.fs.sb, m.fs.sb_ip):
+            sb[k].enth_mol_phase
+            sb[k].dens_mol_phase
+    return m
+
+
+def _count_constraints(blk):
+    return sum(len(list(b.component_data_objects(Constraint)))
+               for b in blk.values())
+
+
+def test_indexed_properties():
+    m = _indexed_properties_model()
+
+    # Enthalpies are shared by all elements, phase equilibrium and other
+    # properties are built on each element
+    assert (m.fs.sb_ip[2].enth_mol_phase['Liq'] is
+            m.fs.sb_ip_indexed.enth_mol_phase[2, 'Liq'])
+    assert (m.fs.sb_ip[2].enth_mol_phase_comp['Vap', 'benzene'] is
+            m.fs.sb_ip_indexed.enth_mol_phase_comp[2, 'Vap', 'benzene'])
+    assert "eq_dens_mol_phase" in \
+        m.fs.sb_ip[2].component_map(Constraint)
+    assert "eq_enth_mol_phase" not in \
+        m.fs.sb_ip[2].component_map(Constraint)
+    assert "equilibrium_constraint" in \
+        m.fs.sb_ip[2].component_map(Constraint)
+    assert (_count_constraints(m.fs.sb) ==
+            _count_constraints(m.fs.sb_ip) +
+            _count_constraints(m.fs.sb_ip_indexed))
+    assert degrees_of_freedom(m.fs) == 0
+
+    m.fs.sb_ip[2].entr_mol_phase
+    assert "eq_entr_mol_phase" in \
+        m.fs.sb_ip[2].component_map(Constraint)
+
+
+@pytest.mark.skipif(solver is None, reason="Solver not available")
+def test_indexed_properties_solve():
+    m = _indexed_properties_model()
+    m.fs.sb.initialize()
+    m.fs.sb_ip.initialize()
+    results = solver.solve(m, tee=False)
+
+    assert results.solver.termination_condition == TerminationCondition.optimal
+    assert results.solver.status == SolverStatus.ok
+
+    for k in [1, 2, 3]:
+        for p in ('Liq', 'Vap'):
+            assert value(m.fs.sb_ip[k].enth_mol_phase[p]) == \
+                pytest.approx(value(m.fs.sb[k].enth_mol_phase[p]), rel=1e-6)
+            assert value(m.fs.sb_ip[k].dens_mol_phase[p]) == \
+                pytest.approx(value(m.fs.sb[k].dens_mol_phase[p]), rel=1e-6)
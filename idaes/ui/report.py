@@ -10,25 +10,293 @@
 # license information, respectively. Both files are also available online
 # at the URL "https://github.com/IDAES/idaes-pse".
 ##############################################################################
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import (breadth_first_order,
+                                  maximum_bipartite_matching)
+
 from pyomo.environ import *
 from pyomo.core.expr.current import identify_variables
+from pyomo.core.expr.numvalue import native_numeric_types
+from pyomo.core.kernel.component_map import ComponentMap
 from pyomo.core.kernel.component_set import ComponentSet
 from pyomo.network.port import _PortData, SimplePort
 
+from idaes.core.util.residuals import _residual, max_residual
+
 def large_residuals(blk, tol=1e-5):
     """
     Generator return active Pyomo constraints with residuals greater than tol.
+    If the residuals of the same model are checked repeatedly, a
+    ResidualEvaluator is much faster.
 
     Args:
         blk: a Pyomo block in which to look for constraints
         tol: show constraints with residuals greated than tol
     """
-    for o in blk.component_objects(Constraint, descend_into=True):
-        for i, c in o.iteritems():
-            if c.active and value(c.lower - c.body()) > tol:
-                yield c
-            elif c.active and value(c.body() - c.upper) > tol:
-                yield c
+    for c in blk.component_data_objects(
+            Constraint, active=True, descend_into=True):
+        if _residual(c) > tol:
+            yield c
+
+class _NotVectorizable(Exception):
+    """
+    Raised when a constraint contains an expression that can't be compiled
+    to a NumPy expression.
+    """
+    pass
+
+
+# NumPy functions for Pyomo unary function expression names
+_np_functions = {
+    "log": "log", "log10": "log10", "exp": "exp", "sqrt": "sqrt",
+    "sin": "sin", "cos": "cos", "tan": "tan", "asin": "arcsin",
+    "acos": "arccos", "atan": "arctan", "sinh": "sinh", "cosh": "cosh",
+    "tanh": "tanh", "asinh": "arcsinh", "acosh": "arccosh",
+    "atanh": "arctanh", "ceil": "ceil", "floor": "floor"}
+
+
+# Node types for ResidualEvaluator, the other node types are format strings
+_LEAF_VAR = "var"
+_LEAF_PARAM = "param"
+_NAMED = "named"
+_LINEAR = "linear"
+_FUNCTION = "function"
+_SUM = "sum"
+_templates = {
+    "SumExpression": _SUM, "_MutableSumExpression": _SUM,
+    "ProductExpression": "({}*{})", "MonomialTermExpression": "({}*{})",
+    "DivisionExpression": "({}/{})", "ReciprocalExpression": "(1/{})",
+    "PowExpression": "({}**{})", "NegationExpression": "(-{})",
+    "AbsExpression": "np.abs({})"}
+
+
+class ResidualEvaluator(object):
+    """
+    Evaluate the residuals of all the active constraints in a block with
+    NumPy array operations.  Each constraint is compiled once to a NumPy
+    expression template, where the variables, mutable parameters and
+    constants are replaced by slots.  Constraints with the same template,
+    usually the elements of an indexed constraint, are evaluated together
+    by gathering the values for each slot into an array.  Constraints that
+    can't be compiled, for example ones containing external functions, are
+    evaluated one at a time with value().
+
+    The residual of a constraint is the larger of lower - body and
+    body - upper, so it is positive when the constraint is violated.
+    Residuals that can't be evaluated (e.g. a log of a negative number or a
+    variable with no value) are inf.  The constraints are compiled when the
+    evaluator is created; if constraints are added, activated or deactivated
+    create a new evaluator.
+
+    Args:
+        blk: a Pyomo block in which to look for constraints
+    """
+    def __init__(self, blk):
+        """
+        (see above)
+        """
+        self.blk = blk
+        self.constraints = []
+        self._vars = []
+        self._var_idx = {}
+        self._params = []
+        self._param_idx = {}
+        self._consts = []
+        self._types = {}
+        groups = {}
+        fallback = []
+        for c in blk.component_data_objects(
+                Constraint, active=True, descend_into=True):
+            i = len(self.constraints)
+            self.constraints.append(c)
+            leaves = []
+            try:
+                code = "({}, {}, {})".format(
+                    self._compile(c.body, leaves),
+                    self._compile_bound(c.lower, leaves, "-inf"),
+                    self._compile_bound(c.upper, leaves, "inf"))
+            except _NotVectorizable:
+                fallback.append(i)
+                continue
+            g = groups.get(code, None)
+            if g is None:
+                g = groups[code] = ([], [])
+            g[0].append(i)
+            g[1].append(leaves)
+        # The leaf value vector is the variables, then the parameters, then
+        # the constants
+        offsets = np.array([0, len(self._vars),
+                            len(self._vars) + len(self._params)])
+        self._groups = []
+        for code, (cons, leaves) in groups.items():
+            idx = np.array(leaves, dtype=np.int64).reshape(
+                len(cons), -1, 2)
+            idx = offsets[idx[:, :, 0]] + idx[:, :, 1]
+            f = eval("lambda a, inf: " + code.replace("@", "a"),
+                     {"np": np})
+            self._groups.append((np.array(cons, dtype=np.int64), idx.T, f))
+        self._fallback = fallback
+
+    def _slot(self, kind, obj, leaves):
+        """
+        Add a leaf to the leaves of the constraint being compiled and
+        return its slot in the expression string.  Leaves are stored as
+        (kind, index) with kind 0 for variables, 1 for mutable parameters
+        and 2 for constants.
+        """
+        if kind == 2:
+            j = len(self._consts)
+            self._consts.append(float(obj))
+        else:
+            idx, objs = (self._var_idx, self._vars) if kind == 0 else \
+                (self._param_idx, self._params)
+            j = idx.get(id(obj), None)
+            if j is None:
+                j = idx[id(obj)] = len(objs)
+                objs.append(obj)
+        leaves.append((kind, j))
+        return "@[{}]".format(len(leaves) - 1)
+
+    def _compile_bound(self, bound, leaves, default):
+        if bound is None:
+            return default
+        return self._compile(bound, leaves)
+
+    def _node_type(self, cls, e):
+        """
+        Classify an expression node class, the result is cached by class.
+        """
+        if not e.is_expression_type():
+            if e.is_variable_type():
+                return _LEAF_VAR
+            if e.is_parameter_type() or e.is_constant():
+                return _LEAF_PARAM
+            return None
+        if e.is_named_expression_type():
+            return _NAMED
+        name = cls.__name__
+        if name.startswith("NPV_"):
+            name = name[4:]
+        if name == "LinearExpression":
+            return _LINEAR
+        if name == "UnaryFunctionExpression":
+            return _FUNCTION
+        return _templates.get(name, None)
+
+    def _compile(self, e, leaves):
+        """
+        Compile a Pyomo expression to a NumPy expression string.  The
+        leaves are appended to leaves, and appear in the string as @[i].
+        """
+        cls = e.__class__
+        if cls in native_numeric_types:
+            return self._slot(2, e, leaves)
+        t = self._types.get(cls, False)
+        if t is False:
+            t = self._types[cls] = self._node_type(cls, e)
+        if t is None:
+            raise _NotVectorizable()
+        if t is _LEAF_VAR:
+            return self._slot(0, e, leaves)
+        if t is _LEAF_PARAM:
+            if e.is_constant():
+                return self._slot(2, value(e), leaves)
+            return self._slot(1, e, leaves)
+        if t is _NAMED:
+            return self._compile(e.expr, leaves)
+        if t is _LINEAR:
+            terms = [self._compile(e.constant, leaves)]
+            for coef, v in zip(e.linear_coefs, e.linear_vars):
+                terms.append("{}*{}".format(self._compile(coef, leaves),
+                                            self._compile(v, leaves)))
+            return "(" + " + ".join(terms) + ")"
+        args = [self._compile(a, leaves) for a in e.args]
+        if t is _FUNCTION:
+            f = _np_functions.get(e.getname(), None)
+            if f is None:
+                raise _NotVectorizable()
+            return "np.{}({})".format(f, args[0])
+        if t is _SUM:
+            return "(" + " + ".join(args) + ")"
+        return t.format(*args)
+
+    def _leaf_values(self):
+        """
+        Get the current values of all leaves.
+        """
+        return np.concatenate([
+            np.array([v.value for v in self._vars], dtype=float),
+            np.array([value(p, exception=False) for p in self._params],
+                     dtype=float),
+            np.array(self._consts, dtype=float)])
+
+    def residuals(self):
+        """
+        Calculate the residuals of all the constraints.
+
+        Returns:
+            NumPy array of residuals, in the same order as the constraints
+            attribute
+        """
+        r = np.empty(len(self.constraints))
+        x = self._leaf_values()
+        if len(x) == 0:
+            x = np.zeros(1)
+        with np.errstate(all="ignore"):
+            for cons, idx, f in self._groups:
+                body, lo, up = f(x[idx], np.inf)
+                r[cons] = np.maximum(lo - body, body - up)
+        for i in self._fallback:
+            c = self.constraints[i]
+            try:
+                r[i] = _residual(c)
+            except (ValueError, ZeroDivisionError, OverflowError, TypeError):
+                r[i] = np.inf
+        r[np.isnan(r)] = np.inf
+        return r
+
+    def large_residuals(self, tol=1e-5):
+        """
+        Return a list of constraints with residuals greater than tol.
+        """
+        return [self.constraints[i]
+                for i in np.flatnonzero(self.residuals() > tol)]
+
+    def top_residuals(self, k=10, tol=0.0, by_block=False):
+        """
+        Get the constraints with the largest residuals.
+
+        Args:
+            k: number of constraints to return, or with by_block, the number
+               of constraints to return for each block
+            tol: only return constraints with residuals greater than tol
+            by_block: if True group the constraints by parent block
+
+        Returns:
+            If by_block is False, a list of (constraint, residual) tuples
+            sorted by decreasing residual.  If by_block is True, a list of
+            (block, [(constraint, residual), ...]) tuples, sorted by the
+            largest residual in each block.
+        """
+        r = self.residuals()
+        viol = np.flatnonzero(r > tol)
+        order = viol[np.argsort(-r[viol], kind="stable")]
+        if not by_block:
+            return [(self.constraints[i], float(r[i])) for i in order[:k]]
+        blocks = []
+        block_cons = ComponentMap()
+        for i in order:
+            c = self.constraints[i]
+            b = c.parent_block()
+            lst = block_cons.get(b, None)
+            if lst is None:
+                lst = block_cons[b] = []
+                blocks.append(b)
+            if len(lst) < k:
+                lst.append((c, float(r[i])))
+        return [(b, block_cons[b]) for b in blocks]
+
 
 def fixed_variables(blk):
     """
@@ -78,7 +346,7 @@ def active_equalities(blk):
         blk: a Pyomo block in which to look for variables.
     """
     for o in blk.component_data_objects(Constraint, active=True):
-        if o.upper == o.lower: yield o
+        if o.equality: yield o
 
 def count_free_variables(blk):
     """
@@ -95,9 +363,17 @@ def count_equality_constraints(blk):
 
 def degrees_of_freedom(blk):
     """
-    Return the degrees of freedom.
+    Return the degrees of freedom.  The active equalities are only walked
+    once, if the degrees of freedom of the same model are needed repeatedly
+    use StructuralAnalysis.
     """
-    return count_free_variables(blk) - count_equality_constraints(blk)
+    ncon = 0
+    vin = ComponentSet()
+    for c in active_equalities(blk):
+        ncon += 1
+        for v in identify_variables(c.body):
+            if not v.fixed: vin.add(v)
+    return len(vin) - ncon
 
 def active_equality_set(blk):
     """
@@ -130,3 +406,284 @@ def free_variables_in_active_equalities_set(blk):
         for v in identify_variables(c.body):
             if not v.fixed: vin.add(v)
     return vin
+
+
+class StructuralAnalysis(object):
+    """
+    Structural analysis of the equality constraints in a block.  The
+    variable-constraint incidence matrix is built once, as a sparse matrix,
+    so the degrees of freedom and the Dulmage-Mendelsohn decomposition can
+    be calculated repeatedly without walking the constraint expressions
+    again.
+
+    Variables fixed or unfixed and constraints activated or deactivated
+    with the methods of this class are tracked without looking at the model.
+    Changes made directly to the model are picked up by update(), which
+    only looks at the fixed and active flags and at the expressions of
+    constraints added since the last update.  If the expression of a
+    constraint already in the analysis is changed, call rebuild().
+
+    Args:
+        blk: a Pyomo block in which to look for constraints
+    """
+    def __init__(self, blk):
+        """
+        (see above)
+        """
+        self.blk = blk
+        self.rebuild()
+
+    def rebuild(self):
+        """
+        Rebuild the incidence matrix from scratch.
+        """
+        self._cons = []
+        self._con_idx = ComponentMap()
+        self._vars = []
+        self._var_idx = ComponentMap()
+        self._rows = []
+        self._cols = []
+        self._con_active = np.zeros(0, dtype=bool)
+        self._var_fixed = np.zeros(0, dtype=bool)
+        self._matrix = None
+        self.update()
+
+    def _add_constraint(self, c):
+        """
+        Add a constraint to the incidence lists, and return its index.
+        """
+        i = len(self._cons)
+        self._cons.append(c)
+        self._con_idx[c] = i
+        for v in identify_variables(c.body):
+            j = self._var_idx.get(v, None)
+            if j is None:
+                j = len(self._vars)
+                self._vars.append(v)
+                self._var_idx[v] = j
+            self._rows.append(i)
+            self._cols.append(j)
+        self._matrix = None
+        return i
+
+    def _sync_arrays(self):
+        """
+        Extend the active and fixed flag arrays to the current number of
+        constraints and variables.
+        """
+        n = len(self._cons) - len(self._con_active)
+        if n:
+            self._con_active = np.concatenate(
+                [self._con_active, np.zeros(n, dtype=bool)])
+        n = len(self._vars) - len(self._var_fixed)
+        if n:
+            self._var_fixed = np.concatenate([self._var_fixed, np.array(
+                [v.fixed for v in self._vars[-n:]], dtype=bool)])
+
+    def update(self):
+        """
+        Update the active constraints and fixed variables from the model.
+        Constraints not seen before are added to the incidence matrix.
+        """
+        active = []
+        for c in active_equalities(self.blk):
+            i = self._con_idx.get(c, None)
+            if i is None:
+                i = self._add_constraint(c)
+            active.append(i)
+        self._sync_arrays()
+        self._con_active[:] = False
+        self._con_active[active] = True
+        self._var_fixed = np.array([v.fixed for v in self._vars], dtype=bool)
+        self._dm = None
+
+    def fix(self, v, val=None):
+        """
+        Fix a variable and update the analysis.
+
+        Args:
+            v: variable data object
+            val: value to fix the variable at, if None keep the current value
+        """
+        if val is None:
+            v.fix()
+        else:
+            v.fix(val)
+        j = self._var_idx.get(v, None)
+        if j is not None and not self._var_fixed[j]:
+            self._var_fixed[j] = True
+            self._dm = None
+
+    def unfix(self, v):
+        """
+        Unfix a variable and update the analysis.
+        """
+        v.unfix()
+        j = self._var_idx.get(v, None)
+        if j is not None and self._var_fixed[j]:
+            self._var_fixed[j] = False
+            self._dm = None
+
+    def activate(self, c):
+        """
+        Activate an equality constraint and update the analysis.
+        """
+        c.activate()
+        i = self._con_idx.get(c, None)
+        if i is None:
+            i = self._add_constraint(c)
+            self._sync_arrays()
+        self._con_active[i] = True
+        self._dm = None
+
+    def deactivate(self, c):
+        """
+        Deactivate a constraint and update the analysis.
+        """
+        c.deactivate()
+        i = self._con_idx.get(c, None)
+        if i is not None:
+            self._con_active[i] = False
+            self._dm = None
+
+    @property
+    def incidence_matrix(self):
+        """
+        Sparse incidence matrix of all the constraints (rows) and variables
+        (columns) in the analysis, including inactive constraints and fixed
+        variables.
+        """
+        if self._matrix is None:
+            self._matrix = sparse.csr_matrix(
+                (np.ones(len(self._rows), dtype=np.int8),
+                 (self._rows, self._cols)),
+                shape=(len(self._cons), len(self._vars)))
+        return self._matrix
+
+    def _active_system(self):
+        """
+        Get the indexes of the active equalities, the indexes of the free
+        variables in them and the incidence matrix between the two.
+        """
+        rows = np.flatnonzero(self._con_active)
+        a = self.incidence_matrix[rows]
+        cols = np.flatnonzero(
+            (np.asarray(a.getnnz(axis=0)) > 0) & ~self._var_fixed)
+        return rows, cols, a[:, cols]
+
+    def count_equality_constraints(self):
+        """
+        Count active equality constraints.
+        """
+        return int(np.count_nonzero(self._con_active))
+
+    def count_free_variables(self):
+        """
+        Count free variables that are in active equality constraints.
+        """
+        return len(self._active_system()[1])
+
+    def degrees_of_freedom(self):
+        """
+        Return the degrees of freedom.
+        """
+        return self.count_free_variables() - \
+            self.count_equality_constraints()
+
+    def active_equalities(self):
+        """
+        Return a list of the active equality constraints.
+        """
+        return [self._cons[i] for i in np.flatnonzero(self._con_active)]
+
+    def free_variables(self):
+        """
+        Return a list of the free variables in active equality constraints.
+        """
+        return [self._vars[j] for j in self._active_system()[1]]
+
+    def dulmage_mendelsohn(self):
+        """
+        Coarse Dulmage-Mendelsohn decomposition of the active equalities and
+        the free variables in them, based on a maximum matching of the
+        incidence graph.  Constraints and variables reachable through
+        alternating paths from an unmatched constraint make up the
+        overconstrained part, and those reachable from an unmatched variable
+        make up the underconstrained part.  The rest is the well-constrained
+        (square, structurally nonsingular) part.
+
+        Returns:
+            dict with keys "underconstrained", "overconstrained" and
+            "wellconstrained", each value is a tuple of a list of variables
+            and a list of constraints
+        """
+        if self._dm is not None:
+            return self._dm
+        rows, cols, a = self._active_system()
+        nr, nc = a.shape
+        a = a.tocsr()
+        match_row = maximum_bipartite_matching(a, perm_type="column")
+        match_col = -np.ones(nc, dtype=int)
+        matched = np.flatnonzero(match_row >= 0)
+        match_col[match_row[matched]] = matched
+        # Graph nodes are constraints 0..nr-1, variables nr..nr+nc-1, and a
+        # source node nr+nc connected to the unmatched nodes.
+        n = nr + nc + 1
+        a_coo = a.tocoo()
+
+        def reachable(src, dst, start):
+            g = sparse.csr_matrix(
+                (np.ones(len(src) + len(start), dtype=np.int8),
+                 (np.concatenate([src, np.full(len(start), n - 1)]),
+                  np.concatenate([dst, start]))), shape=(n, n))
+            order = breadth_first_order(g, n - 1, directed=True,
+                                        return_predecessors=False)
+            return order[order < n - 1]
+
+        # overconstrained: constraint -> any variable -> matched constraint
+        over = reachable(
+            np.concatenate([a_coo.row, nr + match_row[matched]]),
+            np.concatenate([nr + a_coo.col, matched]),
+            np.flatnonzero(match_row < 0))
+        # underconstrained: variable -> any constraint -> matched variable
+        under = reachable(
+            np.concatenate([nr + a_coo.col, matched]),
+            np.concatenate([a_coo.row, nr + match_row[matched]]),
+            nr + np.flatnonzero(match_col < 0))
+        in_over = np.zeros(n - 1, dtype=bool)
+        in_over[over] = True
+        in_under = np.zeros(n - 1, dtype=bool)
+        in_under[under] = True
+        well = np.flatnonzero(~(in_over | in_under))
+
+        def split(nodes):
+            nodes = np.sort(nodes)
+            return ([self._vars[cols[k - nr]] for k in nodes if k >= nr],
+                    [self._cons[rows[k]] for k in nodes if k < nr])
+
+        self._dm = {"underconstrained": split(under),
+                    "overconstrained": split(over),
+                    "wellconstrained": split(well)}
+        return self._dm
+
+    def structurally_singular(self):
+        """
+        Return True if the Jacobian of the active equalities with respect to
+        the free variables is structurally rank deficient, i.e. some
+        equalities can't be matched to a distinct variable.
+        """
+        return len(self.dulmage_mendelsohn()["overconstrained"][1]) > 0
+
+    def underconstrained_set(self):
+        """
+        Return the variables and constraints in the underconstrained part of
+        the Dulmage-Mendelsohn decomposition.
+        """
+        return self.dulmage_mendelsohn()["underconstrained"]
+
+    def overconstrained_set(self):
+        """
+        Return the variables and constraints in the overconstrained part of
+        the Dulmage-Mendelsohn decomposition.
+        """
+        return self.dulmage_mendelsohn()["overconstrained"]
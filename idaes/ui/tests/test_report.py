@@ -0,0 +1,150 @@
+##############################################################################
+# Institute for the Design of Advanced Energy Systems Process Systems
+# Engineering Framework (IDAES PSE Framework) Copyright (c) 2018-2019, by the
+# software owners: The Regents of the University of California, through
+# Lawrence Berkeley National Laboratory,  National Technology & Engineering
+# Solutions of Sandia, LLC, Carnegie Mellon University, West Virginia
+# University Research Corporation, et al. All rights reserved.
+#
+# Please see the files COPYRIGHT.txt and LICENSE.txt for full copyright and
+# license information, respectively. Both files are also available online
+# at the URL "https://github.com/IDAES/idaes-pse".
+##############################################################################
+"""
+Tests for model report functions.
+"""
+
+import math
+
+import pytest
+from pyomo.environ import (Block, ConcreteModel, Constraint, Expression,
+                           Param, Var, exp, log, inequality)
+from pyomo.core.expr.current import Expr_if
+from idaes.ui.report import (degrees_of_freedom, StructuralAnalysis,
+                             count_free_variables, count_equality_constraints,
+                             large_residuals, max_residual,
+                             ResidualEvaluator)
+
+
+def _model():
+    m = ConcreteModel()
+    m.x = Var([1, 2, 3], initialize=1.0)
+    m.y = Var(initialize=1.0)
+    m.c1 = Constraint(expr=m.x[1] + m.x[2] == 1)
+    m.c2 = Constraint(expr=m.x[1] - m.x[2] == 0)
+    m.c3 = Constraint(expr=m.x[3]*m.y == 2)
+    m.c4 = Constraint(expr=m.y <= 5)
+    return m
+
+
+def test_degrees_of_freedom():
+    m = _model()
+    assert degrees_of_freedom(m) == 1
+    assert count_free_variables(m) == 4
+    assert count_equality_constraints(m) == 3
+    m.y.fix()
+    assert degrees_of_freedom(m) == 0
+
+
+def test_structural_analysis():
+    m = _model()
+    sa = StructuralAnalysis(m)
+    assert sa.degrees_of_freedom() == 1
+    assert sa.incidence_matrix.shape == (3, 4)
+    assert not sa.structurally_singular()
+    under_vars, under_cons = sa.underconstrained_set()
+    assert set(v.name for v in under_vars) == set(["x[3]", "y"])
+    assert [c.name for c in under_cons] == ["c3"]
+    well_vars, well_cons = sa.dulmage_mendelsohn()["wellconstrained"]
+    assert set(c.name for c in well_cons) == set(["c1", "c2"])
+
+    sa.fix(m.y)
+    assert sa.degrees_of_freedom() == 0
+    assert sa.underconstrained_set() == ([], [])
+    # c1, c2 and c5 only contain x[1] and x[2], so the system is singular
+    m.c5 = Constraint(expr=m.x[1] == 0.5)
+    sa.deactivate(m.c3)
+    sa.activate(m.c5)
+    assert sa.degrees_of_freedom() == -1
+    assert sa.structurally_singular()
+    over_vars, over_cons = sa.overconstrained_set()
+    assert set(v.name for v in over_vars) == set(["x[1]", "x[2]"])
+    assert set(c.name for c in over_cons) == set(["c1", "c2", "c5"])
+    assert sa.degrees_of_freedom() == degrees_of_freedom(m)
+
+
+def test_structural_analysis_update():
+    m = _model()
+    sa = StructuralAnalysis(m)
+    # changes made directly to the model are picked up by update
+    m.b = Block()
+    m.b.z = Var()
+    m.b.c = Constraint(expr=m.b.z == m.y)
+    m.x[3].fix()
+    m.c1.deactivate()
+    sa.update()
+    assert sa.degrees_of_freedom() == degrees_of_freedom(m) == 1
+    assert len(sa.active_equalities()) == 3
+    assert set(v.name for v in sa.free_variables()) == \
+        set(["x[1]", "x[2]", "y", "b.z"])
+    m.b.deactivate()
+    sa.update()
+    assert sa.degrees_of_freedom() == degrees_of_freedom(m) == 1
+    sa.unfix(m.x[3])
+    assert sa.degrees_of_freedom() == degrees_of_freedom(m) == 2
+
+
+def _residual_model():
+    m = ConcreteModel()
+    m.s = [1, 2, 3, 4]
+    m.x = Var(m.s, initialize=lambda m, i: i)
+    m.p = Param(mutable=True, initialize=2)
+    m.e = Expression(m.s, rule=lambda m, i: m.x[i]**2)
+    m.c1 = Constraint(m.s, rule=lambda m, i: m.e[i] == m.p*i)
+    m.c2 = Constraint(m.s, rule=lambda m, i:
+                      exp(m.x[i]) + abs(-m.x[i])/m.p <= 10)
+    m.c3 = Constraint(expr=inequality(0, m.x[2]*m.x[3], 5))
+    m.b = Block()
+    m.b.y = Var(initialize=1)
+    m.b.c1 = Constraint(expr=log(m.b.y - 2) == 0)
+    m.b.c2 = Constraint(expr=Expr_if(IF=m.b.y >= 0, THEN=m.b.y, ELSE=0) ==
+                        m.x[1])
+    return m
+
+
+def test_residual_evaluator():
+    m = _residual_model()
+    re = ResidualEvaluator(m)
+    r = dict((c.name, ri) for c, ri in zip(re.constraints, re.residuals()))
+    assert r["c1[1]"] == pytest.approx(1)
+    assert r["c1[2]"] == pytest.approx(0)
+    assert r["c1[4]"] == pytest.approx(8)
+    assert r["c2[1]"] == pytest.approx(math.exp(1) + 0.5 - 10)
+    assert r["c2[3]"] == pytest.approx(math.exp(3) + 1.5 - 10)
+    assert r["c3"] == pytest.approx(1)
+    # log of a negative number
+    assert r["b.c1"] == float("inf")
+    # Expr_if isn't compiled, so it is evaluated with value()
+    assert r["b.c2"] == pytest.approx(0)
+    assert re._fallback == [re.constraints.index(m.b.c2)]
+
+    # parameter and variable values are read when evaluating
+    m.p = 3
+    m.b.y = 3
+    r = re.residuals()
+    assert r[re.constraints.index(m.c1[1])] == pytest.approx(2)
+    assert r[re.constraints.index(m.b.c1)] == pytest.approx(0)
+    assert [c.name for c in re.large_residuals(tol=1e-5)] == \
+        [c.name for c in large_residuals(m, tol=1e-5)]
+    assert max_residual(m) == pytest.approx(max(r))
+    assert max_residual(m.b) == pytest.approx(2)
+
+
+def test_top_residuals():
+    m = _residual_model()
+    re = ResidualEvaluator(m)
+    top = re.top_residuals(k=2)
+    assert [c.name for c, r in top] == ["b.c1", "c2[4]"]
+    top = re.top_residuals(k=1, tol=1e-5, by_block=True)
+    assert [(b.name, [c.name for c, r in lst]) for b, lst in top] == \
+        [("b", ["b.c1"]), ("unknown", ["c2[4]"])]
@@ -0,0 +1,101 @@
+##############################################################################
+# Institute for the Design of Advanced Energy Systems Process Systems
+# Engineering Framework (IDAES PSE Framework) Copyright (c) 2018-2019, by the
+# software owners: The Regents of the University of California, through
+# Lawrence Berkeley National Laboratory,  National Technology & Engineering
+# Solutions of Sandia, LLC, Carnegie Mellon University, West Virginia
+# University Research Corporation, et al. All rights reserved.
+#
+# Please see the files COPYRIGHT.txt and LICENSE.txt for full copyright and
+# license information, respectively. Both files are also available online
+# at the URL "https://github.com/IDAES/idaes-pse".
+##############################################################################
+"""
+Compare building a co-current HeatExchanger1D with properties on each state
+block element and in indexed property mode: build time, number of components
+and peak memory (from tracemalloc, measured in a separate build as tracing
+slows the build down). This is a script, not a test; run it with
+
+    python heat_exchanger_1D_benchmark.py [finite elements] [package]
+
+where package is bfw (default), btx or iapws95.
+"""
+from __future__ import print_function
+
+import sys
+import time
+import tracemalloc
+
+from pyomo.environ import ConcreteModel, Constraint, Expression, Var
+
+from idaes.core import FlowsheetBlock
+from idaes.unit_models.heat_exchanger_1D import HeatExchanger1D as HX1D
+from idaes.unit_models.heat_exchanger import HeatExchangerFlowPattern
+
+
+def _parameter_block(package, indexed):
+    if package == "bfw":
+        from idaes.property_models.examples.BFW_properties import \
+            BFWParameterBlock
+        return BFWParameterBlock(default={"indexed_properties": indexed})
+    elif package == "btx":
+        from idaes.property_models.ideal.BTX_ideal_VLE import \
+            BTXParameterBlock
+        return BTXParameterBlock(default={"valid_phase": "Liq",
+                                          "indexed_properties": indexed})
+    elif package == "iapws95":
+        from idaes.property_models import iapws95_ph
+        return iapws95_ph.Iapws95ParameterBlock(
+            default={"indexed_properties": indexed})
+    raise ValueError("Unknown property package {}".format(package))
+
+
+def build(n, package="bfw", indexed=False):
+    """Build a co-current HeatExchanger1D with n finite elements."""
+    m = ConcreteModel()
+    m.fs = FlowsheetBlock(default={"dynamic": False})
+    m.fs.properties = _parameter_block(package, indexed)
+    side = {"property_package": m.fs.properties,
+            "transformation_method": "dae.finite_difference",
+            "transformation_scheme": "BACKWARD"}
+    m.fs.hx = HX1D(
+        default={"shell_side": side,
+                 "tube_side": side,
+                 "finite_elements": n,
+                 "flow_type": HeatExchangerFlowPattern.cocurrent})
+    return m
+
+
+def _count(m, ctype):
+    components = 0
+    data = 0
+    for c in m.component_objects(ctype, descend_into=True):
+        components += 1
+        data += len(c)
+    return components, data
+
+
+def main(n=100, package="bfw"):
+    print("HeatExchanger1D, {} finite elements, {} properties".format(
+        n, package))
+    for indexed in (False, True):
+        t0 = time.time()
+        m = build(n, package, indexed)
+        t = time.time() - t0
+        counts = ", ".join(
+            "{} {}/{}".format(ctype.__name__, *_count(m, ctype))
+            for ctype in (Var, Constraint, Expression))
+        del m
+        tracemalloc.start()
+        m = build(n, package, indexed)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del m
+        print("  {}: build {:.2f} s, peak memory {:.1f} MB".format(
+            "indexed properties" if indexed else "properties on elements",
+            t, peak/2.0**20))
+        print("    components/data: {}".format(counts))
+
+
+if __name__ == "__main__":
+    main(*[int(a) if a.isdigit() else a for a in sys.argv[1:]])
@@ -17,7 +17,7 @@ Author: Jaffer Ghouse
 """
 import pytest
 from pyomo.environ import (ConcreteModel, SolverFactory, TerminationCondition,
-                           SolverStatus)
+                           SolverStatus, Var, Constraint, value)
 
 from idaes.core import (FlowsheetBlock, MaterialBalanceType, EnergyBalanceType,
                         MomentumBalanceType)
@@ -280,3 +280,67 @@ def test_custom_build():
                                    "transformation_method":
                                    "dae.collocation"},
                      "flow_type": HeatExchangerFlowPattern.countercurrent})
+
+
+# Test indexed property mode
+m.fs2 = FlowsheetBlock(default={"dynamic": False})
+m.fs2.properties = BFWParameterBlock(default={"indexed_properties": True})
+
+
+def _count_components(blk):
+    return len(list(blk.component_objects((Var, Constraint),
+                                          descend_into=True)))
+
+
+def test_indexed_properties_build():
+    m.fs2.HX_co_current = HX1D(
+        default={"shell_side": {"property_package": m.fs2.properties},
+                 "tube_side": {"property_package": m.fs2.properties},
+                 "flow_type": HeatExchangerFlowPattern.cocurrent})
+    hx = m.fs2.HX_co_current
+    assert hasattr(hx.shell, "properties_indexed")
+    assert hasattr(hx.tube, "properties_indexed")
+    assert isinstance(hx.shell.properties_indexed.enth_mol_phase, Var)
+    assert (hx.shell.properties[0, 0].enth_mol_phase['Liq'] is
+            hx.shell.properties_indexed.enth_mol_phase[0, 0, 'Liq'])
+    assert ("enthalpy_correlation" not in
+            hx.shell.properties[0, 0].component_map(Constraint))
+
+    # Properties are built once for each state block, not for each element
+    assert (_count_components(hx) <
+            _count_components(m.fs.HX_co_current))
+
+    # Same inlet and operating conditions as the model with properties on
+    # each element
+    ref = m.fs.HX_co_current
+    for port in ("shell_inlet", "tube_inlet"):
+        for name, v in getattr(ref, port).vars.items():
+            for t in m.fs2.time:
+                if v[t].fixed:
+                    getattr(hx, port).vars[name][t].fix(value(v[t]))
+    for name in ("d_shell", "d_tube_outer", "d_tube_inner", "N_tubes",
+                 "shell_length", "tube_length",
+                 "shell_heat_transfer_coefficient",
+                 "tube_heat_transfer_coefficient"):
+        for k, v in getattr(ref, name).items():
+            getattr(hx, name)[k].fix(value(v))
+
+    assert degrees_of_freedom(m.fs2) == 0
+
+
+@pytest.mark.skipif(solver is None, reason="Solver not available")
+def test_indexed_properties_initialization():
+    hx = m.fs2.HX_co_current
+    hx.initialize()
+    results = solver.solve(m.fs2, tee=False)
+
+    assert results.solver.termination_condition == TerminationCondition.optimal
+    assert results.solver.status == SolverStatus.ok
+
+    # Same solution as the model with properties on each element
+    ref = m.fs.HX_co_current
+    for port in ("shell_outlet", "tube_outlet"):
+        for name in ("flow_mol", "temperature", "pressure"):
+            assert (pytest.approx(value(getattr(ref, port).vars[name][0]),
+                                  rel=1e-6) ==
+                    getattr(hx, port).vars[name][0].value)
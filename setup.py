@@ -37,7 +37,7 @@ kwargs = dict(
     package_data={
         # If any package contains *.template, *.json files, *.dll files, or
         # *.so file, include them:
-        '': ['*.template', '*.json', '*.dll', '*.so', '*.svg']
+        '': ['*.template', '*.json', '*.dll', '*.so', '*.bin', '*.svg']
     },
     author='IDAES Team',
     author_email='idaes-dev@idaes.org',